@@ -3,8 +3,7 @@ from flask import send_from_directory
 from flask_restful import Api
 from flask_session import Session
 from flask_cors import CORS
-import json
-from datetime import datetime, date, timedelta
+from datetime import timedelta
 import os
 import sys
 
@@ -12,6 +11,9 @@ def create_app():
     app = Flask(__name__, static_folder='../static', template_folder='../templates')
     
     app.config.from_pyfile(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'config', 'settings.py'))
+    # BLOG_SERVICE_<NAME> environment variables override settings, values parsed as JSON
+    # (BLOG_SERVICE_RATE_LIMIT_ENABLED=false)
+    app.config.from_prefixed_env('BLOG_SERVICE')
     
     # Session configuration
     app.secret_key = app.config['SECRET_KEY']
@@ -27,23 +29,51 @@ def create_app():
     
     Session(app)
     
-    class JSONEncoder(json.JSONEncoder):
-        def default(self, obj):
-            if isinstance(obj, (datetime, date)):
-                return obj.isoformat()
-            return super(JSONEncoder, self).default(obj)
-    
-    app.json_encoder = JSONEncoder
+    # orjson-backed JSON with ISO dates and sorted keys (stdlib fallback)
+    from app.utils.json_provider import FastJSONProvider
+    app.json = FastJSONProvider(app)
     
     api = Api(app)
     
     from app.utils.error_handlers import register_error_handlers
     register_error_handlers(app)
     
+    # Request timing, DB call counts and the /metrics endpoint
+    from app.utils.metrics import init_metrics
+    init_metrics(app)
+    
+    # Per-client default limit for API resources; stricter ones are declared with @rate_limit
+    from app.utils.rate_limit import init_rate_limit
+    init_rate_limit(app)
+    
+    # gzip/brotli for JSON, HTML and static assets (runs after the header hook below)
+    from app.utils.compression import init_compression
+    init_compression(app)
+    
+    # Cross-worker events for cache invalidation and live streams, joined as each worker starts
+    from app.services.event_service import init_event_bus
+    init_event_bus(app)
+    
+    # Purges expired verification rows, OTP codes and session files in the background
+    from app.services.maintenance_service import init_maintenance
+    init_maintenance(app)
+    
+    # Blog view counters, flushed to blog_stats by each worker in the background
+    from app.services.stats_service import init_stats
+    init_stats(app)
+    
+    # Per-request stored procedure trace (development and CI only)
+    if app.config.get('DB_TRACE', False):
+        from app.services.db_service import report_query_trace
+        app.after_request(report_query_trace)
+    
     # Import and register routes
     from app.routes import register_routes
     register_routes(api)
     
+    from app.commands import register_commands
+    register_commands(app)
+    
     @app.after_request
     def after_request(response):
         # Set content type for JSON responses
@@ -59,10 +89,19 @@ def create_app():
         return response
 
 
+    # Built assets (flask build-assets) are fingerprinted, so they can be cached forever
+    from app.utils.assets import send_precompressed, dist_index_available, DIST_DIR, IMMUTABLE_CACHE_CONTROL
+    
     @app.route('/')
     def serve_index():
+        if app.config.get('ASSETS_USE_DIST', True) and dist_index_available():
+            return send_precompressed(DIST_DIR, 'index.html', 'no-cache')
         return send_from_directory('../templates', 'index.html')
     
+    @app.route('/static/dist/<path:filename>')
+    def serve_dist(filename):
+        return send_precompressed(DIST_DIR, filename, IMMUTABLE_CACHE_CONTROL)
+    
     @app.route('/docs/<path:filename>')
     def serve_docs(filename):
         docs_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'docs')
@@ -0,0 +1,437 @@
+import asyncio
+import io
+import json
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import parse_qs
+
+from app import create_app
+from app.services import async_db_service as db
+from app.services.event_service import get_bus
+from app.services.stats_service import record_view
+from app.services.stream_service import get_hub, event_stream_async
+from app.utils.compression import choose_encoding, compress
+from app.utils.helpers import sanitize_string
+from app.utils.lifecycle import run_worker_start_hooks, run_worker_exit_hooks
+from app.utils.json_provider import dumps_bytes
+from app.utils.loader import parse_ids
+from app.utils.metrics import registry, COUNT_BUCKETS
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+def _dumps(obj):
+    # Same encoder as Flask's jsonify: sorted keys and ISO dates
+    return dumps_bytes(obj) + b'\n'
+
+def _arg_int(query, name, default):
+    # Mirrors request.args.get(name, default=..., type=int)
+    try:
+        return int(query[name][0])
+    except (KeyError, IndexError, ValueError):
+        return default
+
+def _arg_date(query, name):
+    value = query.get(name, [None])[0]
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise HTTPError(400, 'Invalid date format. Use YYYY-MM-DD')
+
+def _arg_ids(query, max_ids):
+    try:
+        return parse_ids(query.get('ids', []), max_ids)
+    except ValueError as e:
+        raise HTTPError(400, str(e))
+
+async def _fetch_by_ids(config, proc_name, query):
+    ids = _arg_ids(query, config.get('BULK_MAX_IDS', 100))
+    return await db.sql_call_fetch_all(proc_name, (json.dumps(ids),))
+
+# Async versions of the public read-only resources, called with the Flask app's config
+
+async def blog_list(config, query):
+    if 'ids' in query:
+        return await _fetch_by_ids(config, 'getBlogsByIds', query)
+    newer_than = _arg_date(query, 'newerThan')
+    author = query.get('author', [None])[0]
+    author = sanitize_string(author) if author else None
+    limit = _arg_int(query, 'limit', 20)
+    offset = _arg_int(query, 'offset', 0)
+    return await db.sql_call_fetch_all('getBlogs', (newer_than, author, limit, offset))
+
+async def blog_detail(config, query, blogId):
+    blog = await db.sql_call_fetch_one('getBlogById', (blogId,))
+    if not blog:
+        raise HTTPError(404, 'Blog not found')
+    # Same counter as BlogDetail, flushed by this worker's stats_service thread
+    record_view(blogId, config)
+    return blog
+
+async def blog_comment_list(config, query, blogId):
+    newer_than = _arg_date(query, 'newerThan')
+    limit = _arg_int(query, 'limit', 20)
+    offset = _arg_int(query, 'offset', 0)
+
+    blog = await db.sql_call_fetch_one('getBlogById', (blogId,))
+    if not blog:
+        raise HTTPError(404, 'Blog not found')
+    return await db.sql_call_fetch_all('getCommentsByBlog', (blogId, newer_than, limit, offset))
+
+async def comment_detail(config, query, commentId):
+    comment = await db.sql_call_fetch_one('getCommentById', (commentId,))
+    if not comment:
+        raise HTTPError(404, 'Comment not found')
+    return comment
+
+async def comment_reply_list(config, query, commentId):
+    comment = await db.sql_call_fetch_one('getCommentById', (commentId,))
+    if not comment:
+        raise HTTPError(404, 'Comment not found')
+    return await db.sql_call_fetch_all('getCommentReplies', (commentId,))
+
+async def comment_list(config, query):
+    return await _fetch_by_ids(config, 'getCommentsByIds', query)
+
+async def user_list(config, query):
+    if 'ids' in query:
+        return await _fetch_by_ids(config, 'getUsersByIds', query)
+    limit = _arg_int(query, 'limit', 20)
+    offset = _arg_int(query, 'offset', 0)
+    return await db.sql_call_fetch_all('getUsers', (limit, offset))
+
+async def user_detail(config, query, userId):
+    user = await db.sql_call_fetch_one('getUserById', (userId,))
+    if not user:
+        raise HTTPError(404, 'User not found')
+    return user
+
+async def user_blog_list(config, query, userId):
+    user = await db.sql_call_fetch_one('getUserById', (userId,))
+    if not user:
+        raise HTTPError(404, 'User not found')
+    newer_than = _arg_date(query, 'newerThan')
+    limit = _arg_int(query, 'limit', 20)
+    offset = _arg_int(query, 'offset', 0)
+    return await db.sql_call_fetch_all('getBlogsByUserId', (userId, newer_than, limit, offset))
+
+# With the Flask endpoint each one stands in for, so /metrics labels match either mode
+ASYNC_ROUTES = [
+    (re.compile(r'^/blogs-api$'), blog_list, 'bloglist'),
+    (re.compile(r'^/blogs-api/(?P<blogId>\d+)$'), blog_detail, 'blogdetail'),
+    (re.compile(r'^/blogs-api/(?P<blogId>\d+)/comments$'), blog_comment_list, 'blogcommentlist'),
+    (re.compile(r'^/comments$'), comment_list, 'commentlist'),
+    (re.compile(r'^/comments/(?P<commentId>\d+)$'), comment_detail, 'commentdetail'),
+    (re.compile(r'^/comments/(?P<commentId>\d+)/replies$'), comment_reply_list, 'commentreplylist'),
+    (re.compile(r'^/users$'), user_list, 'userlist'),
+    (re.compile(r'^/users-api$'), user_list, 'userlist'),
+    (re.compile(r'^/users-api/(?P<userId>\d+)$'), user_detail, 'userdetail'),
+    (re.compile(r'^/users-api/(?P<userId>\d+)/blogs$'), user_blog_list, 'userbloglist'),
+]
+
+# Live comment streams, which here wait on the event loop instead of holding a thread each
+STREAM_ROUTE = re.compile(r'^/blogs-api/(?P<blogId>\d+)/comments/stream$')
+
+class AsgiApp:
+    """
+    ASGI entry point: public GET resources and comment streams run as async
+    handlers over an aiomysql pool, everything else is handed to the Flask app
+    in a thread pool.
+
+    The async handlers record the same request and procedure metrics and
+    compress their JSON like the Flask hooks do. They always CALL procedures on
+    DB_HOST through their own pool, so read replicas, DB_QUERY_MODE, the
+    per-request query budgets and DB_TRACE do not apply to them, nor does the
+    default per-client rate limit.
+    """
+    def __init__(self, flask_app=None):
+        self.flask_app = flask_app or create_app()
+        self.config = self.flask_app.config
+        self.executor = ThreadPoolExecutor(max_workers=self.config.get('ASGI_WSGI_THREADS', 32))
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        elif scope['type'] == 'http':
+            handler, endpoint, params = self.match(scope)
+            stream = STREAM_ROUTE.match(scope['path']) if scope['method'] == 'GET' and db.AIOMYSQL_AVAILABLE else None
+            if stream is not None:
+                await self.handle_stream(scope, receive, send, int(stream.group('blogId')))
+            elif handler is not None:
+                await self.handle_async(scope, send, handler, endpoint, params)
+            else:
+                await self.handle_wsgi(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                try:
+                    await db.init_pool(self.config)
+                except Exception as e:
+                    print(f"Async database pool error: {e}", file=sys.stderr)
+                    await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                    return
+                run_worker_start_hooks()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                run_worker_exit_hooks()
+                await db.close_pool()
+                self.executor.shutdown(wait=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def match(self, scope):
+        if scope['method'] != 'GET' or not db.AIOMYSQL_AVAILABLE:
+            return None, None, None
+        for pattern, handler, endpoint in ASYNC_ROUTES:
+            found = pattern.match(scope['path'])
+            if found:
+                return handler, endpoint, {k: int(v) for k, v in found.groupdict().items()}
+        return None, None, None
+
+    def default_headers(self):
+        host = self.config['APP_HOST']
+        return [
+            (b'content-type', b'application/json'),
+            (b'access-control-allow-origin', f"https://{host}".encode()),
+            (b'access-control-allow-methods', b'GET,PUT,POST,DELETE,OPTIONS'),
+            (b'access-control-allow-headers', b'Content-Type,Authorization'),
+            (b'access-control-allow-credentials', b'true'),
+        ]
+
+    async def handle_async(self, scope, send, handler, endpoint, params):
+        started = time.perf_counter()
+        stats = {'calls': 0, 'seconds': 0.0}
+        db.request_db_stats.set(stats)
+        query = parse_qs(scope.get('query_string', b'').decode('latin-1'), keep_blank_values=True)
+        try:
+            status, body = 200, await handler(self.config, query, **params)
+        except HTTPError as e:
+            status, body = e.status, {'status': 'error', 'message': e.message}
+        except Exception as e:
+            print(f"Async handler error: {e}", file=sys.stderr)
+            status, body = 500, {'status': 'error', 'message': 'Server error'}
+
+        headers = []
+        if self.config.get('METRICS_ENABLED', True):
+            # Same series as init_metrics records for the Flask resources
+            elapsed = time.perf_counter() - started
+            registry.observe('http_request_duration_seconds', {'method': 'GET', 'endpoint': endpoint, 'status': status},
+                             elapsed)
+            registry.observe('http_request_db_calls', {'endpoint': endpoint}, stats['calls'], COUNT_BUCKETS)
+            if self.config.get('METRICS_SERVER_TIMING', False):
+                timing = (f"app;dur={elapsed * 1000:.1f}, "
+                          f'db;dur={stats["seconds"] * 1000:.1f};desc="{stats["calls"]} calls"')
+                headers.append((b'server-timing', timing.encode()))
+        await self.send_json(send, status, body, scope, headers)
+
+    async def send_json(self, send, status, body, scope=None, extra_headers=()):
+        payload = _dumps(body)
+        headers = self.default_headers() + list(extra_headers)
+        config = self.config
+        # Like compress_response, minus its cache: these bodies are rarely repeated byte for byte
+        if (scope is not None and config.get('COMPRESS_ENABLED', True)
+                and 'application/json' in config.get('COMPRESS_MIMETYPES', ())
+                and len(payload) >= config.get('COMPRESS_MIN_SIZE', 500)):
+            headers.append((b'vary', b'Accept-Encoding'))
+            accept = b','.join(v for k, v in scope.get('headers', []) if k == b'accept-encoding')
+            encoding = choose_encoding(accept.decode('latin-1'))
+            if encoding is not None:
+                payload = compress(payload, encoding, config.get('COMPRESS_LEVEL', 6),
+                                   config.get('COMPRESS_BROTLI_QUALITY', 5))
+                headers.append((b'content-encoding', encoding.encode()))
+        headers.append((b'content-length', str(len(payload)).encode()))
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': payload})
+
+    async def handle_stream(self, scope, receive, send, blog_id):
+        """BlogCommentStream without the per-worker cap on streams, since none holds a thread"""
+        query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+        # EventSource sends Last-Event-ID when it reconnects, ?lastEventId= is for the first connection
+        last_id = dict(scope.get('headers', [])).get(b'last-event-id', b'').decode('latin-1') \
+            or query.get('lastEventId', [None])[0]
+        if last_id is not None and not last_id.isdigit():
+            await self.send_json(send, 400, {'status': 'error', 'message': 'Invalid Last-Event-ID'})
+            return
+        try:
+            blog = await db.sql_call_fetch_one('getBlogById', (blog_id,))
+        except Exception as e:
+            print(f"Async handler error: {e}", file=sys.stderr)
+            await self.send_json(send, 500, {'status': 'error', 'message': 'Server error'})
+            return
+        if not blog:
+            await self.send_json(send, 404, {'status': 'error', 'message': 'Blog not found'})
+            return
+
+        with self.flask_app.app_context():
+            bus, hub = get_bus(), get_hub()
+        stream = event_stream_async(bus, hub, blog_id, int(last_id) if last_id is not None else None,
+                                    heartbeat=self.config.get('SSE_HEARTBEAT_SECONDS', 15),
+                                    max_duration=self.config.get('SSE_MAX_STREAM_SECONDS', 55))
+        headers = [(b'content-type', b'text/event-stream'), (b'cache-control', b'no-cache'),
+                   (b'x-accel-buffering', b'no')] + self.default_headers()[1:]
+        await send({'type': 'http.response.start', 'status': 200, 'headers': headers})
+
+        async def pump():
+            async for chunk in stream:
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            await send({'type': 'http.response.body', 'body': b''})
+
+        async def disconnected():
+            while (await receive())['type'] != 'http.disconnect':
+                pass
+
+        tasks = [asyncio.ensure_future(pump()), asyncio.ensure_future(disconnected())]
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            if tasks[0] in done and tasks[0].exception() is not None:
+                print(f"Comment stream error: {tasks[0].exception()}", file=sys.stderr)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await stream.aclose()
+
+    async def handle_wsgi(self, scope, receive, send):
+        # Buffer the request body, then let Flask handle it on a worker thread
+        body = bytearray()
+        while True:
+            message = await receive()
+            body.extend(message.get('body', b''))
+            if not message.get('more_body'):
+                break
+
+        environ = self.build_environ(scope, bytes(body))
+        loop = asyncio.get_running_loop()
+        # The worker thread hands over the response start and each body chunk as Flask
+        # yields them, at most ASGI_WSGI_BUFFERED_CHUNKS ahead of what has been sent, so
+        # streamed responses (NDJSON exports) are never held in memory whole
+        queue = asyncio.Queue()
+        slots = threading.Semaphore(self.config.get('ASGI_WSGI_BUFFERED_CHUNKS', 64))
+        stop = threading.Event()
+
+        def deliver(item):
+            while not slots.acquire(timeout=1):
+                if stop.is_set():
+                    return False
+            if stop.is_set():
+                return False
+            loop.call_soon_threadsafe(queue.put_nowait, item)
+            return True
+
+        def run():
+            try:
+                self.run_wsgi(environ, deliver)
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, None)
+
+        async def disconnected():
+            while (await receive())['type'] != 'http.disconnect':
+                pass
+            # Stops the worker at its next chunk, which closes the response (and its cursors)
+            stop.set()
+
+        worker = loop.run_in_executor(self.executor, run)
+        watcher = asyncio.ensure_future(disconnected())
+        started = finished = False
+        try:
+            while not finished:
+                item = await queue.get()
+                if item is None:
+                    break
+                slots.release()
+                if isinstance(item, tuple):
+                    await send({'type': 'http.response.start', 'status': item[0], 'headers': item[1]})
+                    started = True
+                    continue
+                # Chunks already waiting go out together, not one message per NDJSON line
+                chunks = [item]
+                size = len(item)
+                while size < 65536 and not queue.empty():
+                    item = queue.get_nowait()
+                    if item is None:
+                        finished = True
+                        break
+                    slots.release()
+                    chunks.append(item)
+                    size += len(item)
+                await send({'type': 'http.response.body', 'body': b''.join(chunks), 'more_body': True})
+            await worker
+        except Exception as e:
+            stop.set()
+            # Collected whenever the worker notices, so its error is not reported as unretrieved
+            worker.add_done_callback(lambda future: future.cancelled() or future.exception())
+            print(f"WSGI handler error: {e}", file=sys.stderr)
+            if not started:
+                await self.send_json(send, 500, {'status': 'error', 'message': 'Server error'})
+            # Otherwise the body is left unfinished, so the client cannot mistake it for a complete one
+            return
+        finally:
+            watcher.cancel()
+        await send({'type': 'http.response.body', 'body': b''})
+
+    def build_environ(self, scope, body):
+        server = scope.get('server') or (self.config['APP_HOST'], self.config['APP_PORT'])
+        client = scope.get('client') or ('', 0)
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+            'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+            'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+            'SERVER_NAME': server[0],
+            'SERVER_PORT': str(server[1]),
+            'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+            'REMOTE_ADDR': client[0],
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': io.BytesIO(body),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': True,
+            'wsgi.run_once': False,
+            'CONTENT_LENGTH': str(len(body)),
+        }
+        for name, value in scope.get('headers', []):
+            name = name.decode('latin-1').upper().replace('-', '_')
+            value = value.decode('latin-1')
+            if name == 'CONTENT_TYPE':
+                environ['CONTENT_TYPE'] = value
+            elif name != 'CONTENT_LENGTH':
+                key = f"HTTP_{name}"
+                environ[key] = f"{environ[key]},{value}" if key in environ else value
+        return environ
+
+    def run_wsgi(self, environ, deliver):
+        """
+        Call the Flask app, passing (status, headers) and then each body chunk to
+        deliver() as they are produced; stops early when deliver() returns False
+        """
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response['status'] = int(status.split(' ', 1)[0])
+            response['headers'] = [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers]
+
+        result = self.flask_app(environ, start_response)
+        try:
+            if not deliver((response['status'], response['headers'])):
+                return
+            for chunk in result:
+                if chunk and not deliver(chunk):
+                    return
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+
+def create_asgi_app(flask_app=None):
+    return AsgiApp(flask_app)
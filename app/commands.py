@@ -0,0 +1,84 @@
+import time
+
+import click
+
+def register_commands(app):
+    """Flask CLI commands, e.g. `flask --app run build-assets`"""
+
+    @app.cli.command('build-assets')
+    @click.option('--no-minify', is_flag=True, help='Bundle and fingerprint without minifying')
+    def build_assets_command(no_minify):
+        """Bundle, minify and fingerprint static/js and static/css into static/dist."""
+        from app.utils.assets import build_assets, DIST_DIR
+
+        started = time.perf_counter()
+        manifest = build_assets(minify=not no_minify)
+        for name, info in manifest.items():
+            click.echo(f"{name:<12} -> {info['file']}  ({len(info['sources'])} files, {info['bytes']} bytes)")
+        click.echo(f"Wrote {DIST_DIR} in {time.perf_counter() - started:.2f}s")
+
+    @app.cli.command('export-content')
+    @click.option('--user-id', type=int, help='Only this user\'s blogs')
+    @click.option('--from', 'date_from', help='Blogs created on or after YYYY-MM-DD')
+    @click.option('--to', 'date_to', help='Blogs created on or before YYYY-MM-DD')
+    @click.option('-o', '--output', type=click.File('wb'), default='-', help='Output file, stdout by default')
+    def export_content_command(user_id, date_from, date_to, output):
+        """Stream blogs and their comments as NDJSON."""
+        from app.services.export_service import export_lines, parse_export_date
+
+        try:
+            date_from = parse_export_date(date_from)
+            date_to = parse_export_date(date_to)
+        except ValueError:
+            raise click.BadParameter('Dates must be YYYY-MM-DD')
+
+        started = time.perf_counter()
+        written = 0
+        for line in export_lines(user_id, date_from, date_to):
+            output.write(line)
+            written += len(line)
+        output.flush()
+        click.echo(f"Exported {written} bytes in {time.perf_counter() - started:.2f}s", err=True)
+
+    @app.cli.command('import-content')
+    @click.argument('path', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--format', 'file_format', type=click.Choice(['ndjson', 'wxr']), help='Detected from the file by default')
+    @click.option('--checkpoint', help='Checkpoint file, PATH.checkpoint by default')
+    @click.option('--default-user', help='Owner for content whose author has no account')
+    @click.option('--create-users', is_flag=True, help='Create LDAP accounts for unknown authors')
+    @click.option('--batch-rows', type=int, help='Blogs + comments per transaction')
+    @click.option('--workers', type=int, help='Sanitizer processes, 1 to sanitize inline')
+    def import_content_command(path, file_format, checkpoint, default_user, create_users, batch_rows, workers):
+        """Bulk import blogs and comments from NDJSON (export-content) or WordPress WXR."""
+        from app.services.import_service import Importer, ImportSourceError
+
+        def progress(stats):
+            click.echo(f"{stats['blogs']} blogs, {stats['comments']} comments, {stats['skipped']} skipped "
+                       f"({stats['blogsPerSecond']} blogs/s, {stats['commentsPerSecond']} comments/s)", err=True)
+
+        importer = Importer(default_user=default_user, create_users=create_users, batch_rows=batch_rows,
+                            workers=workers, progress=progress)
+        try:
+            stats = importer.run(path, file_format, checkpoint or path + '.checkpoint')
+        except ImportSourceError as e:
+            raise click.ClickException(str(e))
+
+        if stats['resumedAt']:
+            click.echo(f"Resumed after {stats['resumedAt']} blogs from the checkpoint")
+        click.echo(f"Imported {stats['blogs']} blogs and {stats['comments']} comments "
+                   f"({stats['usersCreated']} new users, {stats['skipped']} blogs skipped) in {stats['seconds']}s: "
+                   f"{stats['blogsPerSecond']} blogs/s, {stats['commentsPerSecond']} comments/s")
+
+    @app.cli.command('purge-expired')
+    @click.option('--batch-size', type=int, help='Rows deleted per transaction')
+    @click.option('--max-seconds', type=int, help='Stop deleting rows after this long, the rest waits for the next run')
+    @click.option('--skip-sessions', is_flag=True, help='Leave session files alone')
+    def purge_expired_command(batch_size, max_seconds, skip_sessions):
+        """Delete expired verification rows, OTP codes and session files (for cron)."""
+        from app.services.maintenance_service import run_locked, format_report, MaintenanceBusy
+
+        try:
+            report = run_locked(app, batch_size=batch_size, max_seconds=max_seconds, sessions=not skip_sessions)
+        except MaintenanceBusy:
+            raise click.ClickException('Another maintenance run is in progress')
+        click.echo(format_report(report))
@@ -1,26 +1,46 @@
+from dataclasses import dataclass
 from datetime import datetime
 
-class Blog:
+from app.models.row import Row
+
+@dataclass
+class Blog(Row):
+    """
+    Blog model - a row of getBlogs, getBlogById, createBlog, ...
+    """
+    __slots__ = ('author', 'blogId', 'content', 'date', 'title', 'userId')
+    author: str
+    blogId: int
+    content: str
+    date: datetime
+    title: str
+    userId: int
+
+@dataclass
+class Comment(Row):
     """
-    Blog model - represents a blog post
+    Comment model - a comment on a blog post or a reply to another comment
+    (parentCommentId), as returned by getCommentsByBlog, createComment, ...
     """
-    def __init__(self, blog_id=None, title=None, content=None, user_id=None, created_at=None, updated_at=None):
-        self.blog_id = blog_id
-        self.title = title
-        self.content = content
-        self.user_id = user_id
-        self.created_at = created_at or datetime.now()
-        self.updated_at = updated_at or datetime.now()
+    __slots__ = ('author', 'blogId', 'commentId', 'content', 'date', 'parentCommentId', 'userId')
+    author: str
+    blogId: int
+    commentId: int
+    content: str
+    date: datetime
+    parentCommentId: int
+    userId: int
 
-class Comment:
+@dataclass
+class TrendingBlog(Row):
     """
-    Comment model - represents a comment on a blog post or a reply to another comment
+    A blog with its view count, as returned by getTrendingBlogs
     """
-    def __init__(self, comment_id=None, content=None, user_id=None, blog_id=None, parent_comment_id=None, created_at=None, updated_at=None):
-        self.comment_id = comment_id
-        self.content = content
-        self.user_id = user_id
-        self.blog_id = blog_id
-        self.parent_comment_id = parent_comment_id
-        self.created_at = created_at or datetime.now()
-        self.updated_at = updated_at or datetime.now()
\ No newline at end of file
+    __slots__ = ('author', 'blogId', 'content', 'date', 'title', 'userId', 'views')
+    author: str
+    blogId: int
+    content: str
+    date: datetime
+    title: str
+    userId: int
+    views: int
@@ -0,0 +1,61 @@
+from operator import itemgetter
+
+class Row:
+    """
+    Base for typed database rows. Subclasses are dataclasses whose __slots__ name
+    the result columns in sorted order, so a row costs a few pointers instead of
+    a dict, and orjson writes it natively with the same bytes as the sorted dict
+    it replaces. Rows also answer the read-only dict calls (row['blogId'],
+    row.get(), **row) for code that has not moved to attributes.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def from_row(cls, row):
+        """Build from a DictCursor dict (extra columns are ignored); None stays None"""
+        if row is None:
+            return None
+        return cls(*[row[name] for name in cls.__slots__])
+
+    @classmethod
+    def converter(cls, description):
+        """A function turning tuples from a cursor with this description into rows"""
+        columns = [column[0] for column in description]
+        try:
+            positions = [columns.index(name) for name in cls.__slots__]
+        except ValueError:
+            raise ValueError(f"{cls.__name__} needs the columns {cls.__slots__}, the result has {columns}")
+        if positions == list(range(len(columns))):
+            return lambda values: cls(*values)
+        pick = itemgetter(*positions)
+        return lambda values: cls(*pick(values))
+
+    @classmethod
+    def from_tuples(cls, description, rows):
+        if not rows:
+            return []
+        convert = cls.converter(description)
+        return [convert(values) for values in rows]
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __getitem__(self, key):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key):
+        return key in self.__slots__
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self.__slots__ else default
+
+    def keys(self):
+        return self.__slots__
+
+    def values(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def items(self):
+        return [(name, getattr(self, name)) for name in self.__slots__]
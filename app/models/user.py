@@ -1,21 +1,24 @@
 import uuid
 import hashlib
 import re
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 
-class User:
-    # User model - represents a user in the system.
-    def __init__(self, user_id=None, username=None, email=None, password=None, user_type='local'):
-        self.user_id = user_id
-        self.username = username
-        self.email = email
-        self.password = password
-        self.user_type = user_type
-        self.verified = False
-        self.mobile_verified = False
-        self.phone_number = None
-        self.password_hash = None
-        self.password_salt = None
+from app.models.row import Row
+
+@dataclass
+class User(Row):
+    # User model - a row of getUserById, getUserByUsername, getUsers, ...
+    __slots__ = ('email', 'joinDate', 'mobile_verified', 'phone_number', 'userId', 'user_type', 'username',
+                 'verified')
+    email: str
+    joinDate: datetime
+    mobile_verified: int
+    phone_number: str
+    userId: int
+    user_type: str
+    username: str
+    verified: int
         
     @staticmethod
     def hash_password(password, salt=None):
@@ -67,9 +70,10 @@ class ResetToken:
         self.created_at = datetime.now()
         self.expires_at = self.created_at + timedelta(hours=1)
 
-class NotificationPreference:
+@dataclass
+class NotificationPreference(Row):
     # User notification preferences model
-    def __init__(self, user_id=None, notify_on_blog=True, notify_on_comment=True):
-        self.user_id = user_id
-        self.notify_on_blog = notify_on_blog
-        self.notify_on_comment = notify_on_comment
\ No newline at end of file
+    __slots__ = ('notifyOnBlog', 'notifyOnComment', 'userId')
+    notifyOnBlog: int
+    notifyOnComment: int
+    userId: int
@@ -1,11 +1,12 @@
 def register_routes(api):
     # Register all API routes
     from app.routes.auth import UserRegistration, AuthLogin, AuthLogout, VerifyOTP, RequestOTP, VerifyMobileOTP, RequestMobileOTP, RequestPasswordReset, CompletePasswordReset, VerifyResetOTP
-    from app.routes.blog import BlogList, BlogDetail, BlogCreate, BlogUpdate, BlogDelete
-    from app.routes.comment import BlogCommentList, BlogCommentCreate, CommentDetail, CommentUpdate, CommentDelete, CommentReplyList, CommentReplyCreate 
+    from app.routes.blog import BlogList, BlogTrending, BlogDetail, BlogCreate, BlogUpdate, BlogDelete, BlogBatchCreate
+    from app.routes.comment import CommentList, BlogCommentList, BlogCommentStream, BlogCommentCreate, CommentDetail, CommentUpdate, CommentDelete, CommentReplyList, CommentReplyCreate, CommentBatchCreate
     from app.routes.user import UserList, UserDetail, UserEmail, UserPhone, UserBlogList, UserNotificationPreferences
     from app.routes.ai import GeminiAI
     from app.routes.config import AppConfig
+    from app.routes.export import ContentExport
     
     # Auth routes
     api.add_resource(UserRegistration, '/auth/register')
@@ -24,27 +25,35 @@ def register_routes(api):
     
     # Blog routes
     api.add_resource(BlogList, '/blogs-api')
+    api.add_resource(BlogTrending, '/blogs-api/trending')
     api.add_resource(BlogDetail, '/blogs-api/<int:blogId>')
     api.add_resource(BlogCreate, '/blogs/create')
+    api.add_resource(BlogBatchCreate, '/blogs/batch')
     api.add_resource(BlogUpdate, '/blogs/<int:blogId>/update')
     api.add_resource(BlogDelete, '/blogs/<int:blogId>/delete')
     
     # Comment routes
     api.add_resource(BlogCommentList, '/blogs-api/<int:blogId>/comments')
+    api.add_resource(BlogCommentStream, '/blogs-api/<int:blogId>/comments/stream')
     api.add_resource(BlogCommentCreate, '/blogs/<int:blogId>/comments/create')
+    api.add_resource(CommentList, '/comments')
     api.add_resource(CommentDetail, '/comments/<int:commentId>')
     api.add_resource(CommentUpdate, '/comments/<int:commentId>/update')
     api.add_resource(CommentDelete, '/comments/<int:commentId>/delete')
     api.add_resource(CommentReplyList, '/comments/<int:commentId>/replies')
     api.add_resource(CommentReplyCreate, '/comments/<int:commentId>/replies/create')
+    api.add_resource(CommentBatchCreate, '/comments/batch')
     
     # User routes
-    api.add_resource(UserList, '/users')
+    api.add_resource(UserList, '/users', '/users-api')
     api.add_resource(UserDetail, '/users-api/<int:userId>')
     api.add_resource(UserBlogList, '/users-api/<int:userId>/blogs')
     api.add_resource(UserEmail, '/users/email')
     api.add_resource(UserPhone, '/users/phone')
     api.add_resource(UserNotificationPreferences, '/users/notification-preferences')
     
+    # Export routes
+    api.add_resource(ContentExport, '/export')
+    
     # AI routes
     api.add_resource(GeminiAI, '/ai/generate')
\ No newline at end of file
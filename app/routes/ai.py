@@ -1,10 +1,12 @@
-from flask import request, jsonify, make_response
+from flask import request, session, jsonify, make_response
 from flask_restful import Resource, reqparse
 
-from app.services.ai_service import generate_content
+from app.services.ai_service import generate_content, get_quota_remaining
 from app.utils.decorators import login_required, verification_required
+from app.utils.rate_limit import rate_limit
 
 class GeminiAI(Resource):
+    @rate_limit('20/minute', key='user', scope='ai-user')
     @login_required
     @verification_required
     def post(self):
@@ -26,13 +28,21 @@ class GeminiAI(Resource):
             }), 400)
         
         # Call Gemini AI service
-        result = generate_content(args['prompt'], args['mode'], args['content'])
+        username = session['username']
+        result = generate_content(args['prompt'], args['mode'], args['content'], username)
         
         # Return response
         if result.get('status') == 'success':
-            return jsonify({
+            response = jsonify({
                 'status': 'success',
                 'generatedContent': result.get('generatedContent')
             })
+        elif result.get('quotaExceeded'):
+            response = make_response(jsonify({'status': 'error', 'message': result['message']}), 429)
         else:
-            return make_response(jsonify(result), 500)
\ No newline at end of file
+            response = make_response(jsonify(result), 500)
+        
+        remaining = get_quota_remaining(username)
+        if remaining is not None:
+            response.headers['X-AI-Quota-Remaining'] = str(remaining)
+        return response
\ No newline at end of file
@@ -6,11 +6,16 @@ import hashlib
 import uuid
 import re
 
+from app.models.user import User
 from app.services.db_service import sql_call_fetch_one, sql_call_fetch_all
 from app.services.email_service import send_verification_email, send_password_reset_otp
+from app.services.event_service import publish
+from app.services.otp_service import issue_otp, verify_otp, consume_otp
 from app.services.sms_service import send_verification_sms, is_sms_enabled
-from app.utils.helpers import sanitize_string, generate_otp, safe_get
+from app.utils.helpers import sanitize_string, safe_get
+from app.utils.rate_limit import rate_limit, account_key
 from app.utils.decorators import login_required
+from app.utils.metrics import external_call
 
 class UserRegistration(Resource):
     def post(self):
@@ -39,12 +44,12 @@ class UserRegistration(Resource):
             return make_response(jsonify({'status': 'error', 'message': 'Password must be at least 8 characters and contain both letters and numbers'}), 400)
         
         # Check if username already exists
-        existing_user = sql_call_fetch_one('getUserByUsername', (username,))
+        existing_user = sql_call_fetch_one('getUserByUsername', (username,), model=User)
         if existing_user:
             return make_response(jsonify({'status': 'error', 'message': 'Username already exists'}), 400)
         
         # Check if email already exists
-        existing_email_user = sql_call_fetch_one('getUserByEmail', (email,))
+        existing_email_user = sql_call_fetch_one('getUserByEmail', (email,), model=User)
         if existing_email_user:
             return make_response(jsonify({'status': 'error', 'message': 'Email address already in use'}), 400)
         
@@ -57,12 +62,9 @@ class UserRegistration(Resource):
             
             if not user:
                 return make_response(jsonify({'status': 'error', 'message': 'Failed to create user'}), 500)
+            publish('user.created', {'userId': user['userId']})
             
-            otp = generate_otp()
-            
-            # Store OTP in verification table
-            sql_call_fetch_one('createVerification', (user['userId'], otp))
-            
+            otp = issue_otp('email', user['userId'])
             send_verification_email(email, username, otp)
             
             # Return success response
@@ -78,6 +80,9 @@ class UserRegistration(Resource):
             return make_response(jsonify({'status': 'error', 'message': f'Registration error: {str(e)}'}), 500)
 
 class AuthLogin(Resource):
+    # LDAP binds per client, and per account against password guessing spread over many addresses
+    @rate_limit('20/minute', key='ip', scope='login-ip')
+    @rate_limit('10/minute', key=account_key('username'), scope='login-account')
     def post(self):
         if not request.is_json:
             return make_response(jsonify({'status': 'error', 'message': 'Request must be JSON'}), 400)
@@ -156,9 +161,10 @@ class AuthLogin(Resource):
                     user='uid=' + username + ', ou=People,ou=fcs,o=unb',
                     password=args['password']
                 )
-                ldap_connection.open()
-                ldap_connection.start_tls()
-                ldap_connection.bind()
+                with external_call('ldap'):
+                    ldap_connection.open()
+                    ldap_connection.start_tls()
+                    ldap_connection.bind()
                 
                 # Authentication successful
                 user = sql_call_fetch_one('createLdapUser', (username,))
@@ -214,37 +220,37 @@ class AuthLogin(Resource):
     def get(self):
         if 'username' in session:
             username = session['username']
-            user = sql_call_fetch_one('getUserByUsername', (username,))
+            user = sql_call_fetch_one('getUserByUsername', (username,), model=User)
             
             if user:
-                verified_result = sql_call_fetch_one('isUserVerified', (user['userId'],))
+                verified_result = sql_call_fetch_one('isUserVerified', (user.userId,))
                 is_verified = verified_result and verified_result.get('verified', 0) > 0
 
                 try:
-                    mobile_verified_result = sql_call_fetch_one('isMobileVerified', (user['userId'],))
+                    mobile_verified_result = sql_call_fetch_one('isMobileVerified', (user.userId,))
                     is_mobile_verified = mobile_verified_result and mobile_verified_result.get('verified', 0) > 0
                 except Exception:
                     is_mobile_verified = False
                 
                 has_phone = safe_get(user, 'phone_number') is not None and safe_get(user, 'phone_number', '') != ''
                 
-                has_email = user.get('email') is not None and user.get('email', '') != ''
+                has_email = bool(user.email)
                 
                 sms_enabled = is_sms_enabled()
                 
                 response = {
                     'status': 'success',
                     'message': 'Authenticated',
-                    'userId': user['userId'],
-                    'username': user['username'],
-                    'email': user.get('email'),
+                    'userId': user.userId,
+                    'username': user.username,
+                    'email': user.email,
                     'phoneNumber': safe_get(user, 'phone_number'),
                     'verified': is_verified,
                     'mobileVerified': is_mobile_verified,
                     'hasEmail': has_email,
                     'hasPhone': has_phone,
                     'smsEnabled': sms_enabled,
-                    'userType': user.get('user_type', 'ldap')
+                    'userType': user.user_type
                 }
                 return make_response(jsonify(response), 200)
         
@@ -268,15 +274,21 @@ class VerifyOTP(Resource):
         parser.add_argument('otp', type=str, required=True, help='OTP is required')
         args = parser.parse_args()
         
-        result = sql_call_fetch_one('verifyOTP', (args['userId'], args['otp']))
+        result = None
+        if verify_otp('email', args['userId'], args['otp']) is not None:
+            # Marks the user verified and applies a pending email change
+            result = sql_call_fetch_one('completeEmailVerification', (args['userId'],))
         
         if result and result['success']:
+            publish('user.verified', {'userId': args['userId'], 'channel': 'email'})
             return make_response(jsonify({'status': 'success', 'message': 'Email verified successfully'}), 200)
         else:
             return make_response(jsonify({'status': 'error', 'message': 'Invalid or expired OTP'}), 400)
 
 # Request email OTP
 class RequestOTP(Resource):
+    @rate_limit('10/hour', key='ip', scope='email-otp-ip')
+    @rate_limit('5/hour', key=account_key('userId'), scope='email-otp-account')
     def post(self):
         parser = reqparse.RequestParser()
         parser.add_argument('userId', type=int, required=False, help='User ID is required')
@@ -287,21 +299,21 @@ class RequestOTP(Resource):
         
         if 'username' in session:
             username = session['username']
-            user = sql_call_fetch_one('getUserByUsername', (username,))
+            user = sql_call_fetch_one('getUserByUsername', (username,), model=User)
         
         # If not found in session or no session, try using the userId parameter
         if not user and args.get('userId'):
-            user = sql_call_fetch_one('getUserById', (args['userId'],))
+            user = sql_call_fetch_one('getUserById', (args['userId'],), model=User)
         
         if not user:
             return make_response(jsonify({'status': 'error', 'message': 'User not found'}), 404)
         
-        if not user.get('email'):
+        if not user.email:
             return make_response(jsonify({'status': 'error', 'message': 'Please add an email address first'}), 400)
         
         # Only check verification status if were not updating email
         if not args['updatingEmail']:
-            verified_result = sql_call_fetch_one('isUserVerified', (user['userId'],))
+            verified_result = sql_call_fetch_one('isUserVerified', (user.userId,))
             is_verified = verified_result and verified_result.get('verified', 0) > 0
             
             if is_verified:
@@ -310,7 +322,7 @@ class RequestOTP(Resource):
         # Check if there's a pending email update for this user
         pending_email = None
         try:
-            pending_result = sql_call_fetch_one('getPendingEmail', (user['userId'],))
+            pending_result = sql_call_fetch_one('getPendingEmail', (user.userId,))
             if pending_result and 'newEmail' in pending_result:
                 pending_email = pending_result['newEmail']
                 print(f"Found pending email: {pending_email}")
@@ -319,20 +331,16 @@ class RequestOTP(Resource):
         except Exception as e:
             print(f"Error checking pending email: {e}")
 
-        email_to_use = pending_email if pending_email else user.get('email')
+        email_to_use = pending_email if pending_email else user.email
         print(f"Using email for OTP: {email_to_use}")
         
-        otp = generate_otp()
-        
-        # Update verification record
-        sql_call_fetch_one('createVerification', (user['userId'], otp))
-        
-        send_verification_email(email_to_use, user['username'], otp)
+        otp = issue_otp('email', user.userId)
+        send_verification_email(email_to_use, user.username, otp)
         
         return make_response(jsonify({
             'status': 'success', 
             'message': 'Verification OTP sent to email',
-            'userId': user['userId']
+            'userId': user.userId
         }), 200)
 
 # Mobile OTP verification
@@ -346,9 +354,12 @@ class VerifyMobileOTP(Resource):
         args = parser.parse_args()
 
         try:
-            result = sql_call_fetch_one('verifyMobileOTP', (args['userId'], args['otp']))
+            result = None
+            if verify_otp('mobile', args['userId'], args['otp']) is not None:
+                result = sql_call_fetch_one('completeMobileVerification', (args['userId'],))
             
             if result and result.get('success'):
+                publish('user.verified', {'userId': args['userId'], 'channel': 'mobile'})
                 return make_response(jsonify({'status': 'success', 'message': 'Phone number verified successfully'}), 200)
             else:
                 return make_response(jsonify({'status': 'error', 'message': 'Invalid or expired OTP'}), 400)
@@ -357,6 +368,9 @@ class VerifyMobileOTP(Resource):
 
 # Request mobile OTP
 class RequestMobileOTP(Resource):
+    # Every call can send a paid SMS
+    @rate_limit('10/hour', key='ip', scope='mobile-otp-ip')
+    @rate_limit('3/hour', key=account_key('userId'), scope='mobile-otp-account')
     def post(self):
         parser = reqparse.RequestParser()
         parser.add_argument('userId', type=int, required=False, help='User ID is required')
@@ -369,10 +383,10 @@ class RequestMobileOTP(Resource):
         # Try to get user from the session if logged in
         if 'username' in session:
             username = session['username']
-            user = sql_call_fetch_one('getUserByUsername', (username,))
+            user = sql_call_fetch_one('getUserByUsername', (username,), model=User)
         
         if not user and args.get('userId'):
-            user = sql_call_fetch_one('getUserById', (args['userId'],))
+            user = sql_call_fetch_one('getUserById', (args['userId'],), model=User)
         
         if not user:
             return make_response(jsonify({'status': 'error', 'message': 'User not found'}), 404)
@@ -383,15 +397,16 @@ class RequestMobileOTP(Resource):
             phone_to_use = args['phone']
             
             try:
-                sql_call_fetch_one('updateUserPhone', (user['userId'], phone_to_use))
-                print(f"Updated phone for user {user['userId']} to {phone_to_use}")
+                sql_call_fetch_one('updateUserPhone', (user.userId, phone_to_use))
+                publish('user.updated', {'userId': user.userId})
+                print(f"Updated phone for user {user.userId} to {phone_to_use}")
             except Exception as e:
                 print(f"Error updating phone: {e}")
         if not phone_to_use:
             # First check if there's a pending phone number update for this user
             pending_phone = None
             try:
-                pending_result = sql_call_fetch_one('getPendingPhone', (user['userId'],))
+                pending_result = sql_call_fetch_one('getPendingPhone', (user.userId,))
                 if pending_result and 'newPhone' in pending_result:
                     pending_phone = pending_result['newPhone']
                     print(f"Found pending phone: {pending_phone}")
@@ -401,7 +416,7 @@ class RequestMobileOTP(Resource):
             if pending_phone:
                 phone_to_use = pending_phone
             elif safe_get(user, 'phone_number'):
-                phone_to_use = user.get('phone_number')
+                phone_to_use = user.phone_number
         
         if not phone_to_use:
             return make_response(jsonify({'status': 'error', 'message': 'No phone number found. Please add a phone number first.'}), 400)
@@ -409,7 +424,7 @@ class RequestMobileOTP(Resource):
         if not args['updatingPhone']:
             try:
                 # Check if user is already verified
-                mobile_verified_result = sql_call_fetch_one('isMobileVerified', (user['userId'],))
+                mobile_verified_result = sql_call_fetch_one('isMobileVerified', (user.userId,))
                 is_mobile_verified = mobile_verified_result and mobile_verified_result.get('verified', 0) > 0
                 
                 if is_mobile_verified and not pending_phone:
@@ -421,29 +436,28 @@ class RequestMobileOTP(Resource):
         if not is_sms_enabled():
             return make_response(jsonify({'status': 'error', 'message': 'SMS functionality is not enabled on the server'}), 400)
         
-        otp = generate_otp()
-        
         try:
-            # Update verification record
-            sql_call_fetch_one('createMobileVerification', (user['userId'], otp))
+            otp = issue_otp('mobile', user.userId)
         except Exception as e:
             print(f"Error creating mobile verification: {e}")
-            return make_response(jsonify({'status': 'error', 'message': f'Mobile verification database error: {str(e)}'}), 400)
+            return make_response(jsonify({'status': 'error', 'message': f'Mobile verification store error: {str(e)}'}), 400)
         
         print(f"Sending OTP to phone: {phone_to_use}")
-        sms_sent = send_verification_sms(phone_to_use, user['username'], otp)
+        sms_sent = send_verification_sms(phone_to_use, user.username, otp)
         
         if sms_sent:
             return make_response(jsonify({
                 'status': 'success', 
                 'message': 'Verification OTP sent to phone',
-                'userId': user['userId'],
+                'userId': user.userId,
                 'phoneUsed': phone_to_use
             }), 200)
         else:
             return make_response(jsonify({'status': 'error', 'message': 'Failed to send SMS. Please try again or contact support.'}), 500)
 
 class RequestPasswordReset(Resource):
+    @rate_limit('10/hour', key='ip', scope='password-reset-ip')
+    @rate_limit('3/hour', key=account_key('email'), scope='password-reset-account')
     def post(self):
         if not request.is_json:
             return make_response(jsonify({'status': 'error', 'message': 'Request must be JSON'}), 400)
@@ -463,16 +477,14 @@ class RequestPasswordReset(Resource):
             return make_response(jsonify({'status': 'error', 'message': 'Invalid email format'}), 400)
         
         # Find user by email
-        user = sql_call_fetch_one('getUserByEmail', (email,))
+        user = sql_call_fetch_one('getUserByEmail', (email,), model=User)
         
         # Always return success
-        if user and user['user_type'] == 'local': 
+        if user and user.user_type == 'local': 
             try:
-                otp = generate_otp()
-                
-                sql_call_fetch_one('createPasswordResetOTP', (user['userId'], otp))
-            
-                send_password_reset_otp(email, user['username'], otp)
+                # Keyed by the email, so checking a reset code never searches by the code alone
+                otp = issue_otp('reset', email, {'userId': user.userId, 'username': user.username})
+                send_password_reset_otp(email, user.username, otp)
             except Exception as e:
                 print(f"Password reset process error: {e}")
         
@@ -487,22 +499,24 @@ class CompletePasswordReset(Resource):
             return make_response(jsonify({'status': 'error', 'message': 'Request must be JSON'}), 400)
         
         parser = reqparse.RequestParser()
+        parser.add_argument('email', type=str, required=True, help='Email is required')
         parser.add_argument('otp', type=str, required=True, help='Reset OTP is required')
         parser.add_argument('password', type=str, required=True, help='New password is required')
         args = parser.parse_args()
         
         # Sanitize inputs
+        email = sanitize_string(args['email'])
         otp = sanitize_string(args['otp'])
         
-        if not otp or not args['password']:
-            return make_response(jsonify({'status': 'error', 'message': 'Reset OTP and new password are required'}), 400)
+        if not email or not otp or not args['password']:
+            return make_response(jsonify({'status': 'error', 'message': 'Email, reset OTP and new password are required'}), 400)
         
         # Validate password strength
         if len(args['password']) < 8 or not re.search(r'[A-Za-z]', args['password']) or not re.search(r'[0-9]', args['password']):
             return make_response(jsonify({'status': 'error', 'message': 'Password must be at least 8 characters and contain both letters and numbers'}), 400)
         
-        # Verify OTP first to make sure its valid and get the user
-        user = sql_call_fetch_one('verifyResetOTP', (otp,))
+        # Verify OTP first to make sure its valid and get the user; it is used up once the password changes
+        user = verify_otp('reset', email, otp, consume=False)
         
         if not user:
             return make_response(jsonify({
@@ -527,13 +541,21 @@ class CompletePasswordReset(Resource):
         salt = uuid.uuid4().hex
         password_hash = hashlib.sha256((args['password'] + salt).encode()).hexdigest()
         
-        result = sql_call_fetch_one('resetPasswordWithOTP', (otp, password_hash, salt))
+        # Only one request can use the code, even if two passed the check above
+        if consume_otp('reset', email) is None:
+            return make_response(jsonify({
+                'status': 'error', 
+                'message': 'Invalid or expired reset OTP'
+            }), 400)
+        
+        result = sql_call_fetch_one('resetPasswordForUser', (user['userId'], password_hash, salt))
         
         if not result or not result.get('success'):
             return make_response(jsonify({
                 'status': 'error', 
                 'message': 'Failed to reset password'
             }), 500)
+        publish('user.updated', {'userId': user['userId']})
         
         # Return success
         return make_response(jsonify({
@@ -547,15 +569,18 @@ class VerifyResetOTP(Resource):
             return make_response(jsonify({'status': 'error', 'message': 'Request must be JSON'}), 400)
         
         parser = reqparse.RequestParser()
+        parser.add_argument('email', type=str, required=True, help='Email is required')
         parser.add_argument('otp', type=str, required=True, help='Reset OTP is required')
         args = parser.parse_args()
 
+        email = sanitize_string(args['email'])
         otp = sanitize_string(args['otp'])
         
-        if not otp:
-            return make_response(jsonify({'status': 'error', 'message': 'Reset OTP is required'}), 400)
+        if not email or not otp:
+            return make_response(jsonify({'status': 'error', 'message': 'Email and reset OTP are required'}), 400)
         
-        user = sql_call_fetch_one('verifyResetOTP', (otp,))
+        # Checked, not used up: the code is still needed to set the new password
+        user = verify_otp('reset', email, otp, consume=False)
         
         if not user:
             return make_response(jsonify({
@@ -1,14 +1,30 @@
-from flask import request, session, make_response, jsonify
+from flask import request, session, make_response, jsonify, current_app
 from flask_restful import Resource
 from datetime import datetime
 
+from app.models.blog import Blog
 from app.services.db_service import sql_call_fetch_one, sql_call_fetch_all
 from app.services.email_service import send_blog_notification
-from app.utils.helpers import sanitize_string, sanitize_html
-from app.utils.decorators import login_required, verification_required, ownership_required
+from app.services.batch_service import create_blogs, BatchError
+from app.services.event_service import publish
+from app.services.sanitize_service import sanitize_html
+from app.services.stats_service import record_view, get_trending
+from app.utils.helpers import sanitize_string
+from app.utils.decorators import login_required, verification_required, ownership_required, query_budget
+from app.utils.loader import get_loader, parse_ids, load_user_by_username
 
 class BlogList(Resource):
+    @query_budget(1)
     def get(self):
+        # ?ids=1,2,3 fetches those blogs in one call, in the order given
+        if 'ids' in request.args:
+            try:
+                ids = parse_ids(request.args.getlist('ids'), current_app.config.get('BULK_MAX_IDS', 100))
+            except ValueError as e:
+                return make_response(jsonify({'status': 'error', 'message': str(e)}), 400)
+            blogs = [blog for blog in get_loader('blog').load_many(ids) if blog]
+            return make_response(jsonify(blogs), 200)
+        
         newer_than = request.args.get('newerThan')
         author = request.args.get('author')
         limit = request.args.get('limit', default=20, type=int)
@@ -23,19 +39,33 @@ class BlogList(Resource):
         # Sanitize author input
         author = sanitize_string(author) if author else None
         
-        blogs = sql_call_fetch_all('getBlogs', (newer_than, author, limit, offset))
+        blogs = sql_call_fetch_all('getBlogs', (newer_than, author, limit, offset), model=Blog)
         
         return make_response(jsonify(blogs), 200)
 
 class BlogDetail(Resource):
+    @query_budget(1)
     def get(self, blogId):
-        blog = sql_call_fetch_one('getBlogById', (blogId,))
+        blog = sql_call_fetch_one('getBlogById', (blogId,), model=Blog)
         if not blog:
             return make_response(jsonify({'status': 'error', 'message': 'Blog not found'}), 404)
         
+        # Counted in memory, written to blog_stats in batches by stats_service
+        record_view(blogId)
         return make_response(jsonify(blog), 200)
 
+class BlogTrending(Resource):
+    @query_budget(1)
+    def get(self):
+        most = current_app.config.get('STATS_TRENDING_SIZE', 50)
+        limit = request.args.get('limit', default=10, type=int)
+        if limit is None or not 1 <= limit <= most:
+            return make_response(jsonify({'status': 'error', 'message': f"limit must be between 1 and {most}"}), 400)
+        
+        return make_response(jsonify(get_trending(limit)), 200)
+
 class BlogCreate(Resource):
+    @query_budget(3)
     @login_required
     @verification_required
     def post(self):
@@ -51,15 +81,16 @@ class BlogCreate(Resource):
             return make_response(jsonify({'status': 'error', 'message': 'Title and content are required after sanitization'}), 400)
         
         username = session['username']
-        user = sql_call_fetch_one('getUserByUsername', (username,))
+        user = load_user_by_username(username)
         
-        blog = sql_call_fetch_one('createBlog', (title, content, user['userId']))
+        blog = sql_call_fetch_one('createBlog', (title, content, user.userId), model=Blog)
+        publish('blog.created', blog)
         
-        subscribers = [u['email'] for u in sql_call_fetch_all('getUsers', (1000, 0))
-                       if u['userId'] != user['userId'] and u['email'] and sql_call_fetch_one('getUserNotificationPreferences', (u['userId'],)).get('notifyOnBlog')]
+        # One query for everyone who wants new-blog emails, instead of a preferences lookup per user
+        subscribers = [u['email'] for u in sql_call_fetch_all('getBlogSubscribers', (user.userId,))]
         
         if subscribers:
-            send_blog_notification(blog, user['username'], subscribers)
+            send_blog_notification(blog, user.username, subscribers)
         
         return make_response(jsonify(blog), 201)
 
@@ -73,16 +104,19 @@ class BlogUpdate(Resource):
             return make_response(jsonify({'status': 'error', 'message': 'Title and content are required'}), 400)
         
         title = sanitize_string(data['title'])
-        content = sanitize_html(data['content'])
+        # A body sent back unchanged is already sanitized (ownership_required loaded it)
+        current = get_loader('blog').load(blogId)
+        content = current.content if current and data['content'] == current.content else sanitize_html(data['content'])
         
         username = session['username']
-        user = sql_call_fetch_one('getUserByUsername', (username,))
+        user = load_user_by_username(username)
         
-        blog = sql_call_fetch_one('updateBlog', (blogId, title, content, user['userId']))
+        blog = sql_call_fetch_one('updateBlog', (blogId, title, content, user.userId), model=Blog)
         
         if not blog:
             return make_response(jsonify({'status': 'error', 'message': 'Blog not found or not updated'}), 404)
         
+        publish('blog.updated', blog)
         return make_response(jsonify(blog), 200)
 
 class BlogDelete(Resource):
@@ -91,11 +125,33 @@ class BlogDelete(Resource):
     @ownership_required('blog')
     def delete(self, blogId):
         username = session['username']
-        user = sql_call_fetch_one('getUserByUsername', (username,))
+        user = load_user_by_username(username)
         
-        result = sql_call_fetch_one('deleteBlog', (blogId, user['userId']))
+        result = sql_call_fetch_one('deleteBlog', (blogId, user.userId))
         
         if not result or result['affectedRows'] == 0:
             return make_response(jsonify({'status': 'error', 'message': 'Blog not found or not deleted'}), 404)
         
+        publish('blog.deleted', {'blogId': blogId})
         return make_response('', 204)
+
+class BlogBatchCreate(Resource):
+    @query_budget(3)
+    @login_required
+    @verification_required
+    def post(self):
+        data = request.get_json(silent=True)
+        if not data:
+            return make_response(jsonify({'status': 'error', 'message': 'No JSON data provided'}), 400)
+        
+        username = session['username']
+        user = load_user_by_username(username)
+        
+        try:
+            results = create_blogs(user, data)
+        except BatchError as e:
+            return make_response(jsonify({'status': 'error', 'message': str(e)}), 400)
+        
+        created = sum(1 for r in results if r['status'] == 'created')
+        return make_response(jsonify({'created': created, 'failed': len(results) - created, 'results': results}),
+                             201 if created else 400)
@@ -1,12 +1,31 @@
-from flask import request, session, make_response, jsonify
+from flask import request, session, make_response, jsonify, current_app, Response
 from flask_restful import Resource, reqparse
 
+from app.models.blog import Blog, Comment
+from app.models.user import User, NotificationPreference
 from app.services.db_service import sql_call_fetch_one, sql_call_fetch_all
 from app.services.email_service import send_comment_notification
-from app.utils.helpers import sanitize_html
-from app.utils.decorators import login_required, verification_required, ownership_required
+from app.services.batch_service import create_comments, BatchError
+from app.services.sanitize_service import sanitize_html
+from app.services.event_service import get_bus, publish
+from app.services.stream_service import get_hub, event_stream, acquire_stream_slot, release_stream_slot
+from app.utils.decorators import login_required, verification_required, ownership_required, query_budget
+from app.utils.loader import get_loader, parse_ids, load_user_by_username
+
+class CommentList(Resource):
+    @query_budget(1)
+    def get(self):
+        # Bulk lookup only: ?ids=1,2,3 returns those comments in the order given
+        try:
+            ids = parse_ids(request.args.getlist('ids'), current_app.config.get('BULK_MAX_IDS', 100))
+        except ValueError as e:
+            return make_response(jsonify({'status': 'error', 'message': str(e)}), 400)
+        
+        comments = [comment for comment in get_loader('comment').load_many(ids) if comment]
+        return make_response(jsonify(comments), 200)
 
 class BlogCommentList(Resource):
+    @query_budget(2)
     def get(self, blogId):
         newer_than = request.args.get('newerThan')
         limit = request.args.get('limit', default=20, type=int)
@@ -20,15 +39,49 @@ class BlogCommentList(Resource):
                 return make_response(jsonify({'status': 'error', 'message': 'Invalid date format. Use YYYY-MM-DD'}), 400)
         
         # Check if blog exists
-        blog = sql_call_fetch_one('getBlogById', (blogId,))
+        blog = sql_call_fetch_one('getBlogById', (blogId,), model=Blog)
         if not blog:
             return make_response(jsonify({'status': 'error', 'message': 'Blog not found'}), 404)
         
         # Get comments from database
-        comments = sql_call_fetch_all('getCommentsByBlog', (blogId, newer_than, limit, offset))
+        comments = sql_call_fetch_all('getCommentsByBlog', (blogId, newer_than, limit, offset), model=Comment)
         
         return make_response(jsonify(comments), 200)
     
+class BlogCommentStream(Resource):
+    @query_budget(1)
+    def get(self, blogId):
+        blog = get_loader('blog').load(blogId)
+        if not blog:
+            return make_response(jsonify({'status': 'error', 'message': 'Blog not found'}), 404)
+        
+        # EventSource sends Last-Event-ID when it reconnects, ?lastEventId= is for the first connection
+        last_id = request.headers.get('Last-Event-ID') or request.args.get('lastEventId')
+        if last_id is not None:
+            if not last_id.isdigit():
+                return make_response(jsonify({'status': 'error', 'message': 'Invalid Last-Event-ID'}), 400)
+            last_id = int(last_id)
+        
+        if not acquire_stream_slot():
+            response = make_response(jsonify({'status': 'error', 'message': 'Too many open streams, poll instead'}), 503)
+            response.headers['Retry-After'] = '30'
+            return response
+        
+        config = current_app.config
+        try:
+            stream = event_stream(get_bus(), get_hub(), blogId, last_id,
+                                  heartbeat=config.get('SSE_HEARTBEAT_SECONDS', 15),
+                                  max_duration=config.get('SSE_MAX_STREAM_SECONDS', 55))
+        except Exception:
+            release_stream_slot()
+            raise
+        response = Response(stream, mimetype='text/event-stream')
+        # The slot is freed however the stream ends, even if it never started
+        response.call_on_close(release_stream_slot)
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['X-Accel-Buffering'] = 'no'
+        return response
+
 class BlogCommentCreate(Resource):
     @login_required
     @verification_required
@@ -37,7 +90,7 @@ class BlogCommentCreate(Resource):
             return make_response(jsonify({'status': 'error', 'message': 'No JSON data provided'}), 400)
         
         # Check if blog exists
-        blog = sql_call_fetch_one('getBlogById', (blogId,))
+        blog = sql_call_fetch_one('getBlogById', (blogId,), model=Blog)
         if not blog:
             return make_response(jsonify({'status': 'error', 'message': 'Blog not found'}), 404)
         
@@ -53,23 +106,25 @@ class BlogCommentCreate(Resource):
         
         # Get user ID from session
         username = session['username']
-        user = sql_call_fetch_one('getUserByUsername', (username,))
+        user = load_user_by_username(username)
         
-        comment = sql_call_fetch_one('createComment', (content, user['userId'], blogId, None))
+        comment = sql_call_fetch_one('createComment', (content, user.userId, blogId, None), model=Comment)
+        publish('comment.created', comment)
         
         # Get blog author for notification
-        blog_author = sql_call_fetch_one('getUserById', (blog['userId'],))
+        blog_author = sql_call_fetch_one('getUserById', (blog.userId,), model=User)
         
-        if blog_author and blog_author['email']:
-            prefs = sql_call_fetch_one('getUserNotificationPreferences', (blog_author['userId'],))
-            if prefs and prefs['notifyOnComment']:
-                send_comment_notification(comment, blog['title'], user['username'], blog_author['email'])
+        if blog_author and blog_author.email:
+            prefs = sql_call_fetch_one('getUserNotificationPreferences', (blog_author.userId,), model=NotificationPreference)
+            if prefs and prefs.notifyOnComment:
+                send_comment_notification(comment, blog.title, user.username, blog_author.email)
         
         return make_response(jsonify(comment), 201)
 
 class CommentDetail(Resource):
+    @query_budget(1)
     def get(self, commentId):
-        comment = sql_call_fetch_one('getCommentById', (commentId,))
+        comment = sql_call_fetch_one('getCommentById', (commentId,), model=Comment)
         if not comment:
             return make_response(jsonify({'status': 'error', 'message': 'Comment not found'}), 404)
         
@@ -87,21 +142,23 @@ class CommentUpdate(Resource):
         parser.add_argument('content', type=str, required=True, help='Content is required')
         args = parser.parse_args()
         
-        # Sanitize
-        content = sanitize_html(args['content'])
+        # Sanitize, unless the body is the stored (already sanitized) one
+        current = get_loader('comment').load(commentId)
+        content = current.content if current and args['content'] == current.content else sanitize_html(args['content'])
         
         if not content:
             return make_response(jsonify({'status': 'error', 'message': 'Content is required after sanitization'}), 400)
         
         # Get user ID
         username = session['username']
-        user = sql_call_fetch_one('getUserByUsername', (username,))
+        user = load_user_by_username(username)
         
-        comment = sql_call_fetch_one('updateComment', (commentId, content, user['userId']))
+        comment = sql_call_fetch_one('updateComment', (commentId, content, user.userId), model=Comment)
         
         if not comment:
             return make_response(jsonify({'status': 'error', 'message': 'Comment not found or not updated'}), 404)
         
+        publish('comment.updated', comment)
         return make_response(jsonify(comment), 200)
 
 class CommentDelete(Resource):
@@ -109,24 +166,31 @@ class CommentDelete(Resource):
     @verification_required
     @ownership_required('comment')
     def delete(self, commentId):
+        # Loaded by ownership_required, needed for the blog the stream event goes to
+        comment = get_loader('comment').load(commentId)
+        
         # Get user ID
         username = session['username']
-        user = sql_call_fetch_one('getUserByUsername', (username,))
-        result = sql_call_fetch_one('deleteComment', (commentId, user['userId']))
+        user = load_user_by_username(username)
+        result = sql_call_fetch_one('deleteComment', (commentId, user.userId))
         
         if not result or result['affectedRows'] == 0:
             return make_response(jsonify({'status': 'error', 'message': 'Comment not found or not deleted'}), 404)
         
+        if comment:
+            # Replies are deleted with it (ON DELETE CASCADE), clients drop them too
+            publish('comment.deleted', {'commentId': commentId, 'blogId': comment.blogId})
         return make_response('', 204)
 
 class CommentReplyList(Resource):
+    @query_budget(2)
     def get(self, commentId):
-        comment = sql_call_fetch_one('getCommentById', (commentId,))
+        comment = sql_call_fetch_one('getCommentById', (commentId,), model=Comment)
         if not comment:
             return make_response(jsonify({'status': 'error', 'message': 'Comment not found'}), 404)
         
         # Get replies
-        replies = sql_call_fetch_all('getCommentReplies', (commentId,))
+        replies = sql_call_fetch_all('getCommentReplies', (commentId,), model=Comment)
         
         response = make_response(jsonify(replies), 200)
         response.headers['Content-Type'] = 'application/json'
@@ -139,7 +203,7 @@ class CommentReplyCreate(Resource):
         if not request.json:
             return make_response(jsonify({'status': 'error', 'message': 'No JSON data provided'}), 400)
         
-        comment = sql_call_fetch_one('getCommentById', (commentId,))
+        comment = sql_call_fetch_one('getCommentById', (commentId,), model=Comment)
         if not comment:
             return make_response(jsonify({'status': 'error', 'message': 'Comment not found'}), 404)
 
@@ -155,20 +219,42 @@ class CommentReplyCreate(Resource):
         
         # Get user ID
         username = session['username']
-        user = sql_call_fetch_one('getUserByUsername', (username,))
+        user = load_user_by_username(username)
         
-        reply = sql_call_fetch_one('createComment', (content, user['userId'], comment['blogId'], commentId))
+        reply = sql_call_fetch_one('createComment', (content, user.userId, comment.blogId, commentId), model=Comment)
+        publish('comment.created', reply)
         
         # Notify the original comment author
-        comment_author = sql_call_fetch_one('getUserById', (comment['userId'],))
+        comment_author = sql_call_fetch_one('getUserById', (comment.userId,), model=User)
         
-        if comment_author and comment_author['email'] and comment_author['userId'] != user['userId']:
+        if comment_author and comment_author.email and comment_author.userId != user.userId:
             # Check if author wants comment notifications
-            prefs = sql_call_fetch_one('getUserNotificationPreferences', (comment_author['userId'],))
-            if prefs and prefs['notifyOnComment']:
-                blog = sql_call_fetch_one('getBlogById', (comment['blogId'],))
-                blog_title = blog['title'] if blog else "Unknown Blog"
+            prefs = sql_call_fetch_one('getUserNotificationPreferences', (comment_author.userId,), model=NotificationPreference)
+            if prefs and prefs.notifyOnComment:
+                blog = sql_call_fetch_one('getBlogById', (comment.blogId,), model=Blog)
+                blog_title = blog.title if blog else "Unknown Blog"
                 
-                send_comment_notification(reply, blog_title, user['username'], comment_author['email'])
+                send_comment_notification(reply, blog_title, user.username, comment_author.email)
+        
+        return make_response(jsonify(reply), 201)
+
+class CommentBatchCreate(Resource):
+    @query_budget(5)
+    @login_required
+    @verification_required
+    def post(self):
+        data = request.get_json(silent=True)
+        if not data:
+            return make_response(jsonify({'status': 'error', 'message': 'No JSON data provided'}), 400)
+        
+        username = session['username']
+        user = load_user_by_username(username)
+        
+        try:
+            results = create_comments(user, data)
+        except BatchError as e:
+            return make_response(jsonify({'status': 'error', 'message': str(e)}), 400)
         
-        return make_response(jsonify(reply), 201)
\ No newline at end of file
+        created = sum(1 for r in results if r['status'] == 'created')
+        return make_response(jsonify({'created': created, 'failed': len(results) - created, 'results': results}),
+                             201 if created else 400)
@@ -0,0 +1,39 @@
+from flask import request, session, make_response, jsonify, current_app, Response, stream_with_context
+from flask_restful import Resource
+
+from app.services.export_service import export_lines, parse_export_date
+from app.utils.decorators import login_required, verification_required
+from app.utils.loader import load_user_by_username
+from app.utils.rate_limit import rate_limit
+
+class ContentExport(Resource):
+    # Each export holds two database connections for as long as the download lasts
+    @rate_limit('5/hour', key='user', scope='export-user')
+    @login_required
+    @verification_required
+    def get(self):
+        username = session['username']
+        user = load_user_by_username(username)
+        user_id = request.args.get('userId', type=int)
+        # Users export their own content; other users' and the whole site only for EXPORT_ADMINS
+        # (or from the command line, `flask export-content`)
+        if username not in current_app.config.get('EXPORT_ADMINS', []):
+            if user_id is not None and user_id != user.userId:
+                return make_response(jsonify({'status': 'error', 'message': 'You can only export your own content'}), 403)
+            user_id = user.userId
+        try:
+            date_from = parse_export_date(request.args.get('from'))
+            date_to = parse_export_date(request.args.get('to'))
+        except ValueError:
+            return make_response(jsonify({'status': 'error', 'message': 'Invalid date format. Use YYYY-MM-DD'}), 400)
+
+        if date_from and date_to and date_from > date_to:
+            return make_response(jsonify({'status': 'error', 'message': 'from must not be after to'}), 400)
+
+        # Streamed line by line, the body is never built in memory
+        response = Response(stream_with_context(export_lines(user_id, date_from, date_to)),
+                            mimetype='application/x-ndjson')
+        filename = f"export-user-{user_id}.ndjson" if user_id else 'export.ndjson'
+        response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+        response.headers['Cache-Control'] = 'no-store'
+        return response
@@ -1,28 +1,44 @@
-from flask import request, session, make_response, jsonify
+from flask import request, session, make_response, jsonify, current_app
 from flask_restful import Resource, reqparse
 import re
 
+from app.models.blog import Blog
+from app.models.user import User, NotificationPreference
 from app.services.db_service import sql_call_fetch_one, sql_call_fetch_all
+from app.services.event_service import publish
+from app.services.otp_service import issue_otp
 from app.utils.helpers import sanitize_string
-from app.utils.decorators import login_required
+from app.utils.decorators import login_required, query_budget
+from app.utils.loader import get_loader, parse_ids
 
 class UserList(Resource):
+    @query_budget(1)
     def get(self):
+        # ?ids=1,2,3 fetches those users in one call, in the order given
+        if 'ids' in request.args:
+            try:
+                ids = parse_ids(request.args.getlist('ids'), current_app.config.get('BULK_MAX_IDS', 100))
+            except ValueError as e:
+                return make_response(jsonify({'status': 'error', 'message': str(e)}), 400)
+            users = [user for user in get_loader('user').load_many(ids) if user]
+            return make_response(jsonify(users), 200)
+        
         parser = reqparse.RequestParser()
         parser.add_argument('limit', type=int, required=False, default=20, help='Maximum number of users to return')
         parser.add_argument('offset', type=int, required=False, default=0, help='Number of users to skip for pagination')
         args = parser.parse_args()
         
         # Get users
-        users = sql_call_fetch_all('getUsers', (args['limit'], args['offset']))
+        users = sql_call_fetch_all('getUsers', (args['limit'], args['offset']), model=User)
         
         response = make_response(jsonify(users), 200)
         response.headers['Content-Type'] = 'application/json'
         return response
 
 class UserDetail(Resource):
+    @query_budget(1)
     def get(self, userId):
-        user = sql_call_fetch_one('getUserById', (userId,))
+        user = sql_call_fetch_one('getUserById', (userId,), model=User)
         if not user:
             return make_response(jsonify({'status': 'error', 'message': 'User not found'}), 404)
         
@@ -53,29 +69,27 @@ class UserEmail(Resource):
         username = session['username']
         
         # Get user
-        user = sql_call_fetch_one('getUserByUsername', (username,))
+        user = sql_call_fetch_one('getUserByUsername', (username,), model=User)
         
         if not user:
             return make_response(jsonify({'status': 'error', 'message': 'User not found'}), 404)
         
         # Check if the new email is the same as the current one
-        if user.get('email') and user['email'] == email:
+        if user.email and user.email == email:
             return make_response(jsonify({'status': 'error', 'message': 'The email address is the same as your current one'}), 400)
         
         # Check if email already exists for a different user
-        existing_email_user = sql_call_fetch_one('getUserByEmail', (email,))
-        if existing_email_user and existing_email_user['username'] != username:
+        existing_email_user = sql_call_fetch_one('getUserByEmail', (email,), model=User)
+        if existing_email_user and existing_email_user.username != username:
             return make_response(jsonify({'status': 'error', 'message': 'Email address is already in use by another account'}), 400)
         
-        updated_user = sql_call_fetch_one('updateUserEmail', (user['userId'], email))
+        updated_user = sql_call_fetch_one('updateUserEmail', (user.userId, email))
         
         if not updated_user:
             return make_response(jsonify({'status': 'error', 'message': 'Failed to update email'}), 500)
+        publish('user.updated', {'userId': updated_user['userId']})
         
-        from app.utils.helpers import generate_otp
-        otp = generate_otp()
-        
-        sql_call_fetch_one('createVerification', (updated_user['userId'], otp))
+        otp = issue_otp('email', updated_user['userId'])
         
         # Send verification email with OTP
         from app.services.email_service import send_verification_email
@@ -104,7 +118,7 @@ class UserPhone(Resource):
             return make_response(jsonify({'status': 'error', 'message': 'Phone number must be in format (e.g., +1234567890)'}), 400)
         
         username = session['username']
-        user = sql_call_fetch_one('getUserByUsername', (username,))
+        user = sql_call_fetch_one('getUserByUsername', (username,), model=User)
         
         if not user:
             return make_response(jsonify({'status': 'error', 'message': 'User not found'}), 404)
@@ -116,19 +130,16 @@ class UserPhone(Resource):
             }), 400)
         
         # Check if the new phone number is the same as the current one
-        if user.get('phone_number') and user['phone_number'] == phone:
+        if user.phone_number and user.phone_number == phone:
             return make_response(jsonify({'status': 'error', 'message': 'The phone number is the same as your current one'}), 400)
         
-        updated_user = sql_call_fetch_one('updateUserPhone', (user['userId'], phone))
+        updated_user = sql_call_fetch_one('updateUserPhone', (user.userId, phone))
         
         if not updated_user:
             return make_response(jsonify({'status': 'error', 'message': 'Failed to update phone number'}), 500)
+        publish('user.updated', {'userId': updated_user['userId']})
         
-        from app.utils.helpers import generate_otp
-        otp = generate_otp()
-        
-        # Store OTP
-        sql_call_fetch_one('createMobileVerification', (updated_user['userId'], otp))
+        otp = issue_otp('mobile', updated_user['userId'])
         
         # Check if SMS is enabled
         from app.services.sms_service import send_verification_sms, is_sms_enabled
@@ -141,9 +152,10 @@ class UserPhone(Resource):
         return make_response(jsonify(response_data), 200)
     
 class UserBlogList(Resource):
+    @query_budget(2)
     def get(self, userId):
         # Check if user exists
-        user = sql_call_fetch_one('getUserById', (userId,))
+        user = sql_call_fetch_one('getUserById', (userId,), model=User)
         if not user:
             return make_response(jsonify({'status': 'error', 'message': 'User not found'}), 404)
         newer_than = request.args.get('newerThan')
@@ -158,7 +170,7 @@ class UserBlogList(Resource):
                 return make_response(jsonify({'status': 'error', 'message': 'Invalid date format. Use YYYY-MM-DD'}), 400)
         
         # Get blogs
-        blogs = sql_call_fetch_all('getBlogsByUserId', (userId, newer_than, limit, offset))
+        blogs = sql_call_fetch_all('getBlogsByUserId', (userId, newer_than, limit, offset), model=Blog)
         
         response = make_response(jsonify(blogs), 200)
         response.headers['Content-Type'] = 'application/json'
@@ -169,13 +181,13 @@ class UserNotificationPreferences(Resource):
     def get(self):
         # Get user
         username = session['username']
-        user = sql_call_fetch_one('getUserByUsername', (username,))
+        user = sql_call_fetch_one('getUserByUsername', (username,), model=User)
         
         if not user:
             return make_response(jsonify({'status': 'error', 'message': 'User not found'}), 404)
         
         # Get notification preferences
-        prefs = sql_call_fetch_one('getUserNotificationPreferences', (user['userId'],))
+        prefs = sql_call_fetch_one('getUserNotificationPreferences', (user.userId,), model=NotificationPreference)
         
         response = make_response(jsonify(prefs), 200)
         response.headers['Content-Type'] = 'application/json'
@@ -193,19 +205,20 @@ class UserNotificationPreferences(Resource):
         
         # Get user
         username = session['username']
-        user = sql_call_fetch_one('getUserByUsername', (username,))
+        user = sql_call_fetch_one('getUserByUsername', (username,), model=User)
         
         if not user:
             return make_response(jsonify({'status': 'error', 'message': 'User not found'}), 404)
         
         # Update notification preferenc
         prefs = sql_call_fetch_one('updateNotificationPreferences', (
-            user['userId'], 
+            user.userId, 
             args['notifyOnBlog'],
             args['notifyOnComment']
         ))
         
         if not prefs:
             return make_response(jsonify({'status': 'error', 'message': 'Failed to update notification preferences'}), 500)
+        publish('user.updated', {'userId': user.userId})
         
         return make_response(jsonify(prefs), 200)
\ No newline at end of file
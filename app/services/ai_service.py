@@ -1,34 +1,99 @@
 import requests
 import json
+import hashlib
+import threading
+from datetime import date
 from flask import current_app
 import sys
 
-def generate_content(prompt, mode='generate', content=None):
-    # Generate content using the Gemini API
+from app.utils.cache import TTLCache, SingleFlight
+from app.utils.metrics import external_call
+
+# Cache of successful generations, keyed by a hash of the request
+_cache = None
+_cache_lock = threading.Lock()
+
+# Identical in-flight requests share a single upstream call
+_flights = SingleFlight()
+
+# Upstream calls per user for the current day
+_quota_usage = {}
+_quota_lock = threading.Lock()
+
+def _get_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = TTLCache(
+                max_entries=current_app.config.get('AI_CACHE_MAX_ENTRIES', 512),
+                ttl=current_app.config.get('AI_CACHE_TTL', 3600)
+            )
+        return _cache
+
+def cache_key(mode, prompt, content, model_url):
+    """Content-addressed key for a generation request"""
+    raw = json.dumps([mode, prompt, content, model_url], ensure_ascii=False)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+def get_quota_remaining(username):
+    """Number of upstream AI calls the user has left today, or None if unlimited"""
+    limit = current_app.config.get('AI_DAILY_QUOTA', 0)
+    if not limit or not username:
+        return None
+
+    with _quota_lock:
+        day, used = _quota_usage.get(username, (None, 0))
+        if day != date.today():
+            used = 0
+    return max(limit - used, 0)
+
+def _reserve_quota(username):
+    """Take one call from the user's quota before going upstream; False if none are left"""
+    limit = current_app.config.get('AI_DAILY_QUOTA', 0)
+    if not limit or not username:
+        return True
+
+    # Checked and charged under one lock, so concurrent requests cannot overrun the quota
+    with _quota_lock:
+        today = date.today()
+        day, used = _quota_usage.get(username, (None, 0))
+        if day != today:
+            # Drop stale days so the table does not grow forever
+            for name in [n for n, (d, _) in _quota_usage.items() if d != today]:
+                del _quota_usage[name]
+            used = 0
+        if used >= limit:
+            return False
+        _quota_usage[username] = (today, used + 1)
+        return True
+
+def _refund_quota(username):
+    """Give back a reserved call that did not end up costing anything"""
+    with _quota_lock:
+        day, used = _quota_usage.get(username, (None, 0))
+        if day == date.today() and used > 0:
+            _quota_usage[username] = (day, used - 1)
+
+def _call_gemini(full_prompt):
+    # Call the Gemini API once
     try:
-        # Prepare the prompt based on the mode
-        if mode == 'enhance' and content:
-            full_prompt = f"Improve this blog content while preserving the main ideas: {content}\n\nEnhancement instructions: {prompt}"
-        else:
-            full_prompt = f"{prompt} in paragraphs"
-        
-        # Call Gemini API
         payload = {
             "contents": [{
                 "parts": [{"text": full_prompt}]
             }]
         }
-        
+
         headers = {
             'Content-Type': 'application/json'
         }
-        
+
         # API KEY
         url = f"{current_app.config['GEMINI_API_URL']}?key={current_app.config['GEMINI_API_KEY']}"
-        
-        response = requests.post(url, headers=headers, json=payload)
-        response_json = response.json()
-        
+
+        with external_call('gemini'):
+            response = requests.post(url, headers=headers, json=payload)
+            response_json = response.json()
+
         # Extract the generated text from RESPoNSE
         if 'candidates' in response_json and response_json['candidates']:
             generated_text = response_json['candidates'][0]['content']['parts'][0]['text']
@@ -48,4 +113,37 @@ def generate_content(prompt, mode='generate', content=None):
         return {
             'status': 'error',
             'message': f'Error calling Gemini API: {str(e)}'
-        }
\ No newline at end of file
+        }
+
+def generate_content(prompt, mode='generate', content=None, username=None):
+    # Generate content using the Gemini API
+    # Prepare the prompt based on the mode
+    if mode == 'enhance' and content:
+        full_prompt = f"Improve this blog content while preserving the main ideas: {content}\n\nEnhancement instructions: {prompt}"
+    else:
+        full_prompt = f"{prompt} in paragraphs"
+
+    key = cache_key(mode, prompt, content, current_app.config['GEMINI_API_URL'])
+    cache = _get_cache()
+
+    cached = cache.get(key)
+    if cached is not None:
+        return dict(cached)
+
+    if not _reserve_quota(username):
+        return {
+            'status': 'error',
+            'message': 'Daily AI generation quota exceeded. Please try again tomorrow.',
+            'quotaExceeded': True
+        }
+
+    # _call_gemini reports failures in its result rather than raising
+    result, shared = _flights.do(key, lambda: _call_gemini(full_prompt))
+
+    if not shared and result.get('status') == 'success':
+        cache.set(key, result)
+    else:
+        # Only a successful call this request made itself counts against the quota
+        _refund_quota(username)
+
+    return dict(result)
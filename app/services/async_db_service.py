@@ -0,0 +1,82 @@
+import sys
+import time
+from contextvars import ContextVar
+
+from app.utils.metrics import record_db_call
+
+# For the ASGI serving mode - handle missing aiomysql package
+try:
+    import aiomysql
+    AIOMYSQL_AVAILABLE = True
+except ImportError:
+    AIOMYSQL_AVAILABLE = False
+    print("Warning: aiomysql package not installed. Async serving mode will be disabled.", file=sys.stderr)
+
+_pool = None
+
+# {'calls', 'seconds'} of the request being handled, set per request by AsgiApp
+request_db_stats = ContextVar('request_db_stats', default=None)
+
+async def init_pool(config):
+    """Create the shared connection pool used by the async handlers"""
+    global _pool
+    if not AIOMYSQL_AVAILABLE:
+        raise RuntimeError("aiomysql is required for the async serving mode")
+
+    if _pool is None:
+        _pool = await aiomysql.create_pool(
+            host=config['DB_HOST'],
+            port=config.get('DB_PORT', 3306),
+            user=config['DB_USER'],
+            password=config['DB_PASSWD'],
+            db=config['DB_DATABASE'],
+            charset='utf8mb4',
+            minsize=config.get('ASGI_DB_POOL_MIN', 1),
+            maxsize=config.get('ASGI_DB_POOL_MAX', 20),
+            pool_recycle=config.get('ASGI_DB_POOL_RECYCLE', 3600),
+            autocommit=False
+        )
+    return _pool
+
+async def close_pool():
+    global _pool
+    if _pool is not None:
+        _pool.close()
+        await _pool.wait_closed()
+        _pool = None
+
+# {'calls', 'seconds'} of the request being handled, set per request by AsgiApp
+request_db_stats = ContextVar('request_db_stats', default=None)
+
+async def _call(proc_name, args, fetch):
+    if _pool is None:
+        raise RuntimeError("Async database pool has not been initialised")
+
+    started = time.perf_counter()
+    failed = False
+    try:
+        async with _pool.acquire() as db_connection:
+            # Closing the cursor drains the extra result sets CALL leaves behind,
+            # which keeps pooled connections in sync
+            async with db_connection.cursor(aiomysql.DictCursor) as cursor:
+                await cursor.callproc(proc_name, args if args is not None else ())
+                result = await fetch(cursor)
+                await db_connection.commit()
+                return result
+    except Exception as e:
+        failed = True
+        print(f"Database error: {e}", file=sys.stderr)
+        raise
+    finally:
+        seconds = time.perf_counter() - started
+        record_db_call(proc_name, seconds, failed)
+        stats = request_db_stats.get()
+        if stats is not None:
+            stats['calls'] += 1
+            stats['seconds'] += seconds
+
+async def sql_call_fetch_all(proc_name, args=None):
+    return await _call(proc_name, args, lambda cursor: cursor.fetchall())
+
+async def sql_call_fetch_one(proc_name, args=None):
+    return await _call(proc_name, args, lambda cursor: cursor.fetchone())
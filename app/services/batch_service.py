@@ -0,0 +1,186 @@
+import json
+
+from flask import current_app
+
+from app.services.db_service import sql_call_fetch_all, sql_transaction, insert_rows
+from app.services.email_service import send_blog_digest, send_comment_digest
+from app.services.sanitize_service import sanitize_many
+from app.services.event_service import publish
+from app.utils.helpers import sanitize_string
+from app.utils.loader import get_loader
+
+class BatchError(ValueError):
+    """The batch as a whole is unusable (not a list, empty, too large)"""
+
+def _batch_items(data):
+    # Accept either {"items": [...]} or a bare list
+    items = data.get('items') if isinstance(data, dict) else data
+    if not isinstance(items, list) or not items:
+        raise BatchError('A non-empty list of items is required')
+
+    max_items = current_app.config.get('BATCH_MAX_ITEMS', 100)
+    if len(items) > max_items:
+        raise BatchError(f"At most {max_items} items can be sent in one batch")
+    return items
+
+def _error(index, message):
+    return {'index': index, 'status': 'error', 'message': message}
+
+def _as_id(value):
+    if isinstance(value, bool):
+        return None
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        return None
+    return value if value > 0 else None
+
+def _in_id_order(rows, key, ids):
+    # Rows read back after an insert, matched to the new ids rather than trusted by position
+    by_id = {row[key]: row for row in rows}
+    missing = [row_id for row_id in ids if row_id not in by_id]
+    if missing:
+        raise LookupError(f"Inserted rows {missing} could not be read back")
+    return [by_id[row_id] for row_id in ids]
+
+def create_blogs(user, data):
+    """Validate, sanitize and insert a batch of blogs in one transaction.
+
+    Returns a list with one result per item, in request order. Subscribers get a
+    single digest email for the whole batch instead of one email per blog.
+    """
+    items = _batch_items(data)
+    results = [None] * len(items)
+    valid = []
+
+    for index, item in enumerate(items):
+        if not isinstance(item, dict) or not item.get('title') or not item.get('content'):
+            results[index] = _error(index, 'Title and content are required')
+            continue
+        valid.append((index, item))
+
+    # Bodies are sanitized together so large ones are cleaned in parallel
+    contents = sanitize_many([str(item['content']) for _, item in valid])
+    pending = []
+    for (index, item), content in zip(valid, contents):
+        title = sanitize_string(str(item['title']))
+        if not title or not content:
+            results[index] = _error(index, 'Title and content are required after sanitization')
+            continue
+
+        pending.append((index, (title, content, user['userId'])))
+
+    if not pending:
+        return results
+
+    with sql_transaction('batchCreateBlogs') as cursor:
+        ids = insert_rows(cursor, 'blogs', ('title', 'content', 'userId'), [row for _, row in pending],
+                          key='blogId')
+        cursor.callproc('getBlogsByIds', (json.dumps(ids),))
+        blogs = _in_id_order(cursor.fetchall(), 'blogId', ids)
+
+    for (index, _), blog in zip(pending, blogs):
+        results[index] = {'index': index, 'status': 'created', 'blog': blog}
+        publish('blog.created', blog)
+
+    subscribers = [u['email'] for u in sql_call_fetch_all('getBlogSubscribers', (user['userId'],))]
+    if subscribers:
+        send_blog_digest(blogs, user['username'], subscribers)
+
+    return results
+
+def create_comments(user, data):
+    """Validate, sanitize and insert a batch of comments and replies in one transaction.
+
+    Each item has content plus either a blogId or a parentCommentId. Blog and
+    parent comment authors get one digest email each covering every new comment
+    that concerns them.
+    """
+    items = _batch_items(data)
+    results = [None] * len(items)
+    valid = []
+
+    for index, item in enumerate(items):
+        if not isinstance(item, dict) or not item.get('content'):
+            results[index] = _error(index, 'Content is required')
+            continue
+
+        blog_id = _as_id(item.get('blogId'))
+        parent_id = _as_id(item.get('parentCommentId'))
+        if blog_id is None and parent_id is None:
+            results[index] = _error(index, 'A blogId or parentCommentId is required')
+            continue
+
+        valid.append((index, blog_id, parent_id, str(item['content'])))
+
+    parsed = []
+    contents = sanitize_many([content for _, _, _, content in valid])
+    for (index, blog_id, parent_id, _), content in zip(valid, contents):
+        if not content:
+            results[index] = _error(index, 'Content is required after sanitization')
+            continue
+        parsed.append((index, blog_id, parent_id, content))
+
+    if not parsed:
+        return results
+
+    # Look up every referenced parent comment and blog with one call each
+    parent_ids = [parent_id for _, _, parent_id, _ in parsed if parent_id]
+    parents = {c['commentId']: c for c in get_loader('comment').load_many(parent_ids) if c}
+
+    resolved = []
+    for index, blog_id, parent_id, content in parsed:
+        if parent_id:
+            parent = parents.get(parent_id)
+            if not parent:
+                results[index] = _error(index, 'Comment not found')
+                continue
+            if blog_id and blog_id != parent['blogId']:
+                results[index] = _error(index, 'Parent comment belongs to a different blog')
+                continue
+            blog_id = parent['blogId']
+        resolved.append((index, blog_id, parent_id, content))
+
+    blog_ids = [blog_id for _, blog_id, _, _ in resolved]
+    blogs = {b['blogId']: b for b in get_loader('blog').load_many(blog_ids) if b}
+
+    pending = []
+    for index, blog_id, parent_id, content in resolved:
+        if blog_id not in blogs:
+            results[index] = _error(index, 'Blog not found')
+            continue
+        pending.append((index, (content, user['userId'], blog_id, parent_id)))
+
+    if not pending:
+        return results
+
+    with sql_transaction('batchCreateComments') as cursor:
+        ids = insert_rows(cursor, 'comments', ('content', 'userId', 'blogId', 'parentCommentId'),
+                          [row for _, row in pending], key='commentId')
+        cursor.callproc('getCommentsByIds', (json.dumps(ids),))
+        comments = _in_id_order(cursor.fetchall(), 'commentId', ids)
+
+    for (index, _), comment in zip(pending, comments):
+        results[index] = {'index': index, 'status': 'created', 'comment': comment}
+        publish('comment.created', comment)
+
+    _notify_comment_recipients(user, comments, blogs, parents)
+    return results
+
+def _notify_comment_recipients(user, comments, blogs, parents):
+    # Replies notify the parent comment's author, top-level comments the blog's author
+    entries_by_user = {}
+    for comment in comments:
+        if comment['parentCommentId']:
+            recipient_id = parents[comment['parentCommentId']]['userId']
+        else:
+            recipient_id = blogs[comment['blogId']]['userId']
+        if recipient_id != user['userId']:
+            entries_by_user.setdefault(recipient_id, []).append((comment, blogs[comment['blogId']]['title']))
+
+    if not entries_by_user:
+        return
+
+    recipients = sql_call_fetch_all('getCommentSubscribers', (json.dumps(list(entries_by_user)),))
+    for recipient in recipients:
+        send_comment_digest(recipient['email'], user['username'], entries_by_user[recipient['userId']])
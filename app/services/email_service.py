@@ -6,6 +6,8 @@ from flask import current_app
 import sys
 import textwrap
 
+from app.utils.metrics import external_call
+
 def send_email(to_email, subject, body):
     """Generic email sending function"""
     if not to_email:
@@ -30,11 +32,12 @@ def send_email(to_email, subject, body):
     def send_email_thread():
         with app_context.app_context():
             try:
-                server = smtplib.SMTP(smtp_server, smtp_port)
-                server.starttls()
-                server.login(smtp_username, smtp_password)
-                server.send_message(msg)
-                server.quit()
+                with external_call('smtp'):
+                    server = smtplib.SMTP(smtp_server, smtp_port)
+                    server.starttls()
+                    server.login(smtp_username, smtp_password)
+                    server.send_message(msg)
+                    server.quit()
                 print(f"Email sent to {to_email}")
                 return True
             except Exception as e:
@@ -159,4 +162,75 @@ def send_comment_notification(comment, blog_title, comment_author, blog_author_e
     # Start the sending
     thread = threading.Thread(target=send_notification_thread)
     thread.start()
-    return True
\ No newline at end of file
+    return True
+
+def send_blog_digest(blogs, author_name, subscribers):
+    """One email per subscriber covering every blog in a batch"""
+    if not blogs or not subscribers:
+        return
+    
+    if len(blogs) == 1:
+        return send_blog_notification(blogs[0], author_name, subscribers)
+    
+    app_context = current_app._get_current_object()
+    
+    def send_digest_thread():
+        with app_context.app_context():
+            try:
+                subject = f"{len(blogs)} New Blog Posts from {author_name}"
+                posts = "\n\n".join(f"{blog['title']}\n{blog['content'][:200]}..." for blog in blogs)
+                body = textwrap.dedent("""
+                Hi there,
+                
+                {author_name} just published {count} new blog posts:
+                
+                {posts}
+                
+                Visit our blog service to read the full posts.
+                
+                To manage your notification preferences, visit your profile page.
+                
+                Best regards,
+                The Blog Service Team
+                """).strip().format(author_name=author_name, count=len(blogs), posts=posts)
+                
+                for subscriber_email in subscribers:
+                    send_email(subscriber_email, subject, body)
+                return True
+            except Exception as e:
+                print(f"Failed to send blog digest: {e}", file=sys.stderr)
+                return False
+    
+    thread = threading.Thread(target=send_digest_thread)
+    thread.start()
+    return True
+
+def send_comment_digest(recipient_email, comment_author, entries):
+    """One email for all the new comments in a batch that concern a recipient.
+    entries is a list of (comment, blog_title) pairs."""
+    if not recipient_email or not entries:
+        return
+    
+    if len(entries) == 1:
+        comment, blog_title = entries[0]
+        return send_comment_notification(comment, blog_title, comment_author, recipient_email)
+    
+    subject = f"{len(entries)} New Comments from {comment_author}"
+    comments = "\n\n".join(f"On \"{blog_title}\":\n\"{comment['content'][:200]}\"" for comment, blog_title in entries)
+    body = textwrap.dedent("""
+    Hi there,
+    
+    {comment_author} left {count} new comments on your posts and comments:
+    
+    {comments}
+    
+    Visit our blog service to view the comments and respond.
+    
+    To manage your notification preferences, visit your profile page.
+    
+    Best regards,
+    The Blog Service Team
+    """).strip().format(comment_author=comment_author, count=len(entries), comments=comments)
+    
+    # send_email already hands the SMTP work to a background thread
+    return send_email(recipient_email, subject, body)
@@ -0,0 +1,316 @@
+import sqlite3
+import sys
+import threading
+import time
+from collections import deque
+
+from flask import current_app
+
+from app.utils.helpers import instance_file
+from app.utils.json_provider import dumps_bytes, loads
+from app.utils.lifecycle import on_worker_start, on_worker_exit
+from app.utils.redis_client import RedisConnection, RedisClient, RedisError
+
+# Event bus shared by every worker, so a write handled by one process reaches
+# the caches and live streams of all the others.
+#
+# Routes publish to topics named <kind>.<change>:
+#     blog.created      blog.updated      blog.deleted
+#     comment.created   comment.updated   comment.deleted
+#     user.created      user.updated      user.verified
+# Created and updated events carry the row, deleted ones its id (plus blogId for
+# comments); user events only carry ids. Subscribers register a topic or a prefix
+# ('comment.*') and are called as handler(event_id, topic, data) on the bus
+# thread, one event at a time in id order, so they must be quick.
+#
+# Backends:
+#     inproc - publish() calls this process's subscribers directly (one worker)
+#     sqlite - an append-only SQLite (WAL) log polled by every worker on the host
+#     redis  - Redis pub/sub, for workers spread over several hosts
+
+def _matches(pattern, topic):
+    if pattern.endswith('*'):
+        return topic.startswith(pattern[:-1])
+    return topic == pattern
+
+class _Bus:
+    """Subscriber dispatch plus a ring of recent events for replays"""
+
+    def __init__(self, buffer_size=1000):
+        self.latest_id = 0
+        self._handlers = []
+        self._recent = deque(maxlen=buffer_size)
+        self._dropped_upto = 0
+        self._lock = threading.Lock()
+
+    def subscribe(self, pattern, handler):
+        self._handlers.append((pattern, handler))
+
+    def _dispatch(self, event_id, topic, data):
+        with self._lock:
+            if len(self._recent) == self._recent.maxlen:
+                self._dropped_upto = self._recent[0][0]
+            self._recent.append((event_id, topic, data))
+            self.latest_id = max(self.latest_id, event_id)
+        for pattern, handler in self._handlers:
+            if _matches(pattern, topic):
+                try:
+                    handler(event_id, topic, data)
+                except Exception as e:
+                    print(f"Event handler {getattr(handler, '__name__', handler)} failed on {topic}: {e}",
+                          file=sys.stderr)
+
+    def replay(self, pattern, last_id):
+        """(events after last_id matching pattern, complete) where complete is False if some are gone"""
+        with self._lock:
+            recent = list(self._recent)
+            complete = last_id >= self._dropped_upto
+        return [e for e in recent if e[0] > last_id and _matches(pattern, e[1])], complete
+
+    def close(self):
+        pass
+
+class InProcessBus(_Bus):
+    """Events never leave this process: fine for a single worker"""
+
+    def __init__(self, buffer_size=1000):
+        super().__init__(buffer_size)
+        self._publish_lock = threading.Lock()
+        self._next_id = 0
+
+    def publish(self, topic, data):
+        # Held while dispatching so subscribers see ids in order
+        with self._publish_lock:
+            self._next_id += 1
+            self._dispatch(self._next_id, topic, data)
+            return self._next_id
+
+class SQLiteBus(_Bus):
+    """
+    A shared append-only SQLite log in WAL mode: every worker on the host polls
+    it and dispatches new rows to its own subscribers, including the worker that
+    published them. Rows older than `retention` seconds are pruned by the pollers.
+    """
+
+    def __init__(self, path, poll_interval=0.5, retention=3600, buffer_size=1000):
+        super().__init__(buffer_size)
+        self.path = path
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self._local = threading.local()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+
+        db = self._connect()
+        try:
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('''CREATE TABLE IF NOT EXISTS events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                topic TEXT NOT NULL,
+                data BLOB NOT NULL,
+                created REAL NOT NULL)''')
+            row = db.execute('SELECT MAX(id) FROM events').fetchone()
+        finally:
+            db.close()
+        # Subscribers only hear about what is published from now on
+        self.latest_id = row[0] or 0
+
+        self._thread = threading.Thread(target=self._poll_loop, name='event-bus-sqlite', daemon=True)
+        self._thread.start()
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        db.execute('PRAGMA synchronous=NORMAL')
+        return db
+
+    def _db(self):
+        # sqlite3 connections may not be shared between threads
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = self._local.db = self._connect()
+        return db
+
+    def publish(self, topic, data):
+        cursor = self._db().execute('INSERT INTO events (topic, data, created) VALUES (?, ?, ?)',
+                                    (topic, dumps_bytes(data), time.time()))
+        # Local subscribers hear about it on the next poll, which starts right away
+        self._wake.set()
+        return cursor.lastrowid
+
+    def replay(self, pattern, last_id):
+        # The log outlives any one worker's ring buffer, so resume from it directly
+        db = self._db()
+        if pattern.endswith('*'):
+            where, params = 'substr(topic, 1, ?) = ?', (len(pattern) - 1, pattern[:-1])
+        else:
+            where, params = 'topic = ?', (pattern,)
+        rows = db.execute(f'SELECT id, topic, data FROM events WHERE id > ? AND {where} ORDER BY id',
+                          (last_id, *params)).fetchall()
+        oldest = db.execute('SELECT MIN(id) FROM events').fetchone()[0]
+        if oldest is None:
+            # Everything was pruned, anything up to the last id ever handed out is gone
+            seq = db.execute("SELECT seq FROM sqlite_sequence WHERE name = 'events'").fetchone()
+            oldest = (seq[0] if seq else 0) + 1
+        complete = last_id >= oldest - 1
+        return [(event_id, topic, loads(data)) for event_id, topic, data in rows], complete
+
+    def _poll_loop(self):
+        last_prune = 0
+        while not self._stop.is_set():
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            try:
+                rows = self._db().execute('SELECT id, topic, data FROM events WHERE id > ? ORDER BY id',
+                                          (self.latest_id,)).fetchall()
+                for event_id, topic, data in rows:
+                    self._dispatch(event_id, topic, loads(data))
+
+                if time.monotonic() - last_prune > 60:
+                    last_prune = time.monotonic()
+                    self._db().execute('DELETE FROM events WHERE created < ?', (time.time() - self.retention,))
+            except sqlite3.Error as e:
+                print(f"Event log poll failed: {e}", file=sys.stderr)
+
+    def close(self):
+        self._stop.set()
+        self._wake.set()
+
+# Allocating the id and publishing in one script keeps ids in delivery order
+_PUBLISH_SCRIPT = """
+local id = redis.call('INCR', KEYS[1])
+redis.call('PUBLISH', ARGV[1], id .. ' ' .. ARGV[2])
+return id
+"""
+
+# Ids must never go backwards, even if Redis lost the counter in a restart
+_SYNC_SCRIPT = """
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local floor = tonumber(ARGV[1])
+if current < floor then
+    redis.call('SET', KEYS[1], floor)
+    current = floor
+end
+return current
+"""
+
+class RedisBus(_Bus):
+    """
+    Redis pub/sub on one channel per topic. Delivery is at most once: events
+    published while a worker is disconnected are lost to it, and replays over
+    that gap report it as incomplete.
+    """
+
+    def __init__(self, url, channel_prefix='blog-service:', buffer_size=1000):
+        super().__init__(buffer_size)
+        self.url = url
+        self.channel_prefix = channel_prefix
+        self._counter_key = f"{channel_prefix}event-id"
+        self._client = RedisClient(url)
+        self._listener = None
+        self._stop = threading.Event()
+
+        self._thread = threading.Thread(target=self._listen_loop, name='event-bus-redis', daemon=True)
+        self._thread.start()
+
+    def publish(self, topic, data):
+        return self._client.command('EVAL', _PUBLISH_SCRIPT, 1, self._counter_key,
+                             self.channel_prefix + topic, dumps_bytes(data))
+
+    def _mark_gap(self, upto):
+        with self._lock:
+            if upto > self.latest_id:
+                self._dropped_upto = max(self._dropped_upto, upto)
+                self.latest_id = upto
+
+    def _listen_loop(self):
+        backoff = 1
+        while not self._stop.is_set():
+            conn = None
+            try:
+                conn = self._listener = RedisConnection(self.url)
+                conn.command('PSUBSCRIBE', self.channel_prefix + '*')
+                conn.sock.settimeout(None)
+                # Subscribed first, so anything after this id is delivered
+                self._mark_gap(self._client.command('EVAL', _SYNC_SCRIPT, 1, self._counter_key, self.latest_id))
+                backoff = 1
+
+                prefix_length = len(self.channel_prefix)
+                while True:
+                    message = conn.read()
+                    if message[0] != b'pmessage':
+                        continue
+                    event_id, _, data = message[3].partition(b' ')
+                    self._dispatch(int(event_id), message[2][prefix_length:].decode(), loads(data))
+            except (OSError, RedisError, ValueError) as e:
+                if self._stop.is_set():
+                    return
+                print(f"Event bus Redis connection failed ({e}), retrying in {backoff}s", file=sys.stderr)
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, 30)
+            finally:
+                if conn is not None:
+                    conn.close()
+
+    def close(self):
+        self._stop.set()
+        if self._listener is not None:
+            self._listener.close()
+        self._client.close()
+
+_bus = None
+_bus_lock = threading.Lock()
+_app = None
+
+def init_event_bus(app):
+    """Remember the app, so workers can join the bus before their first request"""
+    global _app
+    _app = app
+
+def _create_bus(app):
+    config = app.config
+    backend = config.get('EVENT_BUS_BACKEND', 'sqlite')
+    buffer_size = config.get('EVENT_BUS_BUFFER_SIZE', 1000)
+    if backend == 'sqlite':
+        return SQLiteBus(instance_file(app, 'EVENT_BUS_SQLITE_PATH', 'event-bus.db'), poll_interval=config.get('EVENT_BUS_POLL_INTERVAL', 0.5),
+                         retention=config.get('EVENT_BUS_RETENTION_SECONDS', 3600), buffer_size=buffer_size)
+    if backend == 'redis':
+        return RedisBus(config.get('EVENT_BUS_REDIS_URL', 'redis://localhost:6379/0'),
+                        channel_prefix=config.get('EVENT_BUS_CHANNEL_PREFIX', 'blog-service:'),
+                        buffer_size=buffer_size)
+    if backend == 'inproc':
+        return InProcessBus(buffer_size=buffer_size)
+    raise ValueError(f"Unknown EVENT_BUS_BACKEND: {backend}")
+
+def get_bus():
+    """This process's bus, created on first use (i.e. inside the serving worker)"""
+    global _bus
+    if _bus is None:
+        with _bus_lock:
+            if _bus is None:
+                _bus = _create_bus(_app if _app is not None else current_app._get_current_object())
+    return _bus
+
+@on_worker_start
+def start_bus():
+    # A worker that never publishes must still hear about other workers' writes
+    if _app is not None:
+        get_bus()
+
+@on_worker_exit
+def close_bus():
+    global _bus
+    with _bus_lock:
+        if _bus is not None:
+            _bus.close()
+            _bus = None
+
+def subscribe(pattern, handler):
+    get_bus().subscribe(pattern, handler)
+
+def publish(topic, data):
+    """Publish an event, never letting a broken bus fail the write that caused it"""
+    try:
+        return get_bus().publish(topic, data)
+    except Exception as e:
+        print(f"Failed to publish {topic}: {e}", file=sys.stderr)
+        return None
@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta, timezone
+
+from app.models.blog import Blog, Comment
+from app.services.db_service import sql_call_stream
+from app.utils.json_provider import dumps_bytes
+
+EXPORT_VERSION = 1
+
+def parse_export_date(value):
+    """YYYY-MM-DD, or None when the filter was not given"""
+    if not value:
+        return None
+    return datetime.strptime(value, '%Y-%m-%d')
+
+def _line(obj):
+    return dumps_bytes(obj) + b'\n'
+
+def export_lines(user_id=None, date_from=None, date_to=None):
+    """
+    Yield the export as NDJSON lines: a header, then every blog followed by its
+    comments (parents before replies), then a footer with the counts.
+
+    Blogs and comments come from two unbuffered cursors read side by side, both
+    ordered by blogId, so only the current row of each is ever held in memory.
+    date_to is inclusive.
+    """
+    # The procedures take an exclusive upper bound
+    date_to_exclusive = date_to + timedelta(days=1) if date_to else None
+    args = (user_id, date_from, date_to_exclusive)
+
+    yield _line({
+        'type': 'export',
+        'version': EXPORT_VERSION,
+        'generatedAt': datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'filters': {
+            'userId': user_id,
+            'from': date_from.strftime('%Y-%m-%d') if date_from else None,
+            'to': date_to.strftime('%Y-%m-%d') if date_to else None,
+        },
+    })
+
+    blogs = sql_call_stream('exportBlogs', args, model=Blog)
+    comments = sql_call_stream('exportComments', args, model=Comment)
+    blog_count = comment_count = 0
+    try:
+        comment = next(comments, None)
+        for blog in blogs:
+            blog_count += 1
+            yield _line({'type': 'blog', **blog.to_dict()})
+
+            # Comments on blogs deleted since the blog cursor passed them are skipped
+            while comment is not None and comment.blogId < blog.blogId:
+                comment = next(comments, None)
+            while comment is not None and comment.blogId == blog.blogId:
+                comment_count += 1
+                yield _line({'type': 'comment', **comment.to_dict()})
+                comment = next(comments, None)
+    finally:
+        # Release both connections even when the client goes away mid-download
+        comments.close()
+        blogs.close()
+
+    yield _line({'type': 'end', 'blogs': blog_count, 'comments': comment_count})
@@ -0,0 +1,434 @@
+import html
+import json
+import os
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from flask import current_app
+
+from app.services.db_service import sql_transaction, insert_rows
+from app.utils.helpers import sanitize_string, sanitize_html
+from app.utils.json_provider import loads
+
+USERNAME_MAX_LENGTH = 25
+# content:encoded holds the post body; excerpt:encoded has the same local name
+WXR_CONTENT_TAG = '{http://purl.org/rss/1.0/modules/content/}encoded'
+
+class ImportSourceError(ValueError):
+    """The source file or checkpoint cannot be used"""
+
+# ---------------------------------------------------------------------------
+# Readers
+#
+# Both yield one record per blog, with that blog's comments attached, so only a
+# single blog and its thread are held in memory at a time:
+#     {'sourceId', 'title', 'content', 'date', 'author',
+#      'comments': [{'sourceId', 'parentSourceId', 'content', 'date', 'author'}]}
+# ---------------------------------------------------------------------------
+
+def detect_format(path):
+    """'wxr' for WordPress-style XML exports, 'ndjson' otherwise"""
+    if path.lower().endswith(('.xml', '.wxr')):
+        return 'wxr'
+    with open(path, 'rb') as f:
+        head = f.read(512).lstrip(b'\xef\xbb\xbf \t\r\n')
+    return 'wxr' if head.startswith(b'<') else 'ndjson'
+
+def read_ndjson(path):
+    """Records from the NDJSON written by `export-content` (or anything shaped like it)"""
+    record = None
+    with open(path, 'rb') as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                obj = loads(line)
+            except ValueError:
+                raise ImportSourceError(f"Line {line_number} is not valid JSON")
+
+            kind = obj.get('type')
+            if kind == 'blog':
+                if record is not None:
+                    yield record
+                record = {
+                    'sourceId': obj.get('blogId'),
+                    'title': obj.get('title'),
+                    'content': obj.get('content'),
+                    'date': obj.get('date'),
+                    'author': obj.get('author'),
+                    'comments': [],
+                }
+            elif kind == 'comment':
+                if record is None or obj.get('blogId') != record['sourceId']:
+                    raise ImportSourceError(f"Line {line_number}: comment does not follow its blog")
+                record['comments'].append({
+                    'sourceId': obj.get('commentId'),
+                    'parentSourceId': obj.get('parentCommentId'),
+                    'content': obj.get('content'),
+                    'date': obj.get('date'),
+                    'author': obj.get('author'),
+                })
+            elif kind == 'export' and obj.get('version', 1) > 1:
+                raise ImportSourceError(f"Unsupported export version {obj['version']}")
+
+    if record is not None:
+        yield record
+
+def _local_name(tag):
+    return tag.rsplit('}', 1)[-1]
+
+def _children(elem):
+    # namespace-agnostic {local name: text}, WXR has used several wp: namespace versions
+    return {_local_name(child.tag): (child.text or '') for child in elem}
+
+def read_wxr(path):
+    """Published posts and approved comments from a WordPress eXtended RSS export"""
+    context = ET.iterparse(path, events=('start', 'end'))
+    _, root = next(context)
+
+    for event, elem in context:
+        if event != 'end' or _local_name(elem.tag) != 'item':
+            continue
+
+        fields = _children(elem)
+        fields['encoded'] = elem.findtext(WXR_CONTENT_TAG, '')
+        if fields.get('post_type', 'post') == 'post' and fields.get('status', 'publish') == 'publish':
+            comments = []
+            for comment in elem:
+                if _local_name(comment.tag) != 'comment':
+                    continue
+                c = _children(comment)
+                if c.get('comment_approved', '1') != '1':
+                    continue
+                comments.append({
+                    'sourceId': c.get('comment_id'),
+                    'parentSourceId': c.get('comment_parent') if c.get('comment_parent') not in (None, '', '0') else None,
+                    'content': c.get('comment_content'),
+                    'date': c.get('comment_date'),
+                    'author': c.get('comment_author'),
+                })
+            yield {
+                'sourceId': fields.get('post_id'),
+                'title': fields.get('title'),
+                'content': fields.get('encoded'),
+                'date': fields.get('post_date'),
+                'author': fields.get('creator'),
+                'comments': comments,
+            }
+
+        # Drop the parsed item, and the root's reference to it, to keep memory flat
+        elem.clear()
+        root.clear()
+
+READERS = {'ndjson': read_ndjson, 'wxr': read_wxr}
+
+# ---------------------------------------------------------------------------
+# Sanitizing (runs in worker processes)
+# ---------------------------------------------------------------------------
+
+def _parse_date(value):
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    # Stored as a naive timestamp to the second, like everything else the app writes
+    return parsed.replace(tzinfo=None, microsecond=0)
+
+def _author(value):
+    value = (value or '').strip()
+    return value[:USERNAME_MAX_LENGTH] or None
+
+def sanitize_record(record):
+    """The same cleaning BlogCreate/BlogCommentCreate apply, or None when the blog is empty afterwards"""
+    # Titles are stored HTML-escaped, unescape first so re-importing an export does not double-escape
+    title = sanitize_string(html.unescape(str(record.get('title') or '')))
+    content = sanitize_html(str(record.get('content') or ''))
+    if not title or not content:
+        return None
+
+    comments = []
+    for comment in record['comments']:
+        comment_content = sanitize_html(str(comment.get('content') or ''))
+        if comment_content:
+            comments.append({
+                'sourceId': comment.get('sourceId'),
+                'parentSourceId': comment.get('parentSourceId'),
+                'content': comment_content,
+                'date': _parse_date(comment.get('date')),
+                'author': _author(comment.get('author')),
+            })
+
+    return {
+        'title': title,
+        'content': content,
+        'date': _parse_date(record.get('date')),
+        'author': _author(record.get('author')),
+        'comments': comments,
+    }
+
+# ---------------------------------------------------------------------------
+# Checkpoint
+# ---------------------------------------------------------------------------
+
+def load_checkpoint(checkpoint_path, source_path):
+    if not checkpoint_path or not os.path.exists(checkpoint_path):
+        return None
+    with open(checkpoint_path) as f:
+        checkpoint = json.load(f)
+    if checkpoint.get('source') != os.path.abspath(source_path) or checkpoint.get('size') != os.path.getsize(source_path):
+        raise ImportSourceError(f"{checkpoint_path} belongs to a different file, remove it to start over")
+    return checkpoint
+
+def save_checkpoint(checkpoint_path, checkpoint):
+    # Written to a temporary file first so a crash never leaves a half-written checkpoint
+    temp_path = checkpoint_path + '.tmp'
+    with open(temp_path, 'w') as f:
+        json.dump(checkpoint, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, checkpoint_path)
+
+def _advance(checkpoint, count, result):
+    done = dict(checkpoint, recordsDone=checkpoint['recordsDone'] + count)
+    for key in ('blogs', 'comments', 'skipped', 'usersCreated'):
+        done[key] += result[key]
+    return done
+
+def settle_checkpoint(checkpoint):
+    """Resolve a batch the checkpoint had pending when the import stopped.
+
+    The pending state is saved inside the batch's transaction, just before the
+    commit, together with the last blog it inserted. If that blog is in the
+    database the commit went through and the checkpoint moves past the batch,
+    otherwise the batch is imported again.
+    """
+    pending = checkpoint.pop('pending', None)
+    if pending is None:
+        return checkpoint
+
+    last_blog = pending.pop('lastBlog')
+    if last_blog is None:
+        # Nothing but authors was written, and those are looked up by name again
+        return checkpoint
+    with sql_transaction('importSettle') as cursor:
+        cursor.execute("SELECT blogId FROM blogs WHERE blogId = %s AND userId = %s AND title = %s",
+                       (last_blog['blogId'], last_blog['userId'], last_blog['title']))
+        committed = cursor.fetchone() is not None
+    return pending if committed else checkpoint
+
+# ---------------------------------------------------------------------------
+# Import
+# ---------------------------------------------------------------------------
+
+def _comment_depths(comments):
+    # Replies can only be inserted once their parent has an id, so each comment
+    # gets its depth in the thread; unknown parents (and cycles) start a new thread
+    index_by_source = {c['sourceId']: i for i, c in enumerate(comments) if c['sourceId'] is not None}
+    depths = [None] * len(comments)
+
+    for i in range(len(comments)):
+        chain = []
+        in_chain = set()
+        j = i
+        while j is not None and depths[j] is None and j not in in_chain:
+            chain.append(j)
+            in_chain.add(j)
+            parent = comments[j]['parentSourceId']
+            j = index_by_source.get(parent) if parent is not None else None
+
+        depth = depths[j] + 1 if j is not None and depths[j] is not None else 0
+        for k in reversed(chain):
+            depths[k] = depth
+            depth += 1
+    return depths
+
+class Importer:
+    """
+    Streams blogs and their comment threads from a file into the database.
+
+    Records are sanitized in a process pool one batch ahead of the inserts, and
+    each batch is written in one transaction with multi-row INSERTs: blogs
+    first, then comments one reply depth at a time so parent ids are known.
+    No notification emails are sent. A checkpoint records how many source blogs
+    are done, so an interrupted import resumes where it stopped; it is saved as
+    pending before each commit and confirmed after it, so a crash in between
+    neither loses nor duplicates the batch (see settle_checkpoint).
+    """
+
+    def __init__(self, default_user=None, create_users=False, batch_rows=None, workers=None,
+                 max_statement_bytes=None, progress=None):
+        config = current_app.config
+        self.default_user = default_user
+        self.create_users = create_users
+        self.batch_rows = batch_rows or config.get('IMPORT_BATCH_ROWS', 5000)
+        self.workers = workers if workers is not None else (config.get('IMPORT_WORKERS') or os.cpu_count() or 1)
+        self.max_statement_bytes = max_statement_bytes or config.get('IMPORT_MAX_STATEMENT_BYTES', 4000000)
+        self.progress = progress
+        self._user_ids = {}
+
+    def run(self, path, file_format=None, checkpoint_path=None):
+        file_format = file_format or detect_format(path)
+        if file_format not in READERS:
+            raise ImportSourceError(f"Unknown format {file_format}")
+
+        checkpoint = settle_checkpoint(load_checkpoint(checkpoint_path, path) or {
+            'source': os.path.abspath(path),
+            'size': os.path.getsize(path),
+            'recordsDone': 0,
+            'blogs': 0,
+            'comments': 0,
+            'skipped': 0,
+            'usersCreated': 0,
+        })
+        stats = {'blogs': 0, 'comments': 0, 'skipped': 0, 'usersCreated': 0, 'resumedAt': checkpoint['recordsDone']}
+        started = time.perf_counter()
+
+        records = READERS[file_format](path)
+        # Fast-forward past what an earlier run already committed
+        for _ in range(checkpoint['recordsDone']):
+            if next(records, None) is None:
+                break
+
+        pool = ProcessPoolExecutor(max_workers=self.workers) if self.workers > 1 else None
+        try:
+            pending = self._sanitize(pool, self._next_batch(records))
+            while pending is not None:
+                count, cleaned = pending
+                # Start cleaning the next batch while this one is inserted
+                batch = self._next_batch(records)
+                pending = self._sanitize(pool, batch) if batch else None
+
+                cleaned = list(cleaned)
+                valid = [record for record in cleaned if record is not None]
+                invalid = len(cleaned) - len(valid)
+
+                def before_commit(result):
+                    if checkpoint_path:
+                        pending = dict(_advance(checkpoint, count, result), lastBlog=result['lastBlog'])
+                        save_checkpoint(checkpoint_path, dict(checkpoint, pending=pending))
+
+                result = self._insert(valid, invalid, before_commit) if valid else {
+                    'blogs': 0, 'comments': 0, 'skipped': invalid, 'usersCreated': 0, 'lastBlog': None}
+                result.pop('lastBlog')
+
+                for key in ('blogs', 'comments', 'skipped', 'usersCreated'):
+                    stats[key] += result[key]
+                checkpoint = _advance(checkpoint, count, result)
+                if checkpoint_path:
+                    save_checkpoint(checkpoint_path, checkpoint)
+                if self.progress:
+                    self.progress(self._throughput(stats, started))
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+
+        return self._throughput(stats, started)
+
+    def _next_batch(self, records):
+        # Whole blogs only, until the batch holds about batch_rows blogs + comments
+        batch = []
+        rows = 0
+        for record in records:
+            batch.append(record)
+            rows += 1 + len(record['comments'])
+            if rows >= self.batch_rows:
+                break
+        return batch
+
+    def _sanitize(self, pool, batch):
+        if not batch:
+            return None
+        if pool is None:
+            return len(batch), [sanitize_record(record) for record in batch]
+        chunksize = max(1, len(batch) // (self.workers * 4))
+        return len(batch), pool.map(sanitize_record, batch, chunksize=chunksize)
+
+    def _throughput(self, stats, started):
+        elapsed = time.perf_counter() - started
+        return {
+            **stats,
+            'seconds': round(elapsed, 2),
+            'blogsPerSecond': round(stats['blogs'] / elapsed, 1) if elapsed else 0,
+            'commentsPerSecond': round(stats['comments'] / elapsed, 1) if elapsed else 0,
+        }
+
+    def _resolve_users(self, cursor, records):
+        names = {record['author'] for record in records}
+        names.update(c['author'] for record in records for c in record['comments'])
+        if self.default_user:
+            names.add(self.default_user)
+        names.discard(None)
+
+        missing = [name for name in names if name not in self._user_ids]
+        created = 0
+        if missing:
+            cursor.callproc('getUsersByUsernames', (json.dumps(missing),))
+            for row in cursor.fetchall():
+                self._user_ids[row['username']] = row['userId']
+
+            unknown = [name for name in missing if name not in self._user_ids]
+            if unknown and self.create_users:
+                # New authors get the same defaults createLdapUser gives them on first login
+                ids = insert_rows(cursor, 'users', ('username', 'user_type'), [(name, 'ldap') for name in unknown],
+                                  self.max_statement_bytes, key='userId')
+                insert_rows(cursor, 'notification_preferences', ('userId',), [(user_id,) for user_id in ids],
+                            self.max_statement_bytes)
+                self._user_ids.update(zip(unknown, ids))
+                created = len(unknown)
+
+        if self.default_user and self.default_user not in self._user_ids:
+            raise ImportSourceError(f"Default user {self.default_user} does not exist")
+        return created
+
+    def _user_id(self, author):
+        user_id = self._user_ids.get(author)
+        if user_id is None and self.default_user:
+            user_id = self._user_ids[self.default_user]
+        return user_id
+
+    def _insert(self, records, invalid, before_commit):
+        now = datetime.now().replace(microsecond=0)
+        with sql_transaction('importBatch') as cursor:
+            users_created = self._resolve_users(cursor, records)
+
+            blogs = [record for record in records if self._user_id(record['author']) is not None]
+            blog_ids = insert_rows(
+                cursor, 'blogs', ('title', 'content', 'dateCreated', 'userId'),
+                [(r['title'], r['content'], r['date'] or now, self._user_id(r['author'])) for r in blogs],
+                self.max_statement_bytes, key='blogId'
+            ) if blogs else []
+
+            levels = {}
+            for blog, blog_id in zip(blogs, blog_ids):
+                new_ids = {}
+                for comment, depth in zip(blog['comments'], _comment_depths(blog['comments'])):
+                    if self._user_id(comment['author']) is not None:
+                        levels.setdefault(depth, []).append((comment, blog_id, new_ids))
+
+            comment_count = 0
+            for depth in sorted(levels):
+                level = levels[depth]
+                ids = insert_rows(
+                    cursor, 'comments', ('content', 'dateCreated', 'blogId', 'userId', 'parentCommentId'),
+                    [(c['content'], c['date'] or now, blog_id, self._user_id(c['author']),
+                      new_ids.get(c['parentSourceId']) if depth else None)
+                     for c, blog_id, new_ids in level],
+                    self.max_statement_bytes, key='commentId'
+                )
+                for (c, _, new_ids), comment_id in zip(level, ids):
+                    if c['sourceId'] is not None:
+                        new_ids[c['sourceId']] = comment_id
+                comment_count += len(ids)
+
+            result = {'blogs': len(blog_ids), 'comments': comment_count, 'usersCreated': users_created,
+                      'skipped': invalid + len(records) - len(blogs), 'lastBlog': None}
+            if blogs:
+                result['lastBlog'] = {'blogId': blog_ids[-1], 'userId': self._user_id(blogs[-1]['author']),
+                                      'title': blogs[-1]['title']}
+            before_commit(result)
+
+        return result
@@ -0,0 +1,192 @@
+import os
+import random
+import struct
+import sys
+import threading
+import time
+
+from app.services.db_service import sql_call_fetch_one
+from app.services.otp_service import purge_expired as purge_expired_otps
+from app.utils.helpers import instance_file
+from app.utils.lifecycle import on_worker_start, on_worker_exit
+from app.utils.metrics import registry
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Housekeeping for data that otherwise only grows: expired rows in the MySQL
+# verification tables, abandoned email/phone changes, expired OTP codes and
+# session files. MySQL rows go in chunks of MAINTENANCE_BATCH_SIZE, one short
+# transaction each, so a purge never holds row locks for long.
+#
+# Runs from a per-worker scheduler thread every MAINTENANCE_INTERVAL seconds, or
+# from cron with `flask --app run purge-expired`. A lock file makes sure only one
+# process on the host does a pass at a time, and at most once per interval.
+
+# Tables the purgeExpiredChunk procedure knows, all with an indexed expiresAt
+EXPIRING_TABLES = ('verification', 'mobile_verification', 'password_reset',
+                   'pending_email_changes', 'pending_phone_changes')
+
+RUN_BUCKETS = (0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+class MaintenanceBusy(Exception):
+    """Another process holds the maintenance lock"""
+
+def _lock_path(app):
+    return instance_file(app, 'MAINTENANCE_LOCK_PATH', 'maintenance.lock')
+
+def purge_table(table, batch_size=1000, pause=0.05, deadline=None):
+    """Delete expired rows of one table a chunk at a time; returns the number deleted"""
+    if table not in EXPIRING_TABLES:
+        raise ValueError(f"Not an expiring table: {table}")
+    deleted = 0
+    while True:
+        row = sql_call_fetch_one('purgeExpiredChunk', (table, batch_size))
+        count = row['deletedRows'] if row else 0
+        deleted += count
+        if count < batch_size or (deadline is not None and time.monotonic() >= deadline):
+            return deleted
+        # Let writers waiting on the table in between chunks
+        time.sleep(pause)
+
+def vacuum_sessions(session_dir, session_interface=None):
+    """Remove expired Flask-Session files; returns the number removed"""
+    if not session_dir or not os.path.isdir(session_dir):
+        return 0
+
+    now = time.time()
+    removed = 0
+    remaining = 0
+    with os.scandir(session_dir) as entries:
+        for entry in entries:
+            if not entry.is_file() or entry.name.endswith('__wz_cache_count'):
+                continue
+            try:
+                if entry.name.endswith('.__wz_cache'):
+                    # Temp file of a write that died half way
+                    expired = entry.stat().st_mtime < now - 3600
+                else:
+                    # cachelib files start with the expiry time, 0 meaning never
+                    with open(entry.path, 'rb') as f:
+                        expires = struct.unpack('I', f.read(4))[0]
+                    expired = expires != 0 and expires < now
+                if expired:
+                    os.remove(entry.path)
+                    removed += 1
+                else:
+                    remaining += 1
+            except FileNotFoundError:
+                pass
+            except (OSError, struct.error) as e:
+                print(f"Could not vacuum session file {entry.name}: {e}", file=sys.stderr)
+
+    # cachelib keeps a file count and scans the whole directory on every write while
+    # it is over the threshold, so put the real count back
+    cache = getattr(session_interface, 'cache', None)
+    if removed and hasattr(cache, '_update_count'):
+        cache._update_count(value=remaining)
+    return removed
+
+def run_maintenance(app, batch_size=None, max_seconds=None, sessions=True):
+    """One pass over everything; returns a report of what was removed and how long it took"""
+    config = app.config
+    batch_size = batch_size or config.get('MAINTENANCE_BATCH_SIZE', 1000)
+    max_seconds = max_seconds or config.get('MAINTENANCE_MAX_SECONDS', 60)
+    pause = config.get('MAINTENANCE_BATCH_PAUSE', 0.05)
+
+    started = time.perf_counter()
+    deadline = time.monotonic() + max_seconds
+    report = {'tables': {}, 'otpCodes': 0, 'sessionFiles': 0}
+    with app.app_context():
+        for table in EXPIRING_TABLES:
+            if time.monotonic() >= deadline:
+                # The rest waits for the next run
+                break
+            report['tables'][table] = purge_table(table, batch_size, pause, deadline)
+        report['otpCodes'] = purge_expired_otps()
+    if sessions and config.get('SESSION_TYPE') == 'filesystem':
+        report['sessionFiles'] = vacuum_sessions(config.get('SESSION_FILE_DIR'), app.session_interface)
+    report['seconds'] = round(time.perf_counter() - started, 3)
+
+    for table, count in report['tables'].items():
+        registry.inc('maintenance_purged_total', {'target': table}, count)
+    registry.inc('maintenance_purged_total', {'target': 'otp_codes'}, report['otpCodes'])
+    registry.inc('maintenance_purged_total', {'target': 'session_files'}, report['sessionFiles'])
+    registry.observe('maintenance_run_duration_seconds', {}, report['seconds'], buckets=RUN_BUCKETS)
+    return report
+
+def run_locked(app, min_interval=0, **kwargs):
+    """
+    run_maintenance under the host lock. Returns None if the last run finished
+    under min_interval seconds ago; raises MaintenanceBusy if one is running.
+    """
+    with open(_lock_path(app), 'a+') as f:
+        if fcntl is not None:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                raise MaintenanceBusy()
+        # The file holds the time the last run finished
+        f.seek(0)
+        try:
+            last_run = float(f.read().strip() or 0)
+        except ValueError:
+            last_run = 0
+        if time.time() - last_run < min_interval:
+            return None
+
+        report = run_maintenance(app, **kwargs)
+        f.seek(0)
+        f.truncate()
+        f.write(repr(time.time()))
+        return report
+
+def format_report(report):
+    purged = ', '.join(f"{table} {count}" for table, count in report['tables'].items())
+    return (f"Purged {purged or 'no tables'}; {report['otpCodes']} OTP codes, "
+            f"{report['sessionFiles']} session files in {report['seconds']}s")
+
+_app = None
+_scheduler = None
+_scheduler_stop = threading.Event()
+
+def init_maintenance(app):
+    """Remember the app, so each worker's scheduler can reach the database"""
+    global _app
+    _app = app
+
+def _schedule_loop(app, interval):
+    # Workers start together; spread their first check over the interval
+    wait = random.uniform(0, interval)
+    while not _scheduler_stop.wait(wait):
+        wait = interval
+        try:
+            # A bit under the interval, so the worker that ran last time is not always the one to run
+            report = run_locked(app, min_interval=interval * 0.9)
+        except MaintenanceBusy:
+            continue
+        except Exception as e:
+            print(f"Maintenance run failed: {e}", file=sys.stderr)
+            continue
+        if report is not None:
+            print(f"[maintenance] {format_report(report)}", file=sys.stderr)
+
+@on_worker_start
+def start_scheduler():
+    global _scheduler
+    if _app is None or _scheduler is not None:
+        return
+    interval = _app.config.get('MAINTENANCE_INTERVAL', 3600)
+    if not interval:
+        return
+    _scheduler_stop.clear()
+    _scheduler = threading.Thread(target=_schedule_loop, args=(_app, interval), name='maintenance', daemon=True)
+    _scheduler.start()
+
+@on_worker_exit
+def stop_scheduler():
+    global _scheduler
+    _scheduler_stop.set()
+    _scheduler = None
@@ -0,0 +1,220 @@
+import hashlib
+import hmac
+import sqlite3
+import threading
+import time
+
+from flask import current_app
+
+from app.utils.helpers import generate_otp, instance_file
+from app.utils.json_provider import dumps_bytes, loads
+from app.utils.redis_client import RedisClient
+
+# One-time passcodes for email verification, mobile verification and password
+# resets. Codes live in a TTL store rather than MySQL: each one is kept as an
+# HMAC keyed by SECRET_KEY under a key derived from (purpose, subject), so
+# checking a code is a single lookup that never scans by code. Every check counts
+# as an attempt, and a code is burnt once OTP_MAX_ATTEMPTS wrong guesses are made.
+#
+# Stores (OTP_STORE):
+#     memory - this process only, fine for a single worker
+#     sqlite - a WAL-mode file shared by the workers on one host
+#     redis  - shared by every host, Redis expires the keys itself
+
+PURPOSES = ('email', 'mobile', 'reset')
+
+class MemoryStore:
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def put(self, key, record, ttl):
+        with self._lock:
+            self._entries[key] = [time.monotonic() + ttl, record, 0]
+
+    def attempt(self, key):
+        """(record, attempts including this one), or None if there is no live code"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                return None
+            entry[2] += 1
+            return entry[1], entry[2]
+
+    def take(self, key):
+        """Remove the code and return its record; only one caller can take it"""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            return entry[1] if entry is not None and entry[0] > time.monotonic() else None
+
+    def purge(self):
+        now = time.monotonic()
+        with self._lock:
+            expired = [key for key, entry in self._entries.items() if entry[0] <= now]
+            for key in expired:
+                del self._entries[key]
+        return len(expired)
+
+class SQLiteStore:
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        db = self._db()
+        db.execute('PRAGMA journal_mode=WAL')
+        db.execute('''CREATE TABLE IF NOT EXISTS otp_codes (
+            key TEXT PRIMARY KEY,
+            record BLOB NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            expires REAL NOT NULL) WITHOUT ROWID''')
+
+    def _db(self):
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = self._local.db = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            db.execute('PRAGMA synchronous=NORMAL')
+        return db
+
+    def put(self, key, record, ttl):
+        self._db().execute('INSERT OR REPLACE INTO otp_codes (key, record, attempts, expires) VALUES (?, ?, 0, ?)',
+                           (key, dumps_bytes(record), time.time() + ttl))
+
+    def attempt(self, key):
+        db = self._db()
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            db.execute('UPDATE otp_codes SET attempts = attempts + 1 WHERE key = ? AND expires > ?', (key, time.time()))
+            row = db.execute('SELECT record, attempts FROM otp_codes WHERE key = ? AND expires > ?',
+                             (key, time.time())).fetchone()
+        finally:
+            db.execute('COMMIT')
+        return (loads(row[0]), row[1]) if row else None
+
+    def take(self, key):
+        db = self._db()
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            row = db.execute('SELECT record FROM otp_codes WHERE key = ? AND expires > ?', (key, time.time())).fetchone()
+            db.execute('DELETE FROM otp_codes WHERE key = ?', (key,))
+        finally:
+            db.execute('COMMIT')
+        return loads(row[0]) if row else None
+
+    def purge(self):
+        return self._db().execute('DELETE FROM otp_codes WHERE expires <= ?', (time.time(),)).rowcount
+
+_PUT_SCRIPT = """
+redis.call('DEL', KEYS[1])
+redis.call('HSET', KEYS[1], 'record', ARGV[1], 'attempts', 0)
+redis.call('PEXPIRE', KEYS[1], ARGV[2])
+"""
+
+_ATTEMPT_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return nil
+end
+local attempts = redis.call('HINCRBY', KEYS[1], 'attempts', 1)
+return {redis.call('HGET', KEYS[1], 'record'), attempts}
+"""
+
+_TAKE_SCRIPT = """
+local record = redis.call('HGET', KEYS[1], 'record')
+redis.call('DEL', KEYS[1])
+return record
+"""
+
+class RedisStore:
+    def __init__(self, url, key_prefix='blog-service:otp:'):
+        self.key_prefix = key_prefix
+        self._client = RedisClient(url)
+
+    def put(self, key, record, ttl):
+        self._client.command('EVAL', _PUT_SCRIPT, 1, self.key_prefix + key, dumps_bytes(record), int(ttl * 1000))
+
+    def attempt(self, key):
+        reply = self._client.command('EVAL', _ATTEMPT_SCRIPT, 1, self.key_prefix + key)
+        return (loads(reply[0]), reply[1]) if reply else None
+
+    def take(self, key):
+        record = self._client.command('EVAL', _TAKE_SCRIPT, 1, self.key_prefix + key)
+        return loads(record) if record else None
+
+    def purge(self):
+        # Redis expires keys by itself
+        return 0
+
+_store = None
+_store_lock = threading.Lock()
+def _config(name, default):
+    return current_app.config.get(name, default)
+
+def get_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                name = _config('OTP_STORE', 'sqlite')
+                if name == 'sqlite':
+                    _store = SQLiteStore(instance_file(current_app, 'OTP_SQLITE_PATH', 'otp.db'))
+                elif name == 'redis':
+                    _store = RedisStore(_config('OTP_REDIS_URL', None) or _config('EVENT_BUS_REDIS_URL', None))
+                elif name == 'memory':
+                    _store = MemoryStore()
+                else:
+                    raise ValueError(f"Unknown OTP_STORE: {name}")
+    return _store
+
+def _mac(*parts):
+    secret = current_app.config['SECRET_KEY'].encode()
+    return hmac.new(secret, '\0'.join(str(p) for p in parts).encode(), hashlib.sha256).hexdigest()
+
+def _key(purpose, subject):
+    # The subject (a user id or an email address) is not stored in the clear either
+    return f"{purpose}:{_mac('key', purpose, str(subject).strip().lower())[:32]}"
+
+def issue_otp(purpose, subject, data=None):
+    """
+    Create a code for subject (a user id, or the email for resets), replacing any
+    earlier one, and return it. data is handed back by verify_otp.
+    """
+    if purpose not in PURPOSES:
+        raise ValueError(f"Unknown OTP purpose: {purpose}")
+    otp = generate_otp()
+    record = {'mac': _mac('otp', purpose, str(subject).strip().lower(), otp), 'data': data or {}}
+    get_store().put(_key(purpose, subject), record, _config(f"OTP_{purpose.upper()}_TTL", 900))
+    return otp
+
+def verify_otp(purpose, subject, otp, consume=True):
+    """
+    The data given to issue_otp if otp is the live code for subject, else None.
+    consume=False checks the code without using it up (it still counts as an attempt).
+    """
+    if not otp or not isinstance(otp, str):
+        return None
+    store = get_store()
+    key = _key(purpose, subject)
+    found = store.attempt(key)
+    if found is None:
+        return None
+
+    record, attempts = found
+    max_attempts = _config('OTP_MAX_ATTEMPTS', 5)
+    expected = _mac('otp', purpose, str(subject).strip().lower(), otp.strip())
+    if attempts > max_attempts or not hmac.compare_digest(record['mac'], expected):
+        if attempts >= max_attempts:
+            # Out of guesses, a new code has to be requested
+            store.take(key)
+        return None
+
+    if consume and store.take(key) is None:
+        # Someone else used the same code a moment ago
+        return None
+    return record['data']
+
+def consume_otp(purpose, subject):
+    """Use up a code already checked with verify_otp(consume=False); its data, or None if it is gone"""
+    record = get_store().take(_key(purpose, subject))
+    return record['data'] if record else None
+
+def purge_expired():
+    """Drop expired codes from the store (see maintenance_service); returns how many went"""
+    return get_store().purge()
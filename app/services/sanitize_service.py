@@ -0,0 +1,118 @@
+import hashlib
+import multiprocessing
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from flask import current_app
+
+from app.utils import helpers
+from app.utils.cache import TTLCache
+from app.utils.lifecycle import on_worker_exit
+
+# Sanitizing is pure CPU work under the GIL, so large bodies are sent to worker
+# processes and the request thread just waits, letting other requests run.
+# Sanitized output is cached by a hash of the input, so resubmitting the same
+# body (an edit that only changed the title) is not cleaned again.
+
+_pool = None
+_pool_lock = threading.Lock()
+_cache = None
+_cache_lock = threading.Lock()
+
+def _config(name, default):
+    return current_app.config.get(name, default)
+
+def _get_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = TTLCache(
+                    max_entries=_config('SANITIZE_CACHE_MAX_ENTRIES', 512),
+                    ttl=_config('SANITIZE_CACHE_TTL', 3600)
+                )
+    return _cache
+
+def _get_pool():
+    # Started on first use, i.e. inside the serving worker rather than a preforking master
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # fork is unsafe in a threaded server, forkserver/spawn start workers cleanly
+                method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+                _pool = ProcessPoolExecutor(max_workers=_config('SANITIZE_POOL_WORKERS', 2),
+                                            mp_context=multiprocessing.get_context(method))
+    return _pool
+
+@on_worker_exit
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+def _reset_pool(pool):
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def _key(text):
+    return hashlib.blake2b(text.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+
+def _use_pool(text):
+    threshold = _config('SANITIZE_POOL_THRESHOLD', 32768)
+    return threshold is not None and _config('SANITIZE_POOL_WORKERS', 2) > 0 and len(text) >= threshold
+
+def _clean_in_pool(texts):
+    # Falls back to cleaning inline if the pool is broken or too slow to answer
+    pool = _get_pool()
+    try:
+        futures = [pool.submit(helpers.sanitize_html, text) for text in texts]
+        timeout = _config('SANITIZE_POOL_TIMEOUT', 10)
+        return [future.result(timeout=timeout) for future in futures]
+    except (BrokenProcessPool, FutureTimeoutError) as e:
+        print(f"Sanitizer pool failed ({type(e).__name__}), cleaning inline", file=sys.stderr)
+        _reset_pool(pool)
+        return [helpers.sanitize_html(text) for text in texts]
+
+def sanitize_html(text):
+    """helpers.sanitize_html with the output cache, large bodies cleaned in the process pool"""
+    return sanitize_many([text])[0]
+
+def sanitize_many(texts):
+    """Sanitize several bodies at once; the large ones are cleaned in parallel"""
+    cache = _get_cache()
+    results = [None] * len(texts)
+    misses = {}
+
+    for index, text in enumerate(texts):
+        if not text:
+            results[index] = helpers.sanitize_html(text)
+            continue
+        key = _key(text)
+        cached = cache.get(key)
+        if cached is not None:
+            results[index] = cached
+        else:
+            # Identical bodies in one batch are only cleaned once
+            misses.setdefault(key, (text, []))[1].append(index)
+
+    large = [(key, text) for key, (text, _) in misses.items() if _use_pool(text)]
+    cleaned = {}
+    if large:
+        cleaned.update(zip((key for key, _ in large), _clean_in_pool([text for _, text in large])))
+    for key, (text, _) in misses.items():
+        if key not in cleaned:
+            cleaned[key] = helpers.sanitize_html(text)
+
+    for key, (_, indexes) in misses.items():
+        cache.set(key, cleaned[key])
+        for index in indexes:
+            results[index] = cleaned[key]
+    return results
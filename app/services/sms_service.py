@@ -1,6 +1,8 @@
 from flask import current_app
 import sys
 
+from app.utils.metrics import external_call
+
 # For SMS OTP
 try:
     from twilio.rest import Client
@@ -35,11 +37,12 @@ def send_verification_sms(phone_number, username, otp):
         return False
     
     try:
-        message = client.messages.create(
-            body=f"Hello {username}, your Blog Service verification code is: {otp}. This code will expire in 15 minutes.",
-            from_=current_app.config['TWILIO_PHONE_NUMBER'],
-            to=phone_number
-        )
+        with external_call('twilio'):
+            message = client.messages.create(
+                body=f"Hello {username}, your Blog Service verification code is: {otp}. This code will expire in 15 minutes.",
+                from_=current_app.config['TWILIO_PHONE_NUMBER'],
+                to=phone_number
+            )
         print(f"Verification SMS sent to {phone_number}: {message.sid}")
         return True
     except Exception as e:
@@ -0,0 +1,237 @@
+import re
+
+# Plain SQL versions of the read-only stored procedures, used instead of CALL when
+# DB_QUERY_MODE is 'statements' or 'prepared' (see db_service). Each one returns
+# the same columns under the same names as its procedure and takes the same
+# arguments in the same order, so callers and models cannot tell them apart.
+# Writes always go through their procedures.
+#
+# Modes:
+#     procedures - CALL, the default
+#     statements - one text query, arguments bound by the client
+#     prepared   - PREPARE once per pooled connection, then SET + EXECUTE sent
+#                  together in a single round trip
+#
+# PyMySQL does not speak the binary prepared statement protocol, so 'prepared'
+# uses SQL-level PREPARE/EXECUTE; it saves the server parsing and planning the
+# query on every call, not the text encoding of the rows.
+
+_PARAM_RE = re.compile(r':(\w+)')
+
+class Statement:
+    """A named query; :name placeholders refer to params, which follow the procedure's argument order"""
+    __slots__ = ('name', 'params', 'sql', 'text_sql', 'prepare_sql', 'using')
+
+    def __init__(self, name, params, sql):
+        self.name = name
+        self.params = params
+        self.sql = sql
+        used = _PARAM_RE.findall(sql)
+        unknown = set(used) - set(params)
+        if unknown:
+            raise ValueError(f"{name} uses undeclared parameters {sorted(unknown)}")
+        # PyMySQL's pyformat binding for text queries, ? placeholders for PREPARE
+        self.text_sql = _PARAM_RE.sub(r'%(\1)s', sql.replace('%', '%%'))
+        self.prepare_sql = _PARAM_RE.sub('?', sql)
+        # A parameter used twice is passed to EXECUTE twice
+        self.using = [f"@{name}_{param}" for param in used]
+
+    def bind(self, args):
+        args = tuple(args) if args is not None else ()
+        if len(args) != len(self.params):
+            raise TypeError(f"{self.name} takes {len(self.params)} arguments, got {len(args)}")
+        return dict(zip(self.params, args))
+
+_USER_COLUMNS = """
+    u.userId,
+    u.username,
+    u.email,
+    u.phone_number,
+    u.joinDate,
+    u.user_type,
+    IF(vu.userId IS NOT NULL, TRUE, FALSE) AS verified,
+    IF(mvu.userId IS NOT NULL, TRUE, FALSE) AS mobile_verified"""
+
+_USER_JOINS = """
+LEFT JOIN verified_users vu ON u.userId = vu.userId
+LEFT JOIN mobile_verified_users mvu ON u.userId = mvu.userId"""
+
+_BLOG_COLUMNS = """
+    b.blogId,
+    b.title,
+    b.content,
+    b.dateCreated as date,
+    b.userId,
+    u.username as author"""
+
+_COMMENT_COLUMNS = """
+    c.commentId,
+    c.content,
+    c.dateCreated as date,
+    c.blogId,
+    c.userId,
+    c.parentCommentId,
+    u.username as author"""
+
+STATEMENTS = {statement.name: statement for statement in (
+    Statement('getUserById', ('userId',), f"""
+SELECT {_USER_COLUMNS}
+FROM users u {_USER_JOINS}
+WHERE u.userId = :userId"""),
+
+    Statement('getUsersByIds', ('userIds',), f"""
+SELECT {_USER_COLUMNS}
+FROM JSON_TABLE(:userIds, '$[*]' COLUMNS(ord FOR ORDINALITY, id INT PATH '$')) ids
+JOIN users u ON u.userId = ids.id {_USER_JOINS}
+ORDER BY ids.ord"""),
+
+    Statement('getUsersByUsernames', ('usernames',), """
+SELECT u.userId, u.username
+FROM JSON_TABLE(:usernames, '$[*]' COLUMNS(username VARCHAR(25) PATH '$')) names
+JOIN users u ON u.username = names.username"""),
+
+    Statement('getUserByUsername', ('username',), f"""
+SELECT {_USER_COLUMNS}
+FROM users u {_USER_JOINS}
+WHERE u.username = :username"""),
+
+    Statement('getUserByEmail', ('email',), f"""
+SELECT {_USER_COLUMNS}
+FROM users u {_USER_JOINS}
+WHERE u.email = :email"""),
+
+    Statement('getUsers', ('limit', 'offset'), f"""
+SELECT {_USER_COLUMNS}
+FROM users u {_USER_JOINS}
+ORDER BY u.joinDate DESC
+LIMIT :limit OFFSET :offset"""),
+
+    Statement('getBlogSubscribers', ('excludeUserId',), """
+SELECT u.userId, u.email
+FROM users u
+LEFT JOIN notification_preferences np ON u.userId = np.userId
+WHERE u.userId <> :excludeUserId
+AND u.email IS NOT NULL
+AND u.email <> ''
+AND COALESCE(np.notifyOnBlog, TRUE)"""),
+
+    Statement('getCommentSubscribers', ('userIds',), """
+SELECT u.userId, u.username, u.email
+FROM JSON_TABLE(:userIds, '$[*]' COLUMNS(id INT PATH '$')) ids
+JOIN users u ON u.userId = ids.id
+LEFT JOIN notification_preferences np ON u.userId = np.userId
+WHERE u.email IS NOT NULL
+AND u.email <> ''
+AND COALESCE(np.notifyOnComment, TRUE)"""),
+
+    Statement('isUserVerified', ('userId',), """
+SELECT COUNT(*) as verified FROM verified_users WHERE userId = :userId"""),
+
+    Statement('isMobileVerified', ('userId',), """
+SELECT COUNT(*) as verified FROM mobile_verified_users WHERE userId = :userId"""),
+
+    Statement('getPendingEmail', ('userId',), """
+SELECT newEmail FROM pending_email_changes WHERE userId = :userId"""),
+
+    Statement('getPendingPhone', ('userId',), """
+SELECT newPhone FROM pending_phone_changes WHERE userId = :userId"""),
+
+    Statement('getBlogs', ('newerThan', 'author', 'limit', 'offset'), f"""
+SELECT {_BLOG_COLUMNS}
+FROM blogs b
+JOIN users u ON b.userId = u.userId
+WHERE (:newerThan IS NULL OR b.dateCreated >= :newerThan)
+AND (:author IS NULL OR u.username = :author)
+ORDER BY b.dateCreated DESC
+LIMIT :limit OFFSET :offset"""),
+
+    Statement('getBlogById', ('blogId',), f"""
+SELECT {_BLOG_COLUMNS}
+FROM blogs b
+JOIN users u ON b.userId = u.userId
+WHERE b.blogId = :blogId"""),
+
+    Statement('getBlogsByIds', ('blogIds',), f"""
+SELECT {_BLOG_COLUMNS}
+FROM JSON_TABLE(:blogIds, '$[*]' COLUMNS(ord FOR ORDINALITY, id INT PATH '$')) ids
+JOIN blogs b ON b.blogId = ids.id
+JOIN users u ON b.userId = u.userId
+ORDER BY ids.ord"""),
+
+    Statement('getBlogsByUserId', ('userId', 'newerThan', 'limit', 'offset'), f"""
+SELECT {_BLOG_COLUMNS}
+FROM blogs b
+JOIN users u ON b.userId = u.userId
+WHERE b.userId = :userId
+AND (:newerThan IS NULL OR b.dateCreated >= :newerThan)
+ORDER BY b.dateCreated DESC
+LIMIT :limit OFFSET :offset"""),
+
+    Statement('getTrendingBlogs', ('limit',), f"""
+SELECT {_BLOG_COLUMNS},
+    s.views
+FROM blog_stats s
+JOIN blogs b ON b.blogId = s.blogId
+JOIN users u ON b.userId = u.userId
+ORDER BY s.hotScore DESC
+LIMIT :limit"""),
+
+    Statement('getCommentsByBlog', ('blogId', 'newerThan', 'limit', 'offset'), f"""
+SELECT {_COMMENT_COLUMNS}
+FROM comments c
+JOIN users u ON c.userId = u.userId
+WHERE c.blogId = :blogId
+AND (:newerThan IS NULL OR c.dateCreated >= :newerThan)
+ORDER BY COALESCE(c.parentCommentId, c.commentId), c.dateCreated
+LIMIT :limit OFFSET :offset"""),
+
+    Statement('getCommentById', ('commentId',), f"""
+SELECT {_COMMENT_COLUMNS}
+FROM comments c
+JOIN users u ON c.userId = u.userId
+WHERE c.commentId = :commentId"""),
+
+    Statement('getCommentsByIds', ('commentIds',), f"""
+SELECT {_COMMENT_COLUMNS}
+FROM JSON_TABLE(:commentIds, '$[*]' COLUMNS(ord FOR ORDINALITY, id INT PATH '$')) ids
+JOIN comments c ON c.commentId = ids.id
+JOIN users u ON c.userId = u.userId
+ORDER BY ids.ord"""),
+
+    Statement('getCommentReplies', ('commentId',), f"""
+SELECT {_COMMENT_COLUMNS}
+FROM comments c
+JOIN users u ON c.userId = u.userId
+WHERE c.parentCommentId = :commentId
+ORDER BY c.dateCreated"""),
+)}
+
+QUERY_MODES = ('procedures', 'statements', 'prepared')
+
+def execute_text(cursor, statement, args):
+    cursor.execute(statement.text_sql, statement.bind(args))
+
+def execute_prepared(connection, cursor, statement, args):
+    """
+    SET the arguments and EXECUTE in one multi-statement query, PREPAREing first
+    if this connection has not seen the statement. The connection needs
+    CLIENT.MULTI_STATEMENTS; the cursor is left on the statement's result.
+    """
+    prepared = getattr(connection, '_prepared_statements', None)
+    if prepared is None:
+        prepared = connection._prepared_statements = set()
+
+    parts = []
+    if statement.name not in prepared:
+        parts.append(cursor.mogrify(f"PREPARE {statement.name} FROM %s", (statement.prepare_sql,)))
+    values = statement.bind(args)
+    if values:
+        parts.append(cursor.mogrify('SET ' + ', '.join(f"@{statement.name}_{param} = %({param})s"
+                                                       for param in statement.params), values))
+    parts.append(f"EXECUTE {statement.name}" + (f" USING {', '.join(statement.using)}" if statement.using else ''))
+
+    cursor.execute(';\n'.join(parts))
+    # Step over the OK packets of PREPARE and SET to the rows
+    while cursor.description is None and cursor.nextset():
+        pass
+    prepared.add(statement.name)
@@ -0,0 +1,173 @@
+import itertools
+import sys
+import threading
+import time
+from collections import Counter
+
+from flask import current_app
+
+from app.models.blog import TrendingBlog
+from app.services.db_service import sql_call_fetch_one, sql_call_fetch_all
+from app.services.event_service import subscribe
+from app.utils.json_provider import dumps_bytes
+from app.utils.lifecycle import on_worker_start, on_worker_exit
+from app.utils.metrics import registry
+
+# Blog view counts and the trending list. A view only bumps a counter in this
+# process; a flusher thread writes the totals every STATS_FLUSH_INTERVAL seconds
+# with addBlogViews, one INSERT ... ON DUPLICATE KEY UPDATE per
+# STATS_FLUSH_BATCH_SIZE blogs, so BlogDetail never waits on (or locks) a row.
+# A worker that dies loses at most the views of one interval; one that shuts
+# down cleanly flushes on the way out.
+#
+# blog_stats.hotScore is log2 of a blog's views decayed with a half-life of
+# STATS_TRENDING_HALF_LIFE seconds, kept on a growing time scale so old scores
+# never need rewriting and getTrendingBlogs is an index scan. The top
+# STATS_TRENDING_SIZE blogs are cached for STATS_TRENDING_TTL seconds.
+
+class ShardedCounter:
+    """
+    Per-key counts split over shards, each with its own lock. Every thread sticks
+    to one shard, so request threads counting views of the same hot blog do not
+    queue on a single lock; drain() adds the shards up.
+    """
+
+    def __init__(self, shards=16):
+        # [lock, counts]; drain() swaps in a fresh Counter under the lock
+        self._shards = [[threading.Lock(), Counter()] for _ in range(shards)]
+        self._next = itertools.count()
+        self._local = threading.local()
+
+    def _shard(self):
+        index = getattr(self._local, 'index', None)
+        if index is None:
+            index = self._local.index = next(self._next) % len(self._shards)
+        return self._shards[index]
+
+    def add(self, key, amount=1):
+        shard = self._shard()
+        with shard[0]:
+            shard[1][key] += amount
+
+    def update(self, amounts):
+        shard = self._shard()
+        with shard[0]:
+            shard[1].update(amounts)
+
+    def drain(self):
+        """Take every count accumulated so far, leaving the counter empty"""
+        total = Counter()
+        for shard in self._shards:
+            with shard[0]:
+                counts, shard[1] = shard[1], Counter()
+            total.update(counts)
+        return total
+
+_views = ShardedCounter()
+
+_app = None
+_flusher = None
+_flusher_stop = threading.Event()
+_flush_lock = threading.Lock()
+
+_trending = None
+_trending_lock = threading.Lock()
+
+def init_stats(app):
+    """Remember the app, so each worker's flusher can reach the database"""
+    global _app
+    _app = app
+
+def record_view(blog_id, config=None):
+    """Count a view; config defaults to the current app's (the ASGI handlers pass theirs)"""
+    config = config if config is not None else current_app.config
+    if config.get('STATS_ENABLED', True):
+        _views.add(blog_id)
+
+def flush_views(batch_size=1000, half_life=86400):
+    """Write the views counted since the last flush; returns the number written"""
+    # One flush at a time, so a batch is never counted twice by the exit flush
+    with _flush_lock:
+        pending = _views.drain()
+        if not pending:
+            return 0
+        # Sorted, so concurrent flushes from several workers lock rows in the same order
+        items = sorted(pending.items())
+        written = 0
+        try:
+            for start in range(0, len(items), batch_size):
+                batch = items[start:start + batch_size]
+                sql_call_fetch_one('addBlogViews', (dumps_bytes(batch).decode(), half_life))
+                written += sum(count for _, count in batch)
+        except Exception:
+            # Keep what did not make it for the next flush
+            _views.update(dict(items[start:]))
+            registry.inc('stats_flush_failures_total', {})
+            raise
+        finally:
+            registry.inc('stats_views_flushed_total', {}, written)
+        return written
+
+def get_trending(limit):
+    """The top `limit` blogs by decayed views, from the cache when it is fresh"""
+    global _trending
+    config = current_app.config
+    entry = _trending
+    if entry is None or entry[0] <= time.monotonic():
+        with _trending_lock:
+            entry = _trending
+            # Someone else may have refreshed it while this thread waited
+            if entry is None or entry[0] <= time.monotonic():
+                rows = sql_call_fetch_all('getTrendingBlogs', (config.get('STATS_TRENDING_SIZE', 50),), model=TrendingBlog)
+                entry = _trending = (time.monotonic() + config.get('STATS_TRENDING_TTL', 60), rows)
+    return entry[1][:limit]
+
+def clear_trending():
+    global _trending
+    _trending = None
+
+def _forget_changed_blog(event_id, topic, data):
+    # An edited or deleted blog must not linger in the list until it expires
+    entry = _trending
+    if entry is not None and any(row.blogId == data.get('blogId') for row in entry[1]):
+        clear_trending()
+
+def _flush(app):
+    config = app.config
+    with app.app_context():
+        return flush_views(config.get('STATS_FLUSH_BATCH_SIZE', 1000), config.get('STATS_TRENDING_HALF_LIFE', 86400))
+
+def _flush_loop(app, interval):
+    while not _flusher_stop.wait(interval):
+        try:
+            _flush(app)
+        except Exception as e:
+            print(f"Blog view flush failed: {e}", file=sys.stderr)
+
+@on_worker_start
+def start_flusher():
+    global _flusher
+    if _app is None or _flusher is not None or not _app.config.get('STATS_ENABLED', True):
+        return
+    try:
+        subscribe('blog.updated', _forget_changed_blog)
+        subscribe('blog.deleted', _forget_changed_blog)
+    except Exception as e:
+        print(f"Trending list will not follow blog edits: {e}", file=sys.stderr)
+    _flusher_stop.clear()
+    _flusher = threading.Thread(target=_flush_loop, args=(_app, _app.config.get('STATS_FLUSH_INTERVAL', 10)),
+                                name='stats-flush', daemon=True)
+    _flusher.start()
+
+@on_worker_exit
+def stop_flusher():
+    global _flusher
+    _flusher_stop.set()
+    if _flusher is None:
+        return
+    _flusher.join(timeout=5)
+    _flusher = None
+    try:
+        _flush(_app)
+    except Exception as e:
+        print(f"Blog views lost at shutdown: {e}", file=sys.stderr)
@@ -0,0 +1,219 @@
+import asyncio
+import threading
+import time
+from collections import deque, OrderedDict
+
+from flask import current_app
+
+from app.services.event_service import subscribe
+from app.utils.json_provider import dumps_bytes
+from app.utils.lifecycle import on_worker_exit
+
+# Live comment events for Server-Sent Event streams.
+#
+# Every process has one EventHub: a small ring buffer of recent events per blog
+# plus a condition variable that stream generators wait on. It is fed by the
+# event bus (app/services/event_service.py), so comments written through any
+# worker reach the streams held by every other one.
+
+class _Topic:
+    __slots__ = ('condition', 'events', 'subscribers', 'wakers')
+
+    def __init__(self, lock, size):
+        self.condition = threading.Condition(lock)
+        self.events = deque(maxlen=size)
+        self.subscribers = 0
+        # Callbacks of async waiters, which cannot block on the condition
+        self.wakers = set()
+
+class EventHub:
+    """Per-topic ring buffers with blocking waits, for one process"""
+
+    def __init__(self, buffer_size=200, max_topics=1000):
+        self.buffer_size = buffer_size
+        self.max_topics = max_topics
+        self._lock = threading.Lock()
+        self._topics = OrderedDict()
+
+    def _topic(self, name):
+        # Caller holds the lock
+        topic = self._topics.get(name)
+        if topic is None:
+            topic = self._topics[name] = _Topic(self._lock, self.buffer_size)
+            if len(self._topics) > self.max_topics:
+                # Forget the least recently used topics nobody is listening to
+                for stale in [n for n, t in self._topics.items() if not t.subscribers][:len(self._topics) - self.max_topics]:
+                    del self._topics[stale]
+        self._topics.move_to_end(name)
+        return topic
+
+    def deliver(self, events):
+        """events: (id, topic, event, data) tuples in increasing id order"""
+        with self._lock:
+            woken = set()
+            for event_id, name, event, data in events:
+                self._topic(name).events.append((event_id, event, data))
+                woken.add(name)
+            for name in woken:
+                topic = self._topics[name]
+                topic.condition.notify_all()
+                for wake in topic.wakers:
+                    wake()
+
+    def wait(self, name, last_id, timeout):
+        """Events after last_id, blocking up to timeout seconds for the first one"""
+        with self._lock:
+            topic = self._topic(name)
+            topic.subscribers += 1
+            try:
+                deadline = time.monotonic() + timeout
+                while True:
+                    events = [e for e in topic.events if e[0] > last_id]
+                    remaining = deadline - time.monotonic()
+                    if events or remaining <= 0:
+                        return events
+                    topic.condition.wait(remaining)
+            finally:
+                topic.subscribers -= 1
+
+    async def wait_async(self, name, last_id, timeout):
+        """wait() for the ASGI app: the event loop waits instead of a thread"""
+        loop = asyncio.get_running_loop()
+        woken = asyncio.Event()
+
+        def wake():
+            try:
+                loop.call_soon_threadsafe(woken.set)
+            except RuntimeError:
+                # The loop has shut down
+                pass
+
+        with self._lock:
+            topic = self._topic(name)
+            topic.subscribers += 1
+            topic.wakers.add(wake)
+        try:
+            deadline = time.monotonic() + timeout
+            while True:
+                # Cleared before looking, so a delivery in between still wakes us
+                woken.clear()
+                with self._lock:
+                    events = [e for e in topic.events if e[0] > last_id]
+                remaining = deadline - time.monotonic()
+                if events or remaining <= 0:
+                    return events
+                try:
+                    await asyncio.wait_for(woken.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            with self._lock:
+                topic.subscribers -= 1
+                topic.wakers.discard(wake)
+
+_hub = None
+_hub_lock = threading.Lock()
+_streams = 0
+_streams_lock = threading.Lock()
+
+def comment_topic(blog_id):
+    return f"blog:{blog_id}:comments"
+
+def get_hub():
+    """This process's hub, fed with comment events from the event bus"""
+    global _hub
+    if _hub is None:
+        with _hub_lock:
+            if _hub is None:
+                hub = EventHub(buffer_size=current_app.config.get('SSE_BUFFER_SIZE', 200))
+                subscribe('comment.*', lambda event_id, topic, data:
+                          hub.deliver([(event_id, comment_topic(data['blogId']), topic, data)]))
+                _hub = hub
+    return _hub
+
+@on_worker_exit
+def close_hub():
+    # Runs before the bus closes; a new bus needs a new subscription
+    global _hub
+    with _hub_lock:
+        _hub = None
+
+def acquire_stream_slot():
+    # Every open stream holds a server thread, so only some of them may stream
+    global _streams
+    limit = current_app.config.get('SSE_MAX_STREAMS') or max(1, current_app.config.get('SERVER_THREADS', 4) // 2)
+    with _streams_lock:
+        if _streams >= limit:
+            return False
+        _streams += 1
+        return True
+
+def release_stream_slot():
+    global _streams
+    with _streams_lock:
+        _streams -= 1
+
+def _format(event_id, event, data):
+    return b'id: %d\nevent: %s\ndata: %s\n\n' % (event_id, event.encode(), dumps_bytes(data))
+
+def _replay(bus, blog_id, last_id, retry_ms):
+    """The opening chunks of a stream and the id to continue from"""
+    chunks = [b'retry: %d\n\n' % retry_ms]
+    if last_id is None:
+        return chunks, bus.latest_id
+    events, complete = bus.replay('comment.*', last_id)
+    if not complete:
+        chunks.append(b'event: reset\ndata: {}\n\n')
+    for event_id, event, data in events:
+        if data.get('blogId') == blog_id:
+            chunks.append(_format(event_id, event, data))
+        last_id = event_id
+    return chunks, last_id
+
+def event_stream(bus, hub, blog_id, last_id=None, heartbeat=15, max_duration=55, retry_ms=3000):
+    """
+    SSE body for the comments of one blog. With last_id (from Last-Event-ID)
+    missed events are replayed from the bus first, or a `reset` event tells the
+    client to reload if they are gone. The stream ends after max_duration so the
+    thread is returned; EventSource reconnects by itself and resumes from the
+    last id it saw.
+    """
+    chunks, last_id = _replay(bus, blog_id, last_id, retry_ms)
+    yield from chunks
+
+    topic = comment_topic(blog_id)
+    deadline = time.monotonic() + max_duration
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        events = hub.wait(topic, last_id, min(heartbeat, remaining))
+        if not events:
+            # Comment line, keeps proxies from closing an idle connection
+            yield b': ping\n\n'
+            continue
+        for event_id, event, data in events:
+            yield _format(event_id, event, data)
+            last_id = event_id
+
+async def event_stream_async(bus, hub, blog_id, last_id=None, heartbeat=15, max_duration=55, retry_ms=3000):
+    """event_stream() for the ASGI app, holding no thread while it waits"""
+    loop = asyncio.get_running_loop()
+    # The bus may read its log from disk
+    chunks, last_id = await loop.run_in_executor(None, _replay, bus, blog_id, last_id, retry_ms)
+    for chunk in chunks:
+        yield chunk
+
+    topic = comment_topic(blog_id)
+    deadline = time.monotonic() + max_duration
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        events = await hub.wait_async(topic, last_id, min(heartbeat, remaining))
+        if not events:
+            yield b': ping\n\n'
+            continue
+        for event_id, event, data in events:
+            yield _format(event_id, event, data)
+            last_id = event_id
@@ -0,0 +1,321 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import shutil
+
+from flask import request, send_from_directory
+
+from app.utils.compression import BROTLI_AVAILABLE, accepted_encodings
+
+if BROTLI_AVAILABLE:
+    import brotli
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+STATIC_DIR = os.path.join(REPO_ROOT, 'static')
+DIST_DIR = os.path.join(STATIC_DIR, 'dist')
+INDEX_TEMPLATE = os.path.join(REPO_ROOT, 'templates', 'index.html')
+
+LOCAL_SCRIPT_RE = re.compile(r'[ \t]*<script src="\.\./static/(js/[^"]+\.js)"></script>[ \t]*\n?')
+LOCAL_STYLESHEET_RE = re.compile(r'<link rel="stylesheet" href="\.\./static/(css/[^"]+\.css)"\s*/?>')
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# ---------------------------------------------------------------------------
+# Minifiers
+#
+# Deliberately conservative: comments and indentation go, string, template and
+# regex literals are copied verbatim, and a newline is kept wherever dropping
+# it could change automatic semicolon insertion.
+# ---------------------------------------------------------------------------
+
+_WORD_CHARS = frozenset('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_$\\')
+_REGEX_PRECEDERS = frozenset('(,=:[!&|?{};+-*%<>~^')
+_REGEX_KEYWORDS = frozenset(('return', 'typeof', 'case', 'do', 'else', 'in', 'of', 'new', 'delete',
+                             'void', 'throw', 'instanceof', 'yield', 'await'))
+# A newline after/before these can never end a statement early
+_NO_ASI_AFTER = frozenset('{;,([')
+_NO_ASI_BEFORE = frozenset('});,].:?')
+
+def _is_word(ch):
+    return ch in _WORD_CHARS or ch > '\x7f'
+
+def _scan_string(src, i):
+    quote = src[i]
+    i += 1
+    while i < len(src):
+        ch = src[i]
+        if ch == '\\':
+            i += 2
+            continue
+        if ch == quote or ch == '\n':
+            return i + 1
+        i += 1
+    return i
+
+def _scan_template(src, i):
+    # Template literals may nest code (and further literals) inside ${ ... }
+    i += 1
+    while i < len(src):
+        ch = src[i]
+        if ch == '\\':
+            i += 2
+        elif ch == '`':
+            return i + 1
+        elif ch == '$' and src.startswith('${', i):
+            i = _scan_template_expression(src, i + 2)
+        else:
+            i += 1
+    return i
+
+def _scan_template_expression(src, i):
+    depth = 1
+    while i < len(src):
+        ch = src[i]
+        if ch in '\'"':
+            i = _scan_string(src, i)
+        elif ch == '`':
+            i = _scan_template(src, i)
+        elif ch == '{':
+            depth += 1
+            i += 1
+        elif ch == '}':
+            depth -= 1
+            i += 1
+            if depth == 0:
+                return i
+        else:
+            i += 1
+    return i
+
+def _scan_regex(src, i):
+    i += 1
+    in_class = False
+    while i < len(src):
+        ch = src[i]
+        if ch == '\\':
+            i += 2
+            continue
+        if ch == '\n':
+            break
+        if ch == '[':
+            in_class = True
+        elif ch == ']':
+            in_class = False
+        elif ch == '/' and not in_class:
+            i += 1
+            while i < len(src) and _is_word(src[i]):
+                i += 1
+            break
+        i += 1
+    return i
+
+def minify_js(src):
+    """Strip comments and redundant whitespace from JavaScript without touching literals"""
+    out = []
+    last_token = ''
+    pending = None  # None, ' ' or '\n'
+    i = 0
+    n = len(src)
+
+    def emit(token):
+        nonlocal pending
+        if pending and out:
+            prev = out[-1][-1]
+            first = token[0]
+            if pending == '\n' and prev not in _NO_ASI_AFTER and first not in _NO_ASI_BEFORE:
+                out.append('\n')
+            elif ((_is_word(prev) and _is_word(first))
+                    or (prev in '+-' and first == prev)
+                    or (prev == '/' and first in '/*')
+                    or (prev.isdigit() and first == '.')):
+                out.append(' ')
+        pending = None
+        out.append(token)
+
+    while i < n:
+        ch = src[i]
+
+        if ch in ' \t\r\n\f\v\ufeff':
+            if ch == '\n':
+                pending = '\n'
+            elif pending is None:
+                pending = ' '
+            i += 1
+        elif ch == '/' and src.startswith('//', i):
+            end = src.find('\n', i)
+            i = n if end == -1 else end
+        elif ch == '/' and src.startswith('/*', i):
+            end = src.find('*/', i + 2)
+            end = n if end == -1 else end + 2
+            if '\n' in src[i:end]:
+                pending = '\n'
+            elif pending is None:
+                pending = ' '
+            i = end
+        elif ch in '\'"':
+            end = _scan_string(src, i)
+            emit(src[i:end])
+            last_token = '"'
+            i = end
+        elif ch == '`':
+            end = _scan_template(src, i)
+            emit(src[i:end])
+            last_token = '`'
+            i = end
+        elif ch == '/' and (not last_token or last_token in _REGEX_PRECEDERS or last_token in _REGEX_KEYWORDS):
+            end = _scan_regex(src, i)
+            emit(src[i:end])
+            last_token = '/re/'
+            i = end
+        elif _is_word(ch):
+            end = i + 1
+            while end < n and _is_word(src[end]):
+                end += 1
+            last_token = src[i:end]
+            emit(last_token)
+            i = end
+        else:
+            emit(ch)
+            last_token = ch
+            i += 1
+
+    return ''.join(out).strip() + '\n'
+
+_CSS_TOKEN_RE = re.compile(r'''("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')|(/\*.*?\*/)|(\s+)|([^"'/\s]+|/)''', re.DOTALL)
+_CSS_TRAILING_SEMICOLON_RE = re.compile(r';+}')
+_CSS_TIGHT = frozenset('{};,>')
+
+def minify_css(src):
+    """Strip comments and whitespace from CSS, leaving strings and selector colons alone"""
+    out = []
+    pending_space = False
+    last_is_string = False
+    for string, comment, space, text in _CSS_TOKEN_RE.findall(src):
+        if comment or space:
+            pending_space = True
+            continue
+
+        token = string or _CSS_TRAILING_SEMICOLON_RE.sub('}', text)
+        if token[0] == '}' and out and not last_is_string and out[-1].endswith(';'):
+            out[-1] = out[-1].rstrip(';')
+            if not out[-1]:
+                out.pop()
+
+        if pending_space and out:
+            prev = out[-1][-1]
+            # The space before ':' is kept - "a :hover" and "a:hover" differ
+            if prev not in _CSS_TIGHT and prev != ':' and token[0] not in _CSS_TIGHT:
+                out.append(' ')
+        pending_space = False
+        last_is_string = bool(string)
+        out.append(token)
+    return ''.join(out).strip() + '\n'
+
+# ---------------------------------------------------------------------------
+# Build
+# ---------------------------------------------------------------------------
+
+def _fingerprint(data):
+    return hashlib.sha256(data).hexdigest()[:12]
+
+def _write(path, data):
+    with open(path, 'wb') as f:
+        f.write(data)
+
+def _write_precompressed(path, data):
+    _write(path + '.gz', gzip.compress(data, compresslevel=9, mtime=0))
+    if BROTLI_AVAILABLE:
+        _write(path + '.br', brotli.compress(data, quality=11))
+
+def build_assets(dist_dir=DIST_DIR, index_template=INDEX_TEMPLATE, static_dir=STATIC_DIR, minify=True):
+    """Bundle the scripts and stylesheets index.html loads from static/, fingerprint
+    them and write a rewritten index.html plus manifest.json to dist_dir"""
+    with open(index_template, encoding='utf-8') as f:
+        html = f.read()
+
+    scripts = LOCAL_SCRIPT_RE.findall(html)
+    stylesheets = LOCAL_STYLESHEET_RE.findall(html)
+    bundles = {}
+
+    def bundle(name, paths, minifier):
+        parts = []
+        for path in paths:
+            with open(os.path.join(static_dir, path), encoding='utf-8') as f:
+                source = f.read()
+            parts.append(minifier(source) if minify else source)
+        # Each script ran as its own <script>, so keep statements from running together
+        separator = ';\n' if name.endswith('.js') else '\n'
+        data = separator.join(parts).encode('utf-8')
+        stem, ext = os.path.splitext(name)
+        bundles[name] = {'file': f"{stem}.{_fingerprint(data)}{ext}", 'data': data, 'sources': paths}
+
+    if scripts:
+        bundle('app.js', scripts, minify_js)
+    if stylesheets:
+        bundle('styles.css', stylesheets, minify_css)
+
+    # The first local script tag becomes the bundle, the rest are dropped
+    replaced = []
+
+    def replace_script(match):
+        if replaced:
+            return ''
+        replaced.append(True)
+        indent = match.group(0)[:len(match.group(0)) - len(match.group(0).lstrip(' \t'))]
+        return f'{indent}<script src="../static/dist/{bundles["app.js"]["file"]}"></script>\n'
+
+    def replace_stylesheet(match):
+        if match.group(1) != stylesheets[0]:
+            return ''
+        return f'<link rel="stylesheet" href="../static/dist/{bundles["styles.css"]["file"]}"/>'
+
+    html = LOCAL_SCRIPT_RE.sub(replace_script, html)
+    html = LOCAL_STYLESHEET_RE.sub(replace_stylesheet, html)
+
+    if os.path.isdir(dist_dir):
+        shutil.rmtree(dist_dir)
+    os.makedirs(dist_dir)
+
+    manifest = {}
+    for name, info in bundles.items():
+        path = os.path.join(dist_dir, info['file'])
+        _write(path, info['data'])
+        _write_precompressed(path, info['data'])
+        manifest[name] = {'file': info['file'], 'bytes': len(info['data']), 'sources': info['sources']}
+
+    index_data = html.encode('utf-8')
+    _write(os.path.join(dist_dir, 'index.html'), index_data)
+    _write_precompressed(os.path.join(dist_dir, 'index.html'), index_data)
+
+    with open(os.path.join(dist_dir, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+# ---------------------------------------------------------------------------
+# Serving
+# ---------------------------------------------------------------------------
+
+def send_precompressed(directory, filename, cache_control):
+    """send_from_directory, but serves a prebuilt .br/.gz sibling when the client accepts it"""
+    accepted = accepted_encodings(request.headers.get('Accept-Encoding'))
+    response = None
+
+    for encoding, suffix in (('br', '.br'), ('gzip', '.gz')):
+        if (encoding in accepted or '*' in accepted) and os.path.isfile(os.path.join(directory, filename + suffix)):
+            mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+            response = send_from_directory(directory, filename + suffix, mimetype=mimetype)
+            response.headers['Content-Encoding'] = encoding
+            break
+
+    if response is None:
+        response = send_from_directory(directory, filename)
+
+    response.vary.add('Accept-Encoding')
+    response.headers['Cache-Control'] = cache_control
+    return response
+
+def dist_index_available(dist_dir=DIST_DIR):
+    return os.path.isfile(os.path.join(dist_dir, 'index.html'))
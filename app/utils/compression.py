@@ -0,0 +1,112 @@
+import gzip
+import hashlib
+import sys
+
+from flask import request
+
+from app.utils.cache import TTLCache
+
+# Brotli support - gzip only when the package is missing
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+    print("Warning: brotli package not installed. Responses will only be gzip compressed.", file=sys.stderr)
+
+def accepted_encodings(header):
+    """Parse an Accept-Encoding header into the set of codings with a non-zero q-value"""
+    accepted = set()
+    for part in (header or '').split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if q > 0:
+            accepted.add(coding)
+    return accepted
+
+def choose_encoding(header):
+    accepted = accepted_encodings(header)
+    if BROTLI_AVAILABLE and ('br' in accepted or '*' in accepted):
+        return 'br'
+    if 'gzip' in accepted or '*' in accepted:
+        return 'gzip'
+    return None
+
+def compress(data, encoding, gzip_level=6, brotli_quality=5):
+    if encoding == 'br':
+        return brotli.compress(data, quality=brotli_quality)
+    # mtime=0 keeps the output identical for identical input
+    return gzip.compress(data, compresslevel=gzip_level, mtime=0)
+
+def init_compression(app):
+    """Negotiate Content-Encoding for JSON, HTML and static asset responses"""
+    if not app.config.get('COMPRESS_ENABLED', True):
+        return
+
+    min_size = app.config.get('COMPRESS_MIN_SIZE', 500)
+    gzip_level = app.config.get('COMPRESS_LEVEL', 6)
+    brotli_quality = app.config.get('COMPRESS_BROTLI_QUALITY', 5)
+    mimetypes = set(app.config.get('COMPRESS_MIMETYPES', ()))
+
+    # Compressed bodies keyed by encoding and content digest (or path + ETag for
+    # files), so each version of a response is only compressed once
+    cache = TTLCache(
+        max_entries=app.config.get('COMPRESS_CACHE_MAX_ENTRIES', 512),
+        ttl=app.config.get('COMPRESS_CACHE_TTL', 3600)
+    )
+
+    @app.after_request
+    def compress_response(response):
+        if (response.status_code < 200 or response.status_code in (204, 206, 304)
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in mimetypes
+                or request.method == 'HEAD'):
+            return response
+
+        # Generators (event streams, NDJSON exports) are left alone; files from
+        # send_from_directory are streamed too but can be read in one go
+        if response.is_streamed and not response.direct_passthrough:
+            return response
+
+        if response.content_length is not None and response.content_length < min_size:
+            return response
+
+        response.vary.add('Accept-Encoding')
+        encoding = choose_encoding(request.headers.get('Accept-Encoding'))
+        if encoding is None:
+            return response
+
+        etag, _ = response.get_etag()
+        key = (encoding, request.path, etag) if response.direct_passthrough and etag else None
+        body = cache.get(key) if key is not None else None
+
+        original = response.response
+        response.direct_passthrough = False
+        if body is None:
+            data = response.get_data()
+            if len(data) < min_size:
+                return response
+            if key is None:
+                key = (encoding, hashlib.sha1(data).digest())
+                body = cache.get(key)
+            if body is None:
+                body = compress(data, encoding, gzip_level, brotli_quality)
+                cache.set(key, body)
+
+        response.set_data(body)
+        if hasattr(original, 'close'):
+            original.close()
+        response.headers['Content-Encoding'] = encoding
+        if etag:
+            # The coded body differs byte-for-byte, so only a weak validator still holds
+            response.set_etag(etag, weak=True)
+        return response
@@ -1,6 +1,20 @@
 from functools import wraps
 from flask import session, make_response, jsonify
-from app.services.db_service import sql_call_fetch_one
+from app.models.blog import Blog, Comment
+from app.services.db_service import sql_call_fetch_one, db_call_count, check_query_budget
+from app.utils.loader import get_loader, load_user_by_username
+
+def query_budget(max_calls):
+    # Declare how many stored procedure calls a handler may make, decorators included
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            before = db_call_count()
+            result = f(*args, **kwargs)
+            check_query_budget(max_calls, db_call_count() - before, f.__qualname__)
+            return result
+        return decorated_function
+    return decorator
 
 def login_required(f):
     @wraps(f)
@@ -18,13 +32,13 @@ def verification_required(f):
         
         # Get user ID from session
         username = session['username']
-        user = sql_call_fetch_one('getUserByUsername', (username,))
+        user = load_user_by_username(username)
         if not user:
             return make_response(jsonify({'status': 'error', 'message': 'User not found'}), 404)
         
         # Check if user is verified by either email or mobile
-        is_verified = user.get('verified', False)
-        is_mobile_verified = user.get('mobile_verified', False)
+        is_verified = user.verified
+        is_mobile_verified = user.mobile_verified
         
         if not (is_verified or is_mobile_verified):
             return make_response(jsonify({
@@ -44,11 +58,11 @@ def ownership_required(resource_type):
             
             # Get user ID from session
             username = session['username']
-            user = sql_call_fetch_one('getUserByUsername', (username,))
+            user = load_user_by_username(username)
             if not user:
                 return make_response(jsonify({'status': 'error', 'message': 'User not found'}), 404)
             
-            user_id = user['userId']
+            user_id = user.userId
             
             # Check ownership based on resource type
             if resource_type == 'blog':
@@ -57,13 +71,15 @@ def ownership_required(resource_type):
                     return make_response(jsonify({'status': 'error', 'message': 'Blog ID required'}), 400)
                 
                 # Get blog
-                blog = sql_call_fetch_one('getBlogById', (blog_id,))
+                blog = sql_call_fetch_one('getBlogById', (blog_id,), model=Blog)
                 if not blog:
                     return make_response(jsonify({'status': 'error', 'message': 'Blog not found'}), 404)
                 
                 # Check if user is the owner
-                if blog['userId'] != user_id:
+                if blog.userId != user_id:
                     return make_response(jsonify({'status': 'error', 'message': 'You do not have permission to modify this blog'}), 403)
+                # The handler can load() it again without another query
+                get_loader('blog').prime(blog)
             
             elif resource_type == 'comment':
                 comment_id = kwargs.get('commentId')
@@ -71,13 +87,14 @@ def ownership_required(resource_type):
                     return make_response(jsonify({'status': 'error', 'message': 'Comment ID required'}), 400)
                 
                 # Get comment
-                comment = sql_call_fetch_one('getCommentById', (comment_id,))
+                comment = sql_call_fetch_one('getCommentById', (comment_id,), model=Comment)
                 if not comment:
                     return make_response(jsonify({'status': 'error', 'message': 'Comment not found'}), 404)
                 
                 # Check if user is the owner
-                if comment['userId'] != user_id:
+                if comment.userId != user_id:
                     return make_response(jsonify({'status': 'error', 'message': 'You do not have permission to modify this comment'}), 403)
+                get_loader('comment').prime(comment)
             
             # Continue if ownership check passes
             return f(*args, **kwargs)
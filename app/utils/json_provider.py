@@ -0,0 +1,71 @@
+import json
+import sys
+import decimal
+from datetime import datetime, date, time, timedelta
+
+from flask.json.provider import DefaultJSONProvider
+
+from app.models.row import Row
+
+# Faster JSON encoding - fall back to the stdlib when orjson is missing
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+    print("Warning: orjson package not installed. Falling back to the standard json module.", file=sys.stderr)
+
+def _default(obj):
+    # orjson already handles datetime/date natively, this covers the stdlib path and the odd MySQL types
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+    if isinstance(obj, timedelta):
+        return str(obj)
+    if isinstance(obj, decimal.Decimal):
+        return str(obj)
+    if isinstance(obj, (bytes, bytearray)):
+        return obj.decode('utf-8', 'replace')
+    if isinstance(obj, Row):
+        # orjson writes these itself
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+if ORJSON_AVAILABLE:
+    _ORJSON_OPTIONS = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS
+
+    def dumps_bytes(obj, indent=False):
+        """Serialize obj to compact UTF-8 JSON with sorted keys and ISO dates"""
+        return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS | (orjson.OPT_INDENT_2 if indent else 0))
+
+    def loads(s):
+        return orjson.loads(s)
+else:
+    def dumps_bytes(obj, indent=False):
+        """Serialize obj to compact UTF-8 JSON with sorted keys and ISO dates"""
+        if indent:
+            return json.dumps(obj, default=_default, sort_keys=True, indent=2).encode('utf-8')
+        return json.dumps(obj, default=_default, sort_keys=True, separators=(',', ':')).encode('utf-8')
+
+    def loads(s):
+        return json.loads(s)
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson when it is installed"""
+
+    def dumps(self, obj, **kwargs):
+        # Callers passing stdlib options (cls, indent, ...) get the stdlib encoder
+        if kwargs:
+            kwargs.setdefault('default', _default)
+            kwargs.setdefault('sort_keys', self.sort_keys)
+            return json.dumps(obj, **kwargs)
+        return dumps_bytes(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return json.loads(s, **kwargs)
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = self.compact is False or (self.compact is None and self._app.debug)
+        return self._app.response_class(dumps_bytes(obj, indent) + b'\n', mimetype=self.mimetype)
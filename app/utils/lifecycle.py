@@ -0,0 +1,32 @@
+import sys
+
+# Hooks run in each serving process. With a preforking server the app is
+# imported once in the master, so anything that owns threads, sockets or
+# pooled connections must be started per worker rather than at import time.
+_start_hooks = []
+_exit_hooks = []
+
+def on_worker_start(fn):
+    """Register fn to run once a worker process is ready to serve"""
+    _start_hooks.append(fn)
+    return fn
+
+def on_worker_exit(fn):
+    """Register fn to run while a worker process is shutting down"""
+    _exit_hooks.append(fn)
+    return fn
+
+def run_worker_start_hooks():
+    for fn in _start_hooks:
+        try:
+            fn()
+        except Exception as e:
+            print(f"Worker start hook {fn.__name__} failed: {e}", file=sys.stderr)
+
+def run_worker_exit_hooks():
+    # Shut things down in the reverse order they were started
+    for fn in reversed(_exit_hooks):
+        try:
+            fn()
+        except Exception as e:
+            print(f"Worker exit hook {fn.__name__} failed: {e}", file=sys.stderr)
@@ -0,0 +1,107 @@
+import json
+
+from flask import g, current_app
+
+from app.models.blog import Blog, Comment
+from app.models.user import User
+from app.services.db_service import sql_call_fetch_one, sql_call_fetch_all
+
+# Bulk lookup procedures: kind -> (procedure taking a JSON array of ids, id column, row model)
+BULK_PROCEDURES = {
+    'blog': ('getBlogsByIds', 'blogId', Blog),
+    'comment': ('getCommentsByIds', 'commentId', Comment),
+    'user': ('getUsersByIds', 'userId', User),
+}
+
+def parse_ids(values, max_ids):
+    """Turn ?ids=1,2,3 (or repeated ?ids=) into a de-duplicated list of ints, in request order"""
+    ids = []
+    seen = set()
+    for value in values:
+        for part in value.split(','):
+            part = part.strip()
+            if not part:
+                continue
+            if not part.isdigit() or int(part) <= 0:
+                raise ValueError(f"Invalid id: {part}")
+            id_value = int(part)
+            if id_value not in seen:
+                seen.add(id_value)
+                ids.append(id_value)
+
+    if not ids:
+        raise ValueError('At least one id is required')
+    if len(ids) > max_ids:
+        raise ValueError(f"At most {max_ids} ids can be requested at once")
+    return ids
+
+class Loader:
+    """
+    DataLoader-style batcher for one request: ids asked for with prefetch() are
+    queued, and the next load() fetches every queued id with one procedure call.
+    Each id is fetched at most once per request.
+    """
+
+    def __init__(self, proc_name, id_field, model=None):
+        self.proc_name = proc_name
+        self.id_field = id_field
+        self.model = model
+        self._rows = {}
+        self._queued = []
+
+    def prime(self, row):
+        # Rows fetched some other way (e.g. a list endpoint) can seed the cache
+        if row:
+            self._rows[row[self.id_field]] = row
+
+    def prefetch(self, ids):
+        for id_value in ids:
+            if id_value not in self._rows:
+                self._queued.append(id_value)
+
+    def dispatch(self):
+        missing = list(dict.fromkeys(id_value for id_value in self._queued if id_value not in self._rows))
+        self._queued = []
+        if not missing:
+            return
+
+        max_ids = current_app.config.get('BULK_MAX_IDS', 100)
+        for start in range(0, len(missing), max_ids):
+            chunk = missing[start:start + max_ids]
+            for row in sql_call_fetch_all(self.proc_name, (json.dumps(chunk),), model=self.model):
+                self._rows[row[self.id_field]] = row
+            # Remember misses too, so they are not looked up again
+            for id_value in chunk:
+                self._rows.setdefault(id_value, None)
+
+    def load(self, id_value):
+        self.prefetch([id_value])
+        self.dispatch()
+        return self._rows.get(id_value)
+
+    def load_many(self, ids):
+        """Rows for ids in the same order, None where an id does not exist"""
+        self.prefetch(ids)
+        self.dispatch()
+        return [self._rows.get(id_value) for id_value in ids]
+
+def get_loader(kind):
+    """The per-request loader for 'blog', 'comment' or 'user' rows"""
+    loaders = g.setdefault('loaders', {})
+    if kind not in loaders:
+        proc_name, id_field, model = BULK_PROCEDURES[kind]
+        loaders[kind] = Loader(proc_name, id_field, model)
+    return loaders[kind]
+
+def load_user_by_username(username):
+    """
+    getUserByUsername, fetched at most once per request: the decorators and the
+    handler behind them all look up the session user. The row also primes the
+    'user' loader.
+    """
+    users = g.setdefault('users_by_username', {})
+    if username not in users:
+        user = sql_call_fetch_one('getUserByUsername', (username,), model=User)
+        get_loader('user').prime(user)
+        users[username] = user
+    return users[username]
@@ -0,0 +1,189 @@
+import hmac
+import threading
+import time
+from contextlib import contextmanager
+from flask import g, request, has_request_context, Response, make_response, jsonify
+
+# Latency buckets in seconds, Prometheus style
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55)
+
+HELP = {
+    'http_request_duration_seconds': 'Wall time spent handling HTTP requests',
+    'http_request_db_calls': 'Stored procedure calls made per HTTP request',
+    'db_procedure_duration_seconds': 'Latency of stored procedure calls',
+    'db_procedure_errors_total': 'Stored procedure calls that raised',
+    'db_replica_failures_total': 'Times a read replica was taken out of rotation',
+    'external_call_duration_seconds': 'Latency of calls to external services',
+    'external_call_errors_total': 'External service calls that failed',
+    'rate_limited_requests_total': 'Requests rejected with 429 by a rate limit',
+    'maintenance_purged_total': 'Expired rows, codes and session files removed by maintenance',
+    'maintenance_run_duration_seconds': 'Wall time of maintenance passes',
+    'stats_views_flushed_total': 'Blog views written to blog_stats',
+    'stats_flush_failures_total': 'Blog view flushes that failed and were kept for the next one',
+}
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.total += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+class Registry:
+    """In-process store of counters and histograms, rendered as Prometheus text"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+
+    def observe(self, name, labels, value, buckets=DEFAULT_BUCKETS):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def inc(self, name, labels, amount=1):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def clear(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def render(self):
+        lines = []
+        seen = set()
+
+        def header(name, kind):
+            if name not in seen:
+                seen.add(name)
+                lines.append(f"# HELP {name} {HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        with self._lock:
+            for (name, labels), value in sorted(self._counters.items()):
+                header(name, 'counter')
+                lines.append(f"{name}{_format_labels(labels)} {value}")
+
+            for (name, labels), histogram in sorted(self._histograms.items()):
+                header(name, 'histogram')
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels(labels + (('le', _format_value(bound)),))} {cumulative}")
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {histogram.total}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {histogram.sum}")
+                lines.append(f"{name}_count{_format_labels(labels)} {histogram.total}")
+
+        return '\n'.join(lines) + '\n'
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    parts = []
+    for k, v in labels:
+        v = str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{k}="{v}"')
+    return '{' + ','.join(parts) + '}'
+
+registry = Registry()
+
+def record_db_call(proc_name, seconds, failed=False):
+    """Record one stored procedure call, also against the current request"""
+    registry.observe('db_procedure_duration_seconds', {'procedure': proc_name}, seconds)
+    if failed:
+        registry.inc('db_procedure_errors_total', {'procedure': proc_name})
+
+    if has_request_context() and 'metrics_start' in g:
+        g.metrics_db_calls += 1
+        g.metrics_db_seconds += seconds
+
+@contextmanager
+def external_call(service):
+    """Time a call to SMTP, Twilio, LDAP, Gemini, ..."""
+    started = time.perf_counter()
+    failed = False
+    try:
+        yield
+    except Exception:
+        failed = True
+        raise
+    finally:
+        seconds = time.perf_counter() - started
+        registry.observe('external_call_duration_seconds', {'service': service}, seconds)
+        if failed:
+            registry.inc('external_call_errors_total', {'service': service})
+
+        if has_request_context() and 'metrics_start' in g:
+            g.metrics_external[service] = g.metrics_external.get(service, 0.0) + seconds
+
+def init_metrics(app):
+    """Register the timing middleware and the /metrics endpoint"""
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+
+    @app.before_request
+    def start_request_timer():
+        g.metrics_start = time.perf_counter()
+        g.metrics_db_calls = 0
+        g.metrics_db_seconds = 0.0
+        g.metrics_external = {}
+
+    @app.after_request
+    def record_request_metrics(response):
+        if 'metrics_start' not in g or request.endpoint == 'metrics':
+            return response
+
+        elapsed = time.perf_counter() - g.metrics_start
+        endpoint = request.endpoint or 'unmatched'
+        registry.observe('http_request_duration_seconds', {
+            'method': request.method,
+            'endpoint': endpoint,
+            'status': response.status_code
+        }, elapsed)
+        registry.observe('http_request_db_calls', {'endpoint': endpoint}, g.metrics_db_calls, COUNT_BUCKETS)
+
+        if app.config.get('METRICS_SERVER_TIMING', False):
+            timings = [f"app;dur={elapsed * 1000:.1f}",
+                       f'db;dur={g.metrics_db_seconds * 1000:.1f};desc="{g.metrics_db_calls} calls"']
+            for service, seconds in g.metrics_external.items():
+                timings.append(f"{service};dur={seconds * 1000:.1f}")
+            response.headers['Server-Timing'] = ', '.join(timings)
+
+        return response
+
+    @app.route('/metrics')
+    def metrics():
+        if not _scrape_allowed(app.config):
+            return make_response(jsonify({'status': 'error', 'message': 'Forbidden'}), 403)
+        return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
+def _scrape_allowed(config):
+    # With METRICS_TOKEN set, any address holding it may scrape
+    token = config.get('METRICS_TOKEN')
+    if token:
+        return hmac.compare_digest(request.headers.get('Authorization', '').encode(), f"Bearer {token}".encode())
+
+    # Otherwise only METRICS_ALLOW addresses. A request relayed by a proxy the app does not
+    # trust (RATE_LIMIT_TRUSTED_PROXIES) comes from an unknown client, even over loopback
+    from app.utils.rate_limit import client_ip
+    if 'X-Forwarded-For' in request.headers and not config.get('RATE_LIMIT_TRUSTED_PROXIES', 0):
+        return False
+    return client_ip() in config.get('METRICS_ALLOW', ('127.0.0.1', '::1'))
@@ -0,0 +1,257 @@
+import math
+import re
+import sqlite3
+import sys
+import threading
+import time
+from functools import wraps
+from itertools import islice
+
+from flask import current_app, request, session, make_response, jsonify
+
+from app.utils.helpers import instance_file
+from app.utils.metrics import registry
+from app.utils.redis_client import RedisClient, RedisError
+
+# Rate limits using GCRA (the generic cell rate algorithm): a token bucket that
+# stores one timestamp per key, the "theoretical arrival time" of the next
+# request. A limit of N per period allows a burst of N, then one request every
+# period/N. Checking a key is a single read-modify-write, so stores stay O(1).
+#
+# Stores:
+#     memory - a dict in this process; with several workers each counts on its own
+#     sqlite - a WAL-mode file shared by the workers on one host
+#     redis  - one script call per check, shared by every host
+
+_UNITS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+_LIMIT_RE = re.compile(r'^\s*(\d+)\s*/\s*(\d*)\s*(second|minute|hour|day)s?\s*$')
+
+def parse_limit(spec):
+    """'5/hour', '100/minute', '20/15 minutes' -> (count, period in seconds)"""
+    match = _LIMIT_RE.match(spec)
+    if not match or int(match.group(1)) <= 0:
+        raise ValueError(f"Invalid rate limit: {spec!r}")
+    return int(match.group(1)), int(match.group(2) or 1) * _UNITS[match.group(3)]
+
+class MemoryStore:
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._tats = {}
+        self._lock = threading.Lock()
+
+    def hit(self, key, interval, tolerance):
+        """(allowed, seconds): seconds is the wait before retrying, or how far ahead the key is booked"""
+        now = time.monotonic()
+        with self._lock:
+            tat = max(self._tats.get(key, now), now)
+            if tat - now > tolerance:
+                return False, tat - now - tolerance
+            self._tats[key] = tat + interval
+            if len(self._tats) > self.max_keys:
+                self._prune(now)
+            return True, tat + interval - now
+
+    def _prune(self, now):
+        # Keys whose bucket has refilled are the same as no key at all
+        for key in [k for k, tat in self._tats.items() if tat <= now]:
+            del self._tats[key]
+        # Still too many active clients: forget the oldest entries
+        excess = len(self._tats) - self.max_keys
+        if excess > 0:
+            for key in list(islice(self._tats, excess)):
+                del self._tats[key]
+
+class SQLiteStore:
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._hits = 0
+        db = self._db()
+        db.execute('PRAGMA journal_mode=WAL')
+        db.execute('CREATE TABLE IF NOT EXISTS rate_limits (key TEXT PRIMARY KEY, tat REAL NOT NULL) WITHOUT ROWID')
+
+    def _db(self):
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = self._local.db = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            db.execute('PRAGMA synchronous=NORMAL')
+        return db
+
+    def hit(self, key, interval, tolerance):
+        db = self._db()
+        now = time.time()
+        # IMMEDIATE takes the write lock up front, so the read and the update are atomic across workers
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            row = db.execute('SELECT tat FROM rate_limits WHERE key = ?', (key,)).fetchone()
+            tat = max(row[0], now) if row else now
+            if tat - now > tolerance:
+                return False, tat - now - tolerance
+            db.execute('INSERT OR REPLACE INTO rate_limits (key, tat) VALUES (?, ?)', (key, tat + interval))
+            self._hits += 1
+            if self._hits % 1000 == 0:
+                db.execute('DELETE FROM rate_limits WHERE tat < ?', (now,))
+            return True, tat + interval - now
+        finally:
+            db.execute('COMMIT')
+
+# Same algorithm as MemoryStore.hit; floats are returned as strings since Redis truncates numbers
+_GCRA_SCRIPT = """
+local now = tonumber(ARGV[1])
+local interval = tonumber(ARGV[2])
+local tolerance = tonumber(ARGV[3])
+local tat = tonumber(redis.call('GET', KEYS[1]) or ARGV[1])
+if tat < now then
+    tat = now
+end
+if tat - now > tolerance then
+    return {0, tostring(tat - now - tolerance)}
+end
+redis.call('SET', KEYS[1], tostring(tat + interval), 'PX', math.ceil((tat + interval - now) * 1000))
+return {1, tostring(tat + interval - now)}
+"""
+
+class RedisStore:
+    def __init__(self, url, key_prefix='blog-service:rl:'):
+        self.key_prefix = key_prefix
+        self._client = RedisClient(url)
+
+    def hit(self, key, interval, tolerance):
+        allowed, seconds = self._client.command('EVAL', _GCRA_SCRIPT, 1, self.key_prefix + key,
+                                                repr(time.time()), repr(interval), repr(tolerance))
+        return bool(allowed), float(seconds)
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+def get_store(shared=True):
+    """The store for declared limits (RATE_LIMIT_STORE), or this process's memory store"""
+    name = current_app.config.get('RATE_LIMIT_STORE', 'sqlite') if shared else 'memory'
+    store = _stores.get(name)
+    if store is None:
+        with _stores_lock:
+            store = _stores.get(name)
+            if store is None:
+                config = current_app.config
+                if name == 'sqlite':
+                    store = SQLiteStore(instance_file(current_app, 'RATE_LIMIT_SQLITE_PATH', 'rate-limit.db'))
+                elif name == 'redis':
+                    store = RedisStore(config.get('RATE_LIMIT_REDIS_URL') or config.get('EVENT_BUS_REDIS_URL'))
+                elif name == 'memory':
+                    store = MemoryStore(config.get('RATE_LIMIT_MEMORY_MAX_KEYS', 100000))
+                else:
+                    raise ValueError(f"Unknown RATE_LIMIT_STORE: {name}")
+                _stores[name] = store
+    return store
+
+def client_ip():
+    """
+    The client's address. Behind RATE_LIMIT_TRUSTED_PROXIES proxies (e.g. TLS in
+    front of `serve.py --no-ssl`) it is the one the outermost proxy saw, read from
+    X-Forwarded-For the way werkzeug's ProxyFix does; entries further left were
+    written by the client and are ignored.
+    """
+    hops = current_app.config.get('RATE_LIMIT_TRUSTED_PROXIES', 0)
+    if hops:
+        forwarded = [part.strip() for part in request.headers.get('X-Forwarded-For', '').split(',') if part.strip()]
+        if len(forwarded) >= hops:
+            return forwarded[-hops]
+    return request.remote_addr or 'unknown'
+
+def _user_key():
+    return f"user:{session['username']}" if 'username' in session else None
+
+# Built-in key functions; None means the limit does not apply to this request
+KEYS = {
+    'ip': lambda: f"ip:{client_ip()}",
+    'user': _user_key,
+    'user_or_ip': lambda: _user_key() or f"ip:{client_ip()}",
+    'global': lambda: 'global',
+}
+
+def account_key(field):
+    """Key on the account a request targets: the session user, else a field of the request (userId, email, ...)"""
+    def key():
+        if 'username' in session:
+            return f"user:{session['username']}"
+        data = request.get_json(silent=True)
+        value = data.get(field) if isinstance(data, dict) else None
+        if value is None:
+            value = request.values.get(field)
+        if value is None or str(value).strip() == '':
+            return None
+        return f"{field}:{str(value).strip().lower()}"
+    return key
+
+def check_limit(scope, spec, key, shared=True):
+    """(allowed, retry_after seconds) for one hit of key against scope's limit"""
+    count, period = parse_limit(spec)
+    interval = period / count
+    try:
+        allowed, seconds = get_store(shared).hit(f"{scope}:{key}", interval, period - interval)
+    except (OSError, sqlite3.Error, RedisError, ValueError) as e:
+        # A broken store must not take the endpoints down with it
+        print(f"Rate limit store failed ({e}), allowing request", file=sys.stderr)
+        return True, 0
+    return allowed, 0 if allowed else seconds
+
+def too_many_requests(scope, spec, retry_after):
+    registry.inc('rate_limited_requests_total', {'scope': scope})
+    seconds = max(1, math.ceil(retry_after))
+    response = make_response(jsonify({
+        'status': 'error',
+        'message': f"Too many requests, try again in {seconds} seconds"
+    }), 429)
+    response.headers['Retry-After'] = str(seconds)
+    response.headers['X-RateLimit-Limit'] = spec
+    return response
+
+def rate_limit(limit, key='ip', scope=None):
+    """
+    Limit a handler to `limit` ('5/hour') per key. key is 'ip', 'user',
+    'user_or_ip', 'global' or a function returning the key for the current
+    request. Stack the decorator for several limits. RATE_LIMITS in the config
+    can override the limit of a scope, which defaults to the handler's name.
+    """
+    key_fn = KEYS[key] if isinstance(key, str) else key
+    parse_limit(limit)
+
+    def decorator(f):
+        name = scope or f"{f.__qualname__}:{key if isinstance(key, str) else key_fn.__name__}"
+
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            config = current_app.config
+            if config.get('RATE_LIMIT_ENABLED', True):
+                spec = config.get('RATE_LIMITS', {}).get(name, limit)
+                key_value = key_fn()
+                if spec and key_value is not None:
+                    allowed, retry_after = check_limit(name, spec, key_value)
+                    if not allowed:
+                        return too_many_requests(name, spec, retry_after)
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorator
+
+def init_rate_limit(app):
+    """Apply RATE_LIMIT_DEFAULT per client to every API resource"""
+    default = app.config.get('RATE_LIMIT_DEFAULT')
+    if default:
+        parse_limit(default)
+
+    @app.before_request
+    def default_rate_limit():
+        # Read at request time, so RATE_LIMIT_ENABLED / RATE_LIMIT_DEFAULT can be changed after create_app
+        config = app.config
+        default = config.get('RATE_LIMIT_DEFAULT')
+        if not config.get('RATE_LIMIT_ENABLED', True) or not default:
+            return None
+        # Only Flask-RESTful resources; pages, assets and /metrics are not limited
+        view = app.view_functions.get(request.endpoint)
+        if getattr(view, 'view_class', None) is None or request.method == 'OPTIONS':
+            return None
+        # A coarse flood guard checked on every call, so it stays in process memory
+        allowed, retry_after = check_limit('default', default, KEYS['user_or_ip'](), shared=False)
+        if not allowed:
+            return too_many_requests('default', default, retry_after)
+        return None
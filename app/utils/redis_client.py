@@ -0,0 +1,91 @@
+import socket
+import threading
+from urllib.parse import urlparse, unquote
+
+# A small Redis client, so the event bus, rate limits and OTP store can share a
+# Redis server without another dependency. Only RESP2 requests and replies are
+# handled; everything else is done with EVAL scripts.
+
+class RedisError(Exception):
+    pass
+
+class RedisConnection:
+    """Just enough of the Redis protocol (RESP2) for scripts and pub/sub"""
+
+    def __init__(self, url, timeout=5):
+        parsed = urlparse(url)
+        self.sock = socket.create_connection((parsed.hostname or 'localhost', parsed.port or 6379), timeout=timeout)
+        self.reader = self.sock.makefile('rb')
+        if parsed.password:
+            credentials = [unquote(parsed.username)] if parsed.username else []
+            self.command('AUTH', *credentials, unquote(parsed.password))
+        if parsed.path.strip('/'):
+            self.command('SELECT', parsed.path.strip('/'))
+
+    def send(self, *args):
+        parts = [b'*%d\r\n' % len(args)]
+        for arg in args:
+            if not isinstance(arg, bytes):
+                arg = str(arg).encode()
+            parts.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+        self.sock.sendall(b''.join(parts))
+
+    def read(self):
+        line = self.reader.readline()
+        if not line:
+            raise ConnectionError('Redis closed the connection')
+        kind, rest = line[:1], line[1:-2]
+        if kind == b'+':
+            return rest
+        if kind == b'-':
+            raise RedisError(rest.decode(errors='replace'))
+        if kind == b':':
+            return int(rest)
+        if kind == b'$':
+            length = int(rest)
+            return None if length < 0 else self.reader.read(length + 2)[:-2]
+        if kind == b'*':
+            length = int(rest)
+            return None if length < 0 else [self.read() for _ in range(length)]
+        raise RedisError(f"Unexpected reply {line!r}")
+
+    def command(self, *args):
+        self.send(*args)
+        return self.read()
+
+    def close(self):
+        try:
+            # Wakes up a thread blocked reading from it
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+class RedisClient:
+    """One lazily opened connection shared by threads, reopened once if it went away"""
+
+    def __init__(self, url):
+        self.url = url
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def command(self, *args):
+        with self._lock:
+            for attempt in range(2):
+                try:
+                    if self._conn is None:
+                        self._conn = RedisConnection(self.url)
+                    return self._conn.command(*args)
+                except OSError:
+                    # The server may have closed an idle connection
+                    if self._conn is not None:
+                        self._conn.close()
+                        self._conn = None
+                    if attempt:
+                        raise
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
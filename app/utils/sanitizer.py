@@ -0,0 +1,140 @@
+import html
+import re
+
+# Single-pass HTML sanitizer used when bleach is not installed.
+#
+# The input is read once, left to right, as a stream of tokens (text, comment,
+# declaration, start tag, end tag). Allowed tags are re-emitted with only their
+# allowed attributes, everything else is dropped, text is escaped, and the
+# contents of raw-text elements such as <script> are skipped entirely.
+
+DEFAULT_PROTOCOLS = frozenset(('http', 'https', 'mailto'))
+URL_ATTRIBUTES = frozenset(('href', 'src', 'action', 'formaction', 'xlink:href', 'background', 'poster'))
+VOID_TAGS = frozenset(('br', 'img', 'hr', 'wbr', 'input', 'meta', 'link', 'area', 'base', 'col', 'embed',
+                       'param', 'source', 'track'))
+# Elements whose content is not markup: it is dropped along with the tags
+RAW_TEXT_TAGS = frozenset(('script', 'style', 'iframe', 'noembed', 'noframes', 'noscript', 'textarea',
+                           'title', 'xmp', 'plaintext', 'template', 'svg', 'math', 'object'))
+
+_TOKEN_RE = re.compile(r'''
+      (?P<comment><!--.*?(?:--!?>|\Z))
+    | (?P<declaration><[!?][^>]*(?:>|\Z))
+    | <(?P<slash>/?)(?P<tag>[a-zA-Z][^\s/>]*)
+        (?P<attrs>(?:[^>"']|"[^"]*"|'[^']*')*)
+        (?P<close>>|\Z)
+    | (?P<text>[^<]+|<)
+''', re.DOTALL | re.VERBOSE)
+
+_ATTR_RE = re.compile(r'''([^\s"'>/=]+)(?:\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+)))?''')
+# Text outside tags: everything is escaped except & starting a valid character reference
+_TEXT_ESCAPE_RE = re.compile(r'&(?!(?:[a-zA-Z][a-zA-Z0-9]*|#[0-9]+|#[xX][0-9a-fA-F]+);)|[<>]')
+_TEXT_ESCAPES = {'&': '&amp;', '<': '&lt;', '>': '&gt;'}
+# Browsers ignore whitespace and control characters inside a URL scheme ("java\tscript:")
+_URL_IGNORED_RE = re.compile('[\\x00-\\x20\\x7f-\\xa0\\u1680\\u180e\\u2000-\\u200f\\u2028\\u2029\\u205f\\u3000\\ufeff]+')
+_SCHEME_RE = re.compile(r'^([a-zA-Z][a-zA-Z0-9+.-]*):')
+
+_raw_text_end_res = {}
+
+def _raw_text_end(tag):
+    pattern = _raw_text_end_res.get(tag)
+    if pattern is None:
+        pattern = _raw_text_end_res[tag] = re.compile(r'</%s(?=[\s/>])[^>]*>?' % re.escape(tag), re.IGNORECASE)
+    return pattern
+
+def _escape_text(text):
+    return _TEXT_ESCAPE_RE.sub(lambda m: _TEXT_ESCAPES[m.group(0)], text)
+
+def _safe_url(value, protocols):
+    url = _URL_IGNORED_RE.sub('', value)
+    match = _SCHEME_RE.match(url)
+    if match is None:
+        # Relative URLs are fine, unless something that looks like a scheme hides behind odd characters
+        return ':' not in url.split('/', 1)[0].split('?', 1)[0].split('#', 1)[0]
+    return match.group(1).lower() in protocols
+
+def _clean_attributes(tag, attrs, attributes, protocols):
+    allowed = attributes.get(tag, ())
+    if not allowed or not attrs.strip():
+        return ''
+
+    out = []
+    seen = set()
+    for match in _ATTR_RE.finditer(attrs):
+        name = match.group(1).lower()
+        if name not in allowed or name in seen:
+            continue
+        seen.add(name)
+        raw = next((v for v in match.group(2, 3, 4) if v is not None), '')
+        value = html.unescape(raw)
+        if name in URL_ATTRIBUTES and not _safe_url(value, protocols):
+            continue
+        out.append(f' {name}="{html.escape(value, quote=True)}"')
+    return ''.join(out)
+
+def clean_html(text, tags, attributes, protocols=DEFAULT_PROTOCOLS):
+    """Keep only allowed tags and attributes, escape everything else; one pass over the input"""
+    if not text:
+        return text
+
+    tags = frozenset(tags)
+    out = []
+    open_tags = []
+    pos = 0
+    end = len(text)
+
+    while pos < end:
+        match = _TOKEN_RE.match(text, pos)
+        pos = match.end()
+
+        token_text = match.group('text')
+        if token_text is not None:
+            out.append(_escape_text(token_text))
+            continue
+
+        tag = match.group('tag')
+        if tag is None or not match.group('close'):
+            # Comments, doctypes, processing instructions and tags cut off at the end
+            continue
+
+        tag = tag.lower()
+        if match.group('slash'):
+            if tag in open_tags:
+                # Close anything left open inside it, as a browser would
+                while open_tags:
+                    name = open_tags.pop()
+                    out.append(f'</{name}>')
+                    if name == tag:
+                        break
+            continue
+
+        if tag in RAW_TEXT_TAGS:
+            # Skip to the matching end tag, or the end of the input
+            end_match = _raw_text_end(tag).search(text, pos)
+            pos = end_match.end() if end_match else end
+            continue
+
+        if tag not in tags:
+            continue
+
+        out.append(f'<{tag}{_clean_attributes(tag, match.group("attrs"), attributes, protocols)}>')
+        if tag not in VOID_TAGS:
+            open_tags.append(tag)
+
+    while open_tags:
+        out.append(f'</{open_tags.pop()}>')
+    return ''.join(out)
+
+# Markup and SQL fragments sanitize_string() strips from plain strings; the markup
+# alternatives are case-insensitive, the SQL keywords only match in upper case.
+# The lookahead on the possible first characters lets the scan skip everything else.
+_STRING_STRIP_RE = re.compile(
+    r'(?=[<jJoO;\-/*USIDTA])'
+    r'(?:(?is:<script[^>]*>.*?</script>|javascript:|on\w+\s*=)'
+    r'|;|--|/\*|\*/|UNION|SELECT|INSERT|UPDATE|DELETE|DROP|TRUNCATE|ALTER)'
+)
+
+def clean_string(text):
+    """Strip script blocks, inline handlers and SQL keywords in one pass, then HTML-escape"""
+    if not isinstance(text, str):
+        return text
+    return html.escape(_STRING_STRIP_RE.sub('', text))
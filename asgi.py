@@ -0,0 +1,15 @@
+#!/usr/bin/env python3
+from app.asgi import create_asgi_app
+
+app = create_asgi_app()
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(
+        app,
+        host=app.config['APP_HOST'],
+        port=app.config['APP_PORT'],
+        ssl_certfile='cert.pem',
+        ssl_keyfile='key.pem',
+        lifespan='on'
+    )
\ No newline at end of file
@@ -4,6 +4,7 @@ SET NAMES utf8mb4;
 ALTER DATABASE CHARACTER SET = utf8mb4 COLLATE = utf8mb4_unicode_ci;
 
 -- CLEANUP
+DROP TABLE IF EXISTS blog_stats;
 DROP TABLE IF EXISTS comments;
 DROP TABLE IF EXISTS blogs;
 DROP TABLE IF EXISTS verification;
@@ -55,6 +56,7 @@ CREATE TABLE verification(
     expiresAt timestamp default (current_timestamp + interval 15 minute),
     primary key(userId),
     unique key(verificationToken),
+    key(expiresAt),
     constraint fk_verification_user foreign key(userId) references users(userId) on delete cascade on update restrict
 );
 
@@ -64,6 +66,7 @@ CREATE TABLE mobile_verification(
     createdAt timestamp default current_timestamp,
     expiresAt timestamp default (current_timestamp + interval 15 minute),
     primary key(userId),
+    key(expiresAt),
     constraint fk_mobile_verification_user foreign key(userId) references users(userId) on delete cascade on update restrict
 );
 
@@ -73,6 +76,7 @@ CREATE TABLE pending_email_changes (
     newEmail VARCHAR(100) NOT NULL,
     createdAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     expiresAt TIMESTAMP DEFAULT (CURRENT_TIMESTAMP + INTERVAL 24 HOUR),
+    KEY (expiresAt),
     FOREIGN KEY (userId) REFERENCES users(userId) ON DELETE CASCADE
 );
 
@@ -81,6 +85,7 @@ CREATE TABLE pending_phone_changes (
     newPhone VARCHAR(20) NOT NULL,
     createdAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     expiresAt TIMESTAMP DEFAULT (CURRENT_TIMESTAMP + INTERVAL 24 HOUR),
+    KEY (expiresAt),
     FOREIGN KEY (userId) REFERENCES users(userId) ON DELETE CASCADE
 );
 
@@ -101,6 +106,7 @@ CREATE TABLE password_reset (
     expiresAt timestamp default (current_timestamp + interval 1 hour),
     primary key(userId),
     unique key(resetOTP),
+    key(expiresAt),
     constraint fk_password_reset_user foreign key(userId) references users(userId) on delete cascade on update restrict
 );
 
@@ -127,6 +133,19 @@ CREATE TABLE comments(
     constraint fk_blog foreign key(blogId) references blogs(blogId) on delete cascade on update restrict,
     constraint fk_parent_comment foreign key(parentCommentId) references comments(commentId) on delete cascade on update restrict
 );
+
+-- View counts, written in batches by addBlogViews. hotScore is log2 of the views
+-- decayed by a half-life, on a time scale that grows instead of decaying the
+-- stored values, so it never has to be rewritten and can be indexed
+CREATE TABLE blog_stats(
+    blogId int not null,
+    views bigint not null default 0,
+    hotScore double not null default 0,
+    lastViewed timestamp default current_timestamp,
+    primary key(blogId),
+    key(hotScore),
+    constraint fk_stats_blog foreign key(blogId) references blogs(blogId) on delete cascade on update restrict
+);
 -- USER MANAGEMENT PROCEDURES
 
 -- User retrieval procedures
@@ -152,6 +171,45 @@ BEGIN
 END //
 DELIMITER ;
 
+DROP PROCEDURE IF EXISTS getUsersByIds;
+DELIMITER //
+CREATE PROCEDURE getUsersByIds(
+    userIdsIn JSON
+)
+BEGIN
+    -- userIdsIn is a JSON array of ids, rows come back in the same order
+    SELECT 
+        u.userId, 
+        u.username, 
+        u.email, 
+        u.phone_number,
+        u.joinDate,
+        u.user_type,
+        IF(vu.userId IS NOT NULL, TRUE, FALSE) AS verified,
+        IF(mvu.userId IS NOT NULL, TRUE, FALSE) AS mobile_verified
+    FROM JSON_TABLE(userIdsIn, '$[*]' COLUMNS(ord FOR ORDINALITY, id INT PATH '$')) ids
+    JOIN users u ON u.userId = ids.id
+    LEFT JOIN verified_users vu ON u.userId = vu.userId
+    LEFT JOIN mobile_verified_users mvu ON u.userId = mvu.userId
+    ORDER BY ids.ord;
+END //
+DELIMITER ;
+
+DROP PROCEDURE IF EXISTS getUsersByUsernames;
+DELIMITER //
+CREATE PROCEDURE getUsersByUsernames(
+    usernamesIn JSON
+)
+BEGIN
+    -- usernamesIn is a JSON array of usernames, used by the bulk importer to map authors
+    SELECT 
+        u.userId, 
+        u.username
+    FROM JSON_TABLE(usernamesIn, '$[*]' COLUMNS(username VARCHAR(25) PATH '$')) names
+    JOIN users u ON u.username = names.username;
+END //
+DELIMITER ;
+
 DROP PROCEDURE IF EXISTS getUserByUsername;
 DELIMITER //
 CREATE PROCEDURE getUserByUsername(
@@ -395,6 +453,40 @@ BEGIN
 END //
 DELIMITER ;
 
+DROP PROCEDURE IF EXISTS getBlogSubscribers;
+DELIMITER //
+CREATE PROCEDURE getBlogSubscribers(
+    excludeUserIdIn INT
+)
+BEGIN
+    -- Users without a preferences row get the defaults (notify on)
+    SELECT u.userId, u.email
+    FROM users u
+    LEFT JOIN notification_preferences np ON u.userId = np.userId
+    WHERE u.userId <> excludeUserIdIn
+    AND u.email IS NOT NULL
+    AND u.email <> ''
+    AND COALESCE(np.notifyOnBlog, TRUE);
+END //
+DELIMITER ;
+
+DROP PROCEDURE IF EXISTS getCommentSubscribers;
+DELIMITER //
+CREATE PROCEDURE getCommentSubscribers(
+    userIdsIn JSON
+)
+BEGIN
+    -- Which of the given users have an email and want comment notifications
+    SELECT u.userId, u.username, u.email
+    FROM JSON_TABLE(userIdsIn, '$[*]' COLUMNS(id INT PATH '$')) ids
+    JOIN users u ON u.userId = ids.id
+    LEFT JOIN notification_preferences np ON u.userId = np.userId
+    WHERE u.email IS NOT NULL
+    AND u.email <> ''
+    AND COALESCE(np.notifyOnComment, TRUE);
+END //
+DELIMITER ;
+
 DROP PROCEDURE IF EXISTS updateNotificationPreferences;
 DELIMITER //
 CREATE PROCEDURE updateNotificationPreferences(
@@ -637,32 +729,158 @@ CREATE PROCEDURE resetPasswordWithOTP(
     passwordSaltIn VARCHAR(32)
 )
 BEGIN
-    DECLARE userId INT;
+    -- Not named userId: a local variable shadows the column, and userId = userId matches every row
+    DECLARE foundUserId INT;
     
     -- Get user ID from reset OTP
-    SELECT pr.userId INTO userId
+    SELECT pr.userId INTO foundUserId
     FROM password_reset pr
     WHERE pr.resetOTP = otpIn
     AND pr.expiresAt > NOW();
     
     -- If valid OTP found
-    IF userId IS NOT NULL THEN
+    IF foundUserId IS NOT NULL THEN
         -- Update password
         UPDATE users
         SET password_hash = passwordHashIn,
             password_salt = passwordSaltIn
-        WHERE userId = userId;
+        WHERE userId = foundUserId;
         
         -- Remove reset record
-        DELETE FROM password_reset WHERE userId = userId;
+        DELETE FROM password_reset WHERE userId = foundUserId;
         
-        SELECT TRUE as success, userId;
+        SELECT TRUE as success, foundUserId as userId;
     ELSE
         SELECT FALSE as success, NULL as userId;
     END IF;
 END //
 DELIMITER ;
 
+-- OTP codes are checked by the OTP service (app/services/otp_service.py); these
+-- apply the result once a code has been accepted
+
+DROP PROCEDURE IF EXISTS completeEmailVerification;
+DELIMITER //
+CREATE PROCEDURE completeEmailVerification(
+    userIdIn INT
+)
+BEGIN
+    DECLARE pendingEmail VARCHAR(100);
+    DECLARE userExists BOOLEAN;
+    
+    SELECT EXISTS(SELECT 1 FROM users WHERE userId = userIdIn) INTO userExists;
+    
+    IF userExists THEN
+        SELECT newEmail INTO pendingEmail
+        FROM pending_email_changes
+        WHERE userId = userIdIn;
+        
+        -- Apply the email change if there is one
+        IF pendingEmail IS NOT NULL THEN
+            UPDATE users
+            SET email = pendingEmail
+            WHERE userId = userIdIn;
+            
+            DELETE FROM pending_email_changes
+            WHERE userId = userIdIn;
+        END IF;
+        
+        INSERT IGNORE INTO verified_users (userId)
+        VALUES (userIdIn);
+        
+        -- Any code left from before the OTP service
+        DELETE FROM verification WHERE userId = userIdIn;
+    END IF;
+    
+    SELECT userExists as success, userIdIn as userId, pendingEmail as updated_email;
+END //
+DELIMITER ;
+
+DROP PROCEDURE IF EXISTS completeMobileVerification;
+DELIMITER //
+CREATE PROCEDURE completeMobileVerification(
+    userIdIn INT
+)
+BEGIN
+    DECLARE pendingPhone VARCHAR(20);
+    DECLARE userExists BOOLEAN;
+    
+    SELECT EXISTS(SELECT 1 FROM users WHERE userId = userIdIn) INTO userExists;
+    
+    IF userExists THEN
+        SELECT newPhone INTO pendingPhone
+        FROM pending_phone_changes
+        WHERE userId = userIdIn;
+        
+        -- Apply the phone change if there is one
+        IF pendingPhone IS NOT NULL THEN
+            UPDATE users
+            SET phone_number = pendingPhone
+            WHERE userId = userIdIn;
+            
+            DELETE FROM pending_phone_changes
+            WHERE userId = userIdIn;
+        END IF;
+        
+        INSERT IGNORE INTO mobile_verified_users (userId)
+        VALUES (userIdIn);
+        
+        DELETE FROM mobile_verification WHERE userId = userIdIn;
+    END IF;
+    
+    SELECT userExists as success, userIdIn as userId, pendingPhone as updated_phone;
+END //
+DELIMITER ;
+
+DROP PROCEDURE IF EXISTS resetPasswordForUser;
+DELIMITER //
+CREATE PROCEDURE resetPasswordForUser(
+    userIdIn INT,
+    passwordHashIn VARCHAR(128),
+    passwordSaltIn VARCHAR(32)
+)
+BEGIN
+    DECLARE updatedRows INT;
+    
+    UPDATE users
+    SET password_hash = passwordHashIn,
+        password_salt = passwordSaltIn
+    WHERE userId = userIdIn
+    AND user_type = 'local';
+    SET updatedRows = ROW_COUNT();
+    
+    DELETE FROM password_reset WHERE userId = userIdIn;
+    
+    SELECT updatedRows > 0 as success, userIdIn as userId;
+END //
+DELIMITER ;
+
+-- One chunk of expired rows, oldest first, so each call is a short transaction
+DROP PROCEDURE IF EXISTS purgeExpiredChunk;
+DELIMITER //
+CREATE PROCEDURE purgeExpiredChunk(
+    tableIn VARCHAR(32),
+    batchSizeIn INT
+)
+BEGIN
+    IF tableIn = 'verification' THEN
+        DELETE FROM verification WHERE expiresAt < NOW() ORDER BY expiresAt LIMIT batchSizeIn;
+    ELSEIF tableIn = 'mobile_verification' THEN
+        DELETE FROM mobile_verification WHERE expiresAt < NOW() ORDER BY expiresAt LIMIT batchSizeIn;
+    ELSEIF tableIn = 'password_reset' THEN
+        DELETE FROM password_reset WHERE expiresAt < NOW() ORDER BY expiresAt LIMIT batchSizeIn;
+    ELSEIF tableIn = 'pending_email_changes' THEN
+        DELETE FROM pending_email_changes WHERE expiresAt < NOW() ORDER BY expiresAt LIMIT batchSizeIn;
+    ELSEIF tableIn = 'pending_phone_changes' THEN
+        DELETE FROM pending_phone_changes WHERE expiresAt < NOW() ORDER BY expiresAt LIMIT batchSizeIn;
+    ELSE
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Unknown table';
+    END IF;
+    
+    SELECT ROW_COUNT() as deletedRows;
+END //
+DELIMITER ;
+
 -- BLOG MANAGEMENT PROCEDURES
 
 DROP PROCEDURE IF EXISTS getBlogs;
@@ -710,6 +928,82 @@ BEGIN
 END //
 DELIMITER ;
 
+DROP PROCEDURE IF EXISTS exportBlogs;
+DELIMITER //
+CREATE PROCEDURE exportBlogs(
+    userIdIn INT,
+    fromIn DATETIME,
+    toIn DATETIME
+)
+BEGIN
+    -- Streamed by the NDJSON export, ordered so comments can be merged in by blogId
+    SELECT 
+        b.blogId,
+        b.title,
+        b.content,
+        b.dateCreated as date,
+        b.userId,
+        u.username as author
+    FROM blogs b
+    JOIN users u ON b.userId = u.userId
+    WHERE 
+        (userIdIn IS NULL OR b.userId = userIdIn)
+        AND (fromIn IS NULL OR b.dateCreated >= fromIn)
+        AND (toIn IS NULL OR b.dateCreated < toIn)
+    ORDER BY b.blogId;
+END //
+DELIMITER ;
+
+DROP PROCEDURE IF EXISTS exportComments;
+DELIMITER //
+CREATE PROCEDURE exportComments(
+    userIdIn INT,
+    fromIn DATETIME,
+    toIn DATETIME
+)
+BEGIN
+    -- Every comment on the blogs exportBlogs returns for the same filters,
+    -- parents before replies within a blog
+    SELECT 
+        c.commentId,
+        c.content,
+        c.dateCreated as date,
+        c.blogId,
+        c.userId,
+        c.parentCommentId,
+        u.username as author
+    FROM comments c
+    JOIN blogs b ON c.blogId = b.blogId
+    JOIN users u ON c.userId = u.userId
+    WHERE 
+        (userIdIn IS NULL OR b.userId = userIdIn)
+        AND (fromIn IS NULL OR b.dateCreated >= fromIn)
+        AND (toIn IS NULL OR b.dateCreated < toIn)
+    ORDER BY c.blogId, c.commentId;
+END //
+DELIMITER ;
+
+DROP PROCEDURE IF EXISTS getBlogsByIds;
+DELIMITER //
+CREATE PROCEDURE getBlogsByIds(
+    blogIdsIn JSON
+)
+BEGIN
+    -- blogIdsIn is a JSON array of ids, rows come back in the same order
+    SELECT 
+        b.blogId,
+        b.title,
+        b.content,
+        b.dateCreated as date,
+        b.userId,
+        u.username as author
+    FROM JSON_TABLE(blogIdsIn, '$[*]' COLUMNS(ord FOR ORDINALITY, id INT PATH '$')) ids
+    JOIN blogs b ON b.blogId = ids.id
+    JOIN users u ON b.userId = u.userId
+    ORDER BY ids.ord;
+END //
+DELIMITER ;
+
 DROP PROCEDURE IF EXISTS getBlogsByUserId;
 DELIMITER //
 CREATE PROCEDURE getBlogsByUserId(
@@ -801,6 +1095,54 @@ BEGIN
 END //
 DELIMITER ;
 
+-- BLOG STATS PROCEDURES
+
+-- viewsIn is a JSON array of [blogId, views] pairs. A batch adds log2(views) plus
+-- now / halfLifeIn to hotScore as a log-sum-exp: adding 2^x to 2^y without ever
+-- leaving the log scale. Views of blogs deleted in the meantime are dropped
+DROP PROCEDURE IF EXISTS addBlogViews;
+DELIMITER //
+CREATE PROCEDURE addBlogViews(
+    viewsIn JSON,
+    halfLifeIn INT
+)
+BEGIN
+    INSERT INTO blog_stats (blogId, views, hotScore, lastViewed)
+    SELECT v.id, v.n, LOG2(v.n) + UNIX_TIMESTAMP() / halfLifeIn, CURRENT_TIMESTAMP
+    FROM JSON_TABLE(viewsIn, '$[*]' COLUMNS(id INT PATH '$[0]', n INT PATH '$[1]')) v
+    JOIN blogs b ON b.blogId = v.id
+    WHERE v.n > 0
+    ORDER BY v.id
+    ON DUPLICATE KEY UPDATE
+        hotScore = GREATEST(blog_stats.hotScore, VALUES(hotScore))
+            + LOG2(1 + POW(2, -ABS(blog_stats.hotScore - VALUES(hotScore)))),
+        views = blog_stats.views + VALUES(views),
+        lastViewed = VALUES(lastViewed);
+END //
+DELIMITER ;
+
+DROP PROCEDURE IF EXISTS getTrendingBlogs;
+DELIMITER //
+CREATE PROCEDURE getTrendingBlogs(
+    limitIn INT
+)
+BEGIN
+    SELECT 
+        b.blogId,
+        b.title,
+        b.content,
+        b.dateCreated as date,
+        b.userId,
+        u.username as author,
+        s.views
+    FROM blog_stats s
+    JOIN blogs b ON b.blogId = s.blogId
+    JOIN users u ON b.userId = u.userId
+    ORDER BY s.hotScore DESC
+    LIMIT limitIn;
+END //
+DELIMITER ;
+
 -- COMMENT MANAGEMENT PROCEDURES
 
 DROP PROCEDURE IF EXISTS getCommentsByBlog;
@@ -852,6 +1194,28 @@ BEGIN
 END //
 DELIMITER ;
 
+DROP PROCEDURE IF EXISTS getCommentsByIds;
+DELIMITER //
+CREATE PROCEDURE getCommentsByIds(
+    commentIdsIn JSON
+)
+BEGIN
+    -- commentIdsIn is a JSON array of ids, rows come back in the same order
+    SELECT 
+        c.commentId,
+        c.content,
+        c.dateCreated as date,
+        c.blogId,
+        c.userId,
+        c.parentCommentId,
+        u.username as author
+    FROM JSON_TABLE(commentIdsIn, '$[*]' COLUMNS(ord FOR ORDINALITY, id INT PATH '$')) ids
+    JOIN comments c ON c.commentId = ids.id
+    JOIN users u ON c.userId = u.userId
+    ORDER BY ids.ord;
+END //
+DELIMITER ;
+
 DROP PROCEDURE IF EXISTS getCommentReplies;
 DELIMITER //
 CREATE PROCEDURE getCommentReplies(
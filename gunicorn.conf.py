@@ -0,0 +1,37 @@
+# Gunicorn settings for production serving (see serve.py)
+import multiprocessing
+import os
+import runpy
+
+settings = runpy.run_path(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config', 'settings.py'))
+
+bind = f"{settings['APP_HOST']}:{settings['APP_PORT']}"
+workers = settings.get('SERVER_WORKERS') or multiprocessing.cpu_count() * 2 + 1
+threads = settings.get('SERVER_THREADS', 4)
+worker_class = 'gthread' if threads > 1 else 'sync'
+
+# Import the app once in the master and fork workers from it
+preload_app = True
+
+# Seconds a worker may spend on one request, and to finish in-flight
+# requests after SIGTERM before it is killed
+timeout = settings.get('SERVER_TIMEOUT', 60)
+graceful_timeout = settings.get('SERVER_GRACEFUL_TIMEOUT', 30)
+keepalive = settings.get('SERVER_KEEPALIVE', 5)
+
+# Recycle workers now and then so slow leaks cannot build up
+max_requests = settings.get('SERVER_MAX_REQUESTS', 0)
+max_requests_jitter = max_requests // 10
+
+if os.path.exists('cert.pem') and os.path.exists('key.pem'):
+    certfile = 'cert.pem'
+    keyfile = 'key.pem'
+
+def post_fork(server, worker):
+    # Background threads and connections are per worker, never inherited from the master
+    from app.utils.lifecycle import run_worker_start_hooks
+    run_worker_start_hooks()
+
+def worker_exit(server, worker):
+    from app.utils.lifecycle import run_worker_exit_hooks
+    run_worker_exit_hooks()
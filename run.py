@@ -1,9 +1,18 @@
 #!/usr/bin/env python3
+import atexit
+import os
+
 from app import create_app
+from app.utils.lifecycle import run_worker_start_hooks, run_worker_exit_hooks
 
 app = create_app()
 
 if __name__ == "__main__":
+    # With the reloader on, only the child process actually serves requests
+    if not app.config['APP_DEBUG'] or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        run_worker_start_hooks()
+        atexit.register(run_worker_exit_hooks)
+
     context = ('cert.pem', 'key.pem')
     app.run(
         host=app.config['APP_HOST'],
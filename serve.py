@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+import argparse
+import os
+import sys
+
+from gunicorn.app.wsgiapp import run
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the blog service with preforked gunicorn workers')
+    parser.add_argument('--bind', help='host:port to listen on (defaults to APP_HOST:APP_PORT)')
+    parser.add_argument('--workers', type=int, help='Number of worker processes')
+    parser.add_argument('--threads', type=int, help='Threads per worker')
+    parser.add_argument('--no-ssl', action='store_true', help='Serve plain HTTP, e.g. behind a TLS proxy')
+    args = parser.parse_args()
+
+    config = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'gunicorn.conf.py')
+    argv = ['gunicorn', '--config', config]
+    if args.bind:
+        argv += ['--bind', args.bind]
+    if args.workers:
+        argv += ['--workers', str(args.workers)]
+    if args.threads:
+        argv += ['--threads', str(args.threads)]
+        if args.threads > 1:
+            argv += ['--worker-class', 'gthread']
+    if args.no_ssl:
+        argv += ['--certfile', '', '--keyfile', '']
+    argv.append('run:app')
+
+    sys.argv = argv
+    run()
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -157,6 +157,15 @@ document.addEventListener('DOMContentLoaded', function() {
             }
         },
         
+        watch: {
+            // Stop streaming comments once the blog is no longer shown
+            showBlogModal(open) {
+                if (!open) {
+                    window.CommentService.unsubscribe();
+                }
+            }
+        },
+        
         created() {
             this.loadConfig()
                 .then(() => {
@@ -86,6 +86,7 @@ const BlogService = {
         .then(response => {
             app.selectedBlog = response.data;
             window.CommentService.getComments(app, blogId);
+            window.CommentService.subscribe(app, blogId);
             app.showUserBlogsModal = false;
             app.showBlogModal = true;
         })
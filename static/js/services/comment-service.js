@@ -2,6 +2,11 @@
  * Comment Service
  */
 const CommentService = {
+    // Live updates for the open blog, see subscribe()
+    stream: null,
+    streamBlogId: null,
+    retryTimer: null,
+    
     getComments(app, blogId) {
         app.loading.comments = true;
         axios.get(`${app.baseURL}/blogs-api/${blogId}/comments`, {
@@ -94,7 +99,11 @@ const CommentService = {
                 content: "",
                 parentCommentId: null
             };
-            this.getComments(app, app.selectedBlog.blogId);
+            
+            // The stream delivers the new comment, only refetch without one
+            if (!this.isStreaming(app.selectedBlog.blogId)) {
+                this.getComments(app, app.selectedBlog.blogId);
+            }
         })
         .catch(error => {
             console.log("Error creating comment:", error);
@@ -170,8 +179,10 @@ const CommentService = {
         .then(response => {
             app.showNotification("success", "Comment deleted successfully");
             
-            // Refresh comments
-            this.getComments(app, app.selectedBlog.blogId);
+            // Refresh comments, unless the stream already removed it
+            if (!this.isStreaming(app.selectedBlog.blogId)) {
+                this.getComments(app, app.selectedBlog.blogId);
+            }
         })
         .catch(error => {
             console.log("Error deleting comment:", error);
@@ -184,6 +195,100 @@ const CommentService = {
         .finally(() => {
             app.loading.comments = false;
         });
+    },
+    
+    // Keep the comments of an open blog up to date over Server-Sent Events
+    subscribe(app, blogId) {
+        this.unsubscribe();
+        if (!window.EventSource) {
+            return;
+        }
+        
+        const source = new EventSource(`${app.baseURL}/blogs-api/${blogId}/comments/stream`, {
+            withCredentials: true
+        });
+        this.stream = source;
+        this.streamBlogId = blogId;
+        
+        const handle = (name, apply) => {
+            source.addEventListener(name, event => {
+                if (!app.selectedBlog || app.selectedBlog.blogId !== blogId) {
+                    return;
+                }
+                apply(JSON.parse(event.data));
+            });
+        };
+        
+        handle("comment.created", comment => {
+            if (!app.selectedComments.some(c => c.commentId === comment.commentId)) {
+                app.selectedComments = this.sortComments(app.selectedComments.concat([comment]));
+            }
+        });
+        handle("comment.updated", comment => {
+            app.selectedComments = app.selectedComments.map(c => c.commentId === comment.commentId ? comment : c);
+        });
+        handle("comment.deleted", data => {
+            // The server deletes replies with their parent (ON DELETE CASCADE), at any depth
+            const removed = new Set([data.commentId]);
+            let grew = true;
+            while (grew) {
+                grew = false;
+                app.selectedComments.forEach(c => {
+                    if (!removed.has(c.commentId) && removed.has(c.parentCommentId)) {
+                        removed.add(c.commentId);
+                        grew = true;
+                    }
+                });
+            }
+            app.selectedComments = app.selectedComments.filter(c => !removed.has(c.commentId));
+        });
+        // Sent when events were missed while disconnected
+        handle("reset", () => this.getComments(app, blogId));
+        
+        source.onerror = () => {
+            // EventSource reconnects by itself unless the server refused the stream (e.g. 503)
+            if (source.readyState === EventSource.CLOSED && this.stream === source) {
+                this.stream = null;
+                this.retryTimer = setTimeout(() => {
+                    this.retryTimer = null;
+                    if (app.showBlogModal && app.selectedBlog && app.selectedBlog.blogId === blogId) {
+                        this.getComments(app, blogId);
+                        this.subscribe(app, blogId);
+                    }
+                }, 30000);
+            }
+        };
+    },
+    
+    unsubscribe() {
+        if (this.retryTimer) {
+            clearTimeout(this.retryTimer);
+            this.retryTimer = null;
+        }
+        if (this.stream) {
+            this.stream.close();
+            this.stream = null;
+        }
+        this.streamBlogId = null;
+    },
+    
+    isStreaming(blogId) {
+        return this.stream !== null && this.streamBlogId === blogId && this.stream.readyState === EventSource.OPEN;
+    },
+    
+    // Same order as getCommentsByBlog: replies follow their parent, oldest first
+    sortComments(comments) {
+        return comments.slice().sort((a, b) => {
+            const threadA = a.parentCommentId || a.commentId;
+            const threadB = b.parentCommentId || b.commentId;
+            if (threadA !== threadB) {
+                return threadA - threadB;
+            }
+            if (a.date !== b.date) {
+                return a.date < b.date ? -1 : 1;
+            }
+            return a.commentId - b.commentId;
+        });
     }
 };
 
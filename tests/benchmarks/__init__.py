@@ -0,0 +1 @@
+# Make the benchmarks directory a package
\ No newline at end of file
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Offline API benchmark.
+
+Boots create_app() against a local MySQL/MariaDB scratch database loaded from
+database/schema.sql, stubs SMTP/Twilio/LDAP/Gemini, seeds it with the synthetic
+data generator (datagen.py) and drives each endpoint concurrently, reporting
+p50/p95/p99 latency and requests/sec.
+
+WARNING: the database named by --db-name is dropped and recreated.
+
+    python -m tests.benchmarks.bench_api --db-user bench --db-password bench --db-name blog_bench
+    python -m tests.benchmarks.bench_api ... --compare bench_results/api-<commit>.json
+"""
+
+import argparse
+import json
+import random
+import urllib.request
+
+from tests.benchmarks.harness import reset_database, stub_external_services, create_benchmark_app, BackgroundServer
+from tests.benchmarks.datagen import generate, SCALES, BENCH_USERNAME, BENCH_PASSWORD
+from tests.benchmarks.load import run_load, save_results, print_table
+
+def login(base_url):
+    """Log in as the benchmark user and return the session cookie header value"""
+    body = json.dumps({'username': BENCH_USERNAME, 'password': BENCH_PASSWORD, 'type': 'local'}).encode()
+    request = urllib.request.Request(f"{base_url}/auth/login", data=body, method='POST',
+                                     headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request) as response:
+        return response.headers['Set-Cookie'].split(';', 1)[0]
+
+def scenarios(rng, users, blogs, comments):
+    def ids(upper, count=200):
+        return [rng.randint(1, upper) for _ in range(count)]
+
+    return {
+        'GET /blogs-api': (['/blogs-api?limit=20', '/blogs-api?limit=20&offset=20'], False),
+        'GET /blogs-api/<id>': ([f"/blogs-api/{i}" for i in ids(blogs)], False),
+        'GET /blogs-api/trending': (['/blogs-api/trending?limit=10'], False),
+        'GET /blogs-api/<id>/comments': ([f"/blogs-api/{i}/comments" for i in ids(blogs)], False),
+        'GET /comments/<id>': ([f"/comments/{i}" for i in ids(comments)], False),
+        'GET /comments/<id>/replies': ([f"/comments/{i}/replies" for i in ids(comments)], False),
+        'GET /users': (['/users?limit=20'], False),
+        'GET /users-api/<id>': ([f"/users-api/{i}" for i in ids(users)], False),
+        'GET /users-api/<id>/blogs': ([f"/users-api/{i}/blogs" for i in ids(users)], False),
+        'GET /auth/login': (['/auth/login'], True),
+        'POST /blogs/create': ([('POST', '/blogs/create', {'title': 'Load test', 'content': '<p>Load test body</p>'})], True),
+        'POST /blogs/<id>/comments/create': (
+            [('POST', f"/blogs/{i}/comments/create", {'content': 'Load test comment'}) for i in ids(blogs, 50)], True),
+        'POST /ai/generate': ([('POST', '/ai/generate', {'prompt': 'Write about benchmarks'})], True),
+    }
+
+def compare(results, previous_path):
+    with open(previous_path) as f:
+        previous = json.load(f)['results']
+
+    print(f"\n{'endpoint':<36}{'req/s':>16}{'p95 ms':>18}")
+    for label, summary in results.items():
+        before = previous.get(label)
+        if not before:
+            continue
+        rps = f"{before['requestsPerSecond']} -> {summary['requestsPerSecond']}"
+        p95 = f"{before['p95Ms']} -> {summary['p95Ms']}"
+        print(f"{label:<36}{rps:>16}{p95:>18}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline API benchmark against a local database')
+    parser.add_argument('--db-host', default='127.0.0.1')
+    parser.add_argument('--db-port', type=int, default=3306)
+    parser.add_argument('--db-user', required=True)
+    parser.add_argument('--db-password', default='')
+    parser.add_argument('--db-name', default='blog_bench')
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small', help='Synthetic data volume (see datagen.py)')
+    parser.add_argument('--mode', choices=('insert', 'infile'), default='insert', help='How datagen bulk-loads the rows')
+    parser.add_argument('--no-seed', action='store_true', help='Reuse the existing database contents')
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--requests', type=int, default=2000, help='Requests per endpoint')
+    parser.add_argument('--external-latency', type=float, default=0.05, help='Seconds each stubbed external call takes')
+    parser.add_argument('--only', action='append', help='Only run endpoints whose label contains this text')
+    parser.add_argument('--compare', help='Earlier results JSON to compare against')
+    parser.add_argument('--seed', type=int, default=3103)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    db_config = {
+        'DB_HOST': args.db_host,
+        'DB_PORT': args.db_port,
+        'DB_USER': args.db_user,
+        'DB_PASSWD': args.db_password,
+        'DB_DATABASE': args.db_name,
+    }
+
+    scale = SCALES[args.scale]
+    if not args.no_seed:
+        print(f"Loading schema into {args.db_name}...")
+        reset_database(db_config)
+        print(f"Seeding the {args.scale} data set...")
+        generate(db_config, scale['users'], scale['blogs'], scale['comments'], args.seed, args.mode)
+
+    stub_external_services(args.external_latency)
+    app = create_benchmark_app(db_config)
+
+    results = {}
+    with BackgroundServer(app) as server:
+        cookie = login(server.url)
+        for label, (specs, needs_auth) in scenarios(rng, scale['users'], scale['blogs'], scale['comments']).items():
+            if args.only and not any(text in label for text in args.only):
+                continue
+            print(f"Benchmarking {label}...")
+            headers = {'Cookie': cookie} if needs_auth else {}
+            results[label] = run_load(server.url, specs, args.concurrency, args.requests, headers=headers, allowed_statuses=(404,))
+
+    print_table(results)
+    print(f"Results saved to {save_results('api', results)}")
+    if args.compare:
+        compare(results, args.compare)
+
+if __name__ == "__main__":
+    main()
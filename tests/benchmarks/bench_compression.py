@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Response compression benchmark.
+
+Serves synthetic BlogList pages (long HTML posts) and the static assets through
+the app's compression hook and reports wire size and time per response for a
+cold compressed cache versus a warm one.
+
+    python -m tests.benchmarks.bench_compression
+    python -m tests.benchmarks.bench_compression --rows 50 --encoding br
+"""
+
+import argparse
+import time
+from datetime import datetime
+
+from app import create_app
+from app.models.blog import Blog
+from app.routes import blog
+from tests.benchmarks.datagen import Generator
+from tests.benchmarks.load import save_results
+
+def blog_pages(pages, rows, content_bytes, seed):
+    generator = Generator(users=100, blogs=pages * rows, comments=0, seed=seed, content_bytes=content_bytes)
+    all_rows = [
+        Blog(blogId=blog_id, title=title, content=content, date=datetime.strptime(created, '%Y-%m-%d %H:%M:%S'),
+             userId=user_id, author=f"user{user_id}")
+        for blog_id, title, content, created, user_id in generator.blog_rows()
+    ]
+    return [all_rows[i:i + rows] for i in range(0, len(all_rows), rows)]
+
+def measure(client, paths, headers):
+    raw = wire = 0
+    started = time.perf_counter()
+    for path in paths:
+        response = client.get(path, headers=headers)
+        wire += len(response.data)
+        raw += int(response.headers.get('X-Bench-Raw-Length', len(response.data)))
+    elapsed = time.perf_counter() - started
+    return {
+        'responses': len(paths),
+        'rawBytes': raw,
+        'wireBytes': wire,
+        'savedPct': round(100 - 100.0 * wire / raw, 1) if raw else 0,
+        'usPerResponse': round(elapsed / len(paths) * 1e6, 1),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark gzip/brotli response compression')
+    parser.add_argument('--pages', type=int, default=50)
+    parser.add_argument('--rows', type=int, default=20)
+    parser.add_argument('--content-bytes', type=int, default=3000)
+    parser.add_argument('--encoding', default='gzip', help='Accept-Encoding sent by the client')
+    parser.add_argument('--seed', type=int, default=3103)
+    args = parser.parse_args()
+
+    pages = blog_pages(args.pages, args.rows, args.content_bytes, args.seed)
+    blog.sql_call_fetch_all = lambda proc_name, params, model=None: pages[params[3] // args.rows % len(pages)]
+
+    app = create_app()
+    app.config['RATE_LIMIT_ENABLED'] = False
+
+    # Registered last, so it runs before the compression hook and sees the raw body
+    @app.after_request
+    def raw_length(response):
+        if response.direct_passthrough:
+            response.headers['X-Bench-Raw-Length'] = str(response.content_length)
+        elif not response.is_streamed:
+            response.headers['X-Bench-Raw-Length'] = str(len(response.get_data()))
+        return response
+
+    client = app.test_client()
+    list_paths = [f"/blogs-api?limit={args.rows}&offset={i * args.rows}" for i in range(len(pages))]
+    static_paths = ['/', '/static/css/styles.css', '/static/js/app.js']
+
+    results = {}
+    for label, headers in (('identity', {}), (args.encoding, {'Accept-Encoding': args.encoding})):
+        results[f"BlogList {label} cold"] = measure(client, list_paths, headers)
+        results[f"BlogList {label} warm"] = measure(client, list_paths, headers)
+        results[f"static {label}"] = measure(client, static_paths * 10, headers)
+
+    print(f"{'payload':<30}{'raw KB':>10}{'wire KB':>10}{'saved %':>9}{'us/resp':>10}")
+    for label, summary in results.items():
+        print(f"{label:<30}{summary['rawBytes'] / 1024:>10.0f}{summary['wireBytes'] / 1024:>10.0f}"
+              f"{summary['savedPct']:>9}{summary['usPerResponse']:>10}")
+    print(f"Results saved to {save_results('compression', results)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+JSON serialization benchmark for the BlogList and BlogCommentList payloads.
+
+Encodes synthetic rows (same shape as getBlogs / getCommentsByBlog) with the
+old stdlib encoder and the app's JSON provider. Each iteration gets freshly
+built dicts, like rows coming off a cursor.
+
+    python -m tests.benchmarks.bench_json
+    python -m tests.benchmarks.bench_json --rows 100 --content-bytes 8000
+"""
+
+import argparse
+import json
+import time
+from datetime import datetime, date
+
+from app.utils import json_provider
+from tests.benchmarks.datagen import Generator
+from tests.benchmarks.load import save_results
+
+class LegacyJSONEncoder(json.JSONEncoder):
+    # The encoder create_app() used before the JSON provider
+    def default(self, obj):
+        if isinstance(obj, (datetime, date)):
+            return obj.isoformat()
+        return super().default(obj)
+
+def payloads(rows, content_bytes, seed):
+    generator = Generator(users=100, blogs=rows, comments=rows * 5, seed=seed, content_bytes=content_bytes)
+    blogs = [
+        {'blogId': blog_id, 'title': title, 'content': content, 'date': datetime.strptime(created, '%Y-%m-%d %H:%M:%S'),
+         'userId': user_id, 'author': f"user{user_id}"}
+        for blog_id, title, content, created, user_id in generator.blog_rows()
+    ]
+    comments = [
+        {'commentId': comment_id, 'content': content, 'date': datetime.strptime(created, '%Y-%m-%d %H:%M:%S'),
+         'blogId': blog_id, 'userId': user_id, 'parentCommentId': parent, 'author': f"user{user_id}"}
+        for comment_id, content, created, blog_id, user_id, parent in generator.comment_rows()
+    ][:rows]
+    return {'BlogList': blogs, 'BlogCommentList': comments}
+
+def fresh_copies(rows, count):
+    # New dict and string objects each time, so cached str hashes do not flatter the encoders
+    return [[{k: (v.encode('utf-8').decode('utf-8') if isinstance(v, str) else v) for k, v in row.items()} for row in rows]
+            for _ in range(count)]
+
+def measure(fn, batches):
+    started = time.perf_counter()
+    size = 0
+    for rows in batches:
+        size = len(fn(rows))
+    elapsed = time.perf_counter() - started
+    return {'usPerResponse': round(elapsed / len(batches) * 1e6, 1), 'bytes': size}
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark JSON serialization of list payloads')
+    parser.add_argument('--rows', type=int, default=20, help='Rows per response (the API default limit is 20)')
+    parser.add_argument('--content-bytes', type=int, default=3000)
+    parser.add_argument('--iterations', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=3103)
+    args = parser.parse_args()
+
+    def stdlib(rows):
+        return json.dumps(rows, cls=LegacyJSONEncoder, sort_keys=True).encode('utf-8')
+
+    results = {}
+    encoders = {
+        'stdlib JSONEncoder': stdlib,
+        f"provider ({'orjson' if json_provider.ORJSON_AVAILABLE else 'stdlib'})": json_provider.dumps_bytes,
+    }
+    for name, rows in payloads(args.rows, args.content_bytes, args.seed).items():
+        for label, fn in encoders.items():
+            results[f"{name} {label}"] = measure(fn, fresh_copies(rows, args.iterations))
+
+    print(f"{'payload':<46}{'us/response':>14}{'bytes':>10}")
+    for label, summary in results.items():
+        print(f"{label:<46}{summary['usPerResponse']:>14}{summary['bytes']:>10}")
+    print(f"Results saved to {save_results('json', results)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Throughput of the production launcher (serve.py / gunicorn) against the
+Flask development server used by run.py.
+
+Both servers are started on local ports over plain HTTP, loaded with the
+same request mix, and then stopped with SIGTERM:
+    python -m tests.benchmarks.bench_launchers --workers 4 --threads 4
+"""
+
+import argparse
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+from tests.benchmarks.load import run_load, save_results, print_table
+from tests.benchmarks.bench_serving import DEFAULT_PATHS
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def wait_for_port(port, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1):
+                return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+def launch(command, port):
+    # All load comes from 127.0.0.1, the default per-client limit would answer most of it with 429
+    env = dict(os.environ, BLOG_SERVICE_RATE_LIMIT_ENABLED='false')
+    process = subprocess.Popen(command, cwd=REPO_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    if not wait_for_port(port):
+        process.kill()
+        raise RuntimeError(f"Server did not start: {' '.join(command)}")
+    return process
+
+def stop(process):
+    # SIGTERM lets gunicorn drain in-flight requests before exiting
+    process.send_signal(signal.SIGTERM)
+    try:
+        process.wait(timeout=60)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare serve.py with the development server')
+    parser.add_argument('--port', type=int, default=18006)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--path', action='append', help='Path to request (defaults to the public read endpoints)')
+    args = parser.parse_args()
+
+    paths = args.path or DEFAULT_PATHS
+    url = f"http://127.0.0.1:{args.port}"
+    targets = {
+        'dev server (run.py)': [
+            sys.executable, '-c',
+            f"from run import app; app.run(host='127.0.0.1', port={args.port}, debug=app.config['APP_DEBUG'], use_reloader=False)"
+        ],
+        f"serve.py {args.workers}x{args.threads}": [
+            sys.executable, 'serve.py', '--bind', f"127.0.0.1:{args.port}", '--no-ssl',
+            '--workers', str(args.workers), '--threads', str(args.threads)
+        ],
+    }
+
+    results = {}
+    for label, command in targets.items():
+        print(f"Benchmarking {label}...")
+        process = launch(command, args.port)
+        try:
+            results[label] = run_load(url, paths, args.concurrency, args.requests, allowed_statuses=(404,))
+        finally:
+            stop(process)
+
+    print_table(results)
+    print(f"Results saved to {save_results('launchers', results)}")
+
+if __name__ == "__main__":
+    main()
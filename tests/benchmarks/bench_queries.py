@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Data-access benchmark: the read procedures through CALL against their plain SQL
+and PREPAREd versions (DB_QUERY_MODE, app/services/statements.py), with and
+without the connection pool. Calls go straight through db_service on one
+thread, so the figures are per-call latency without HTTP in the way. Every
+mode's rows are checked against the procedure's before it is timed.
+
+WARNING: unless --no-seed is given, the database named by --db-name is dropped
+and recreated.
+
+    python -m tests.benchmarks.bench_queries --db-user bench --db-password bench --db-name blog_bench
+    python -m tests.benchmarks.bench_queries ... --no-seed --calls 5000 --only getBlogs
+"""
+
+import argparse
+import json
+import random
+import time
+
+from tests.benchmarks.harness import reset_database, create_benchmark_app
+from tests.benchmarks.datagen import generate, SCALES
+from tests.benchmarks.load import summarize, save_results, print_table
+
+# (query mode, pool size); DB_POOL_SIZE=0 connects per call as before pooling
+CONFIGURATIONS = (
+    ('procedures', 0),
+    ('procedures', 5),
+    ('statements', 5),
+    ('prepared', 5),
+)
+
+def workloads(rng, users, blogs, comments):
+    def ids(upper, count=20):
+        return json.dumps([rng.randint(1, upper) for _ in range(count)])
+
+    return {
+        'getBlogs': lambda: (None, None, 20, rng.randint(0, 10) * 20),
+        'getBlogById': lambda: (rng.randint(1, blogs),),
+        'getBlogsByIds': lambda: (ids(blogs),),
+        'getCommentsByBlog': lambda: (rng.randint(1, blogs), None, 50, 0),
+        'getCommentById': lambda: (rng.randint(1, comments),),
+        'getUserById': lambda: (rng.randint(1, users),),
+        'getUsers': lambda: (20, 0),
+    }
+
+def run(app, proc_name, make_args, calls, warmup):
+    from app.services.db_service import sql_call_fetch_all
+
+    latencies = []
+    errors = 0
+    with app.app_context():
+        for _ in range(warmup):
+            sql_call_fetch_all(proc_name, make_args())
+        started = time.perf_counter()
+        for _ in range(calls):
+            args = make_args()
+            call_started = time.perf_counter()
+            try:
+                sql_call_fetch_all(proc_name, args)
+            except Exception:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - call_started)
+        elapsed = time.perf_counter() - started
+    return summarize(latencies, errors, elapsed)
+
+def check_same_rows(apps, proc_name, args):
+    from app.services.db_service import sql_call_fetch_all
+
+    expected = None
+    for label, app in apps.items():
+        with app.app_context():
+            rows = sql_call_fetch_all(proc_name, args)
+        if expected is None:
+            expected = rows
+        elif rows != expected:
+            raise AssertionError(f"{proc_name}{args}: {label} returned different rows from the procedure")
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark stored procedures against plain and prepared statements')
+    parser.add_argument('--db-host', default='127.0.0.1')
+    parser.add_argument('--db-port', type=int, default=3306)
+    parser.add_argument('--db-user', required=True)
+    parser.add_argument('--db-password', default='')
+    parser.add_argument('--db-name', default='blog_bench')
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small', help='Synthetic data volume (see datagen.py)')
+    parser.add_argument('--no-seed', action='store_true', help='Reuse the existing database contents')
+    parser.add_argument('--calls', type=int, default=2000, help='Timed calls per procedure and configuration')
+    parser.add_argument('--warmup', type=int, default=50)
+    parser.add_argument('--only', action='append', help='Only run procedures whose name contains this text')
+    parser.add_argument('--seed', type=int, default=3103)
+    args = parser.parse_args()
+
+    db_config = {
+        'DB_HOST': args.db_host,
+        'DB_PORT': args.db_port,
+        'DB_USER': args.db_user,
+        'DB_PASSWD': args.db_password,
+        'DB_DATABASE': args.db_name,
+    }
+
+    scale = SCALES[args.scale]
+    if not args.no_seed:
+        print(f"Loading schema into {args.db_name}...")
+        reset_database(db_config)
+        print(f"Seeding the {args.scale} data set...")
+        generate(db_config, scale['users'], scale['blogs'], scale['comments'], args.seed)
+
+    apps = {
+        f"{mode} pool={size}": create_benchmark_app(db_config, DB_QUERY_MODE=mode, DB_POOL_SIZE=size, DB_TRACE=False)
+        for mode, size in CONFIGURATIONS
+    }
+
+    rng = random.Random(args.seed)
+    results = {}
+    for proc_name, make_args in workloads(rng, scale['users'], scale['blogs'], scale['comments']).items():
+        if args.only and not any(text in proc_name for text in args.only):
+            continue
+        for _ in range(5):
+            check_same_rows(apps, proc_name, make_args())
+        for label, app in apps.items():
+            print(f"Benchmarking {proc_name} ({label})...")
+            results[f"{proc_name} {label}"] = run(app, proc_name, make_args, args.calls, args.warmup)
+
+    print_table(results)
+    print(f"Results saved to {save_results('queries', results)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+HTML sanitizer benchmark.
+
+Times the fallback single-pass sanitizer (used when bleach is missing) against
+bleach and against the per-pattern regex loop it replaced, on large synthetic
+posts full of allowed and disallowed markup. sanitize_string's one-regex pass
+is timed against the old re.sub/str.replace chain as well.
+
+    python -m tests.benchmarks.bench_sanitize
+    python -m tests.benchmarks.bench_sanitize --post-kb 100 --posts 20
+"""
+
+import argparse
+import random
+import re
+import time
+
+from app.utils.helpers import ALLOWED_TAGS, ALLOWED_ATTRIBUTES
+from app.utils.sanitizer import clean_html, clean_string
+from tests.benchmarks.load import save_results
+
+try:
+    import bleach
+    from bleach.sanitizer import Cleaner
+except ImportError:
+    bleach = None
+
+WORDS = 'campus lecture python flask mysql cache index query latency throughput student research'.split()
+FRAGMENTS = [
+    '<p>{text}</p>',
+    '<p>{text} <strong>{text}</strong> and <em>{text}</em></p>',
+    '<h2>{text}</h2>',
+    '<ul><li>{text}</li><li>{text}</li></ul>',
+    '<a href="https://example.com/{word}?a=1&amp;b=2" title="{word}">{text}</a>',
+    '<img src="/static/{word}.png" alt="{word}">',
+    '<blockquote>{text} &amp; {text}</blockquote>',
+    '<pre><code>if (a &lt; b) {{ return {word}; }}</code></pre>',
+    '<div class="{word}" style="color:red"><span>{text}</span></div>',
+    '<p onclick="alert(1)">{text}</p>',
+    '<script>alert("{word}")</script>',
+    '<a href="javascript:alert(1)">{text}</a>',
+    '<img src=x onerror=alert(1)>',
+    '<!-- {text} -->',
+    '{text} 1 < 2 & 3 > 2 👋',
+]
+
+def make_post(rng, size):
+    parts = []
+    length = 0
+    while length < size:
+        words = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(3, 12)))
+        part = rng.choice(FRAGMENTS).format(text=words, word=rng.choice(WORDS))
+        parts.append(part)
+        length += len(part)
+    return ''.join(parts)[:size]
+
+def legacy_sanitize_html(text):
+    # The fallback before the tokenizer: one re.sub per pattern, compiled on the fly
+    for pattern in [r'<script[^>]*>.*?</script>', r'javascript:', r'onerror=', r'onclick=', r'onload=']:
+        text = re.sub(pattern, '', text, flags=re.IGNORECASE | re.DOTALL)
+    return text
+
+def legacy_sanitize_string(text):
+    text = re.sub(r'<script[^>]*>.*?</script>', '', text, flags=re.IGNORECASE | re.DOTALL)
+    text = re.sub(r'javascript:', '', text, flags=re.IGNORECASE)
+    text = re.sub(r'on\w+\s*=', '', text, flags=re.IGNORECASE)
+    for sql in [';', '--', '/*', '*/', 'UNION', 'SELECT', 'INSERT', 'UPDATE', 'DELETE', 'DROP', 'TRUNCATE', 'ALTER']:
+        text = text.replace(sql, '')
+    return text
+
+def measure(fn, inputs, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for text in inputs:
+            fn(text)
+    elapsed = time.perf_counter() - started
+    total_bytes = sum(len(text.encode('utf-8')) for text in inputs) * repeat
+    calls = len(inputs) * repeat
+    return {'msPerCall': round(elapsed / calls * 1000, 3), 'mbPerSecond': round(total_bytes / elapsed / 1e6, 2)}
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the fallback HTML sanitizer against bleach')
+    parser.add_argument('--post-kb', type=int, default=100)
+    parser.add_argument('--posts', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=3103)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    posts = [make_post(rng, args.post_kb * 1024) for _ in range(args.posts)]
+    titles = [make_post(rng, 200) for _ in range(args.posts * 100)]
+
+    candidates = {'fallback tokenizer': lambda text: clean_html(text, ALLOWED_TAGS, ALLOWED_ATTRIBUTES),
+                  'legacy regex loop (unsafe)': legacy_sanitize_html}
+    if bleach is not None:
+        cleaner = Cleaner(tags=ALLOWED_TAGS, attributes=ALLOWED_ATTRIBUTES, strip=True)
+        candidates['bleach.clean'] = lambda text: bleach.clean(text, tags=ALLOWED_TAGS, attributes=ALLOWED_ATTRIBUTES,
+                                                               strip=True)
+        candidates['bleach Cleaner (reused)'] = cleaner.clean
+    else:
+        print('bleach is not installed, comparing the fallback with the legacy regex loop only')
+
+    results = {}
+    for label, fn in candidates.items():
+        results[f"sanitize_html {label}"] = measure(fn, posts, args.repeat)
+    results['sanitize_string one-pass'] = measure(clean_string, titles, args.repeat)
+    results['sanitize_string legacy'] = measure(legacy_sanitize_string, titles, args.repeat)
+
+    print(f"{args.posts} posts of {args.post_kb} KB, {len(titles)} 200-byte strings")
+    print(f"{'sanitizer':<45}{'ms/call':>10}{'MB/s':>10}")
+    for label, summary in results.items():
+        print(f"{label:<45}{summary['msPerCall']:>10}{summary['mbPerSecond']:>10}")
+    print(f"Results saved to {save_results('sanitize', results)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Compare serving modes under concurrent load.
+
+Start the servers to compare first, with rate limits off since all the load
+comes from one address, for example:
+    export BLOG_SERVICE_RATE_LIMIT_ENABLED=false
+    python run.py                      # Flask development server (WSGI)
+    python asgi.py                     # async mode on another port
+
+then run:
+    python -m tests.benchmarks.bench_serving \\
+        --target wsgi=https://localhost:8006 --target asgi=https://localhost:8007
+"""
+
+import argparse
+
+from tests.benchmarks.load import run_load, save_results, print_table
+
+DEFAULT_PATHS = [
+    '/blogs-api?limit=20',
+    '/blogs-api/1',
+    '/blogs-api/1/comments',
+    '/users?limit=20',
+    '/users-api/1',
+]
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark serving modes against each other')
+    parser.add_argument('--target', action='append', required=True,
+                        help='label=base_url of a running server, may be repeated')
+    parser.add_argument('--path', action='append', help='Path to request (defaults to the public read endpoints)')
+    parser.add_argument('--concurrency', type=int, default=200)
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--duration', type=float, default=None, help='Stop after this many seconds')
+    args = parser.parse_args()
+
+    paths = args.path or DEFAULT_PATHS
+    results = {}
+    for target in args.target:
+        label, _, url = target.partition('=')
+        print(f"Benchmarking {label} ({url}) with concurrency {args.concurrency}...")
+        # A missing blog/user in the test database is still a full round trip
+        results[label] = run_load(url, paths, args.concurrency, args.requests, args.duration, allowed_statuses=(404,))
+
+    print_table(results)
+    print(f"Results saved to {save_results('serving', results)}")
+
+if __name__ == "__main__":
+    main()
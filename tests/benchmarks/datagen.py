@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Deterministic synthetic data for scale testing.
+
+Generates users, verified_users, mobile_verified_users,
+notification_preferences, blogs and nested comments with realistic
+distributions and bulk-loads them in dependency order:
+    - blog authorship follows a power law (a few prolific authors)
+    - comment counts per blog are heavy tailed, replies form deep chains
+    - notification opt-in is a long tail (most users never opt in)
+
+Rows are streamed in chunks, so memory stays flat regardless of scale.
+The same --seed always produces the same data.
+
+    python -m tests.benchmarks.datagen --db-user bench --db-name blog_bench --reset --scale large
+    python -m tests.benchmarks.datagen ... --mode infile     # LOAD DATA LOCAL INFILE
+"""
+
+import argparse
+import bisect
+import hashlib
+import itertools
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from tests.benchmarks.harness import connect, reset_database
+
+BENCH_USERNAME = 'bench_user'
+BENCH_PASSWORD = 'P@ssword123'
+BENCH_SALT = 'benchmarksalt'
+
+SCALES = {
+    'small': {'users': 1000, 'blogs': 10000, 'comments': 50000},
+    'medium': {'users': 20000, 'blogs': 200000, 'comments': 1000000},
+    'large': {'users': 100000, 'blogs': 1000000, 'comments': 5000000},
+}
+
+CHUNK_SIZE = 5000
+
+WORDS = ('blog service campus student research lecture project data network python flask mysql '
+         'security cloud design team course exam library coffee winter snow river fredericton '
+         'algorithm system performance cache index query latency throughput').split()
+
+class Generator:
+    def __init__(self, users, blogs, comments, seed=3103, content_bytes=3000, days=730):
+        self.users = users
+        self.blogs = blogs
+        self.comments = comments
+        self.rng = random.Random(seed)
+        self.content_bytes = content_bytes
+        self.start = datetime(2024, 1, 1)
+        self.span = timedelta(days=days)
+        self.password_hash = hashlib.sha256((BENCH_PASSWORD + BENCH_SALT).encode()).hexdigest()
+
+        # Power-law author popularity: weight of the author ranked r is 1 / r^1.1
+        self.author_cum_weights = list(itertools.accumulate(1.0 / (rank ** 1.1) for rank in range(1, users + 1)))
+        # Shuffle which user id holds which rank so prolific authors are spread out
+        self.author_by_rank = list(range(1, users + 1))
+        self.rng.shuffle(self.author_by_rank)
+
+        # Building text word by word is far too slow at millions of rows,
+        # so posts and comments are assembled from a pool of pre-built snippets
+        self.snippets = [self._text(400) for _ in range(1000)]
+        self.paragraphs = [f"<p>{snippet}</p>" for snippet in self.snippets]
+
+    def _pick_author(self):
+        target = self.rng.random() * self.author_cum_weights[-1]
+        return self.author_by_rank[bisect.bisect_left(self.author_cum_weights, target)]
+
+    def _text(self, size):
+        words = []
+        length = 0
+        while length < size:
+            word = self.rng.choice(WORDS)
+            words.append(word)
+            length += len(word) + 1
+        return ' '.join(words)
+
+    def _snippet(self, size):
+        return self.rng.choice(self.snippets)[:size].strip()
+
+    def _content(self):
+        # Log-normal post sizes around content_bytes
+        size = int(min(self.rng.lognormvariate(0, 0.8) * self.content_bytes, self.content_bytes * 30))
+        count = max(1, size // 407)
+        return ''.join(self.rng.choices(self.paragraphs, k=count))
+
+    def _date(self, fraction):
+        # Ids are created in time order, with a little jitter
+        jitter = self.rng.uniform(-0.001, 0.001)
+        moment = self.start + self.span * min(max(fraction + jitter, 0), 1)
+        return moment.strftime('%Y-%m-%d %H:%M:%S')
+
+    def users_rows(self):
+        for user_id in range(1, self.users + 1):
+            username = BENCH_USERNAME if user_id == 1 else f"user{user_id}"
+            email = f"{username}@example.com" if user_id == 1 or self.rng.random() < 0.8 else None
+            phone = f"+1506{user_id:07d}" if self.rng.random() < 0.25 else None
+            yield (user_id, 'local', username, email, self.password_hash, BENCH_SALT, phone,
+                   self._date(user_id / self.users * 0.5))
+
+    def verified_rows(self, mobile=False):
+        probability = 0.2 if mobile else 0.85
+        for user_id in range(1, self.users + 1):
+            if user_id == 1 or self.rng.random() < probability:
+                yield (user_id,)
+
+    def preference_rows(self):
+        for user_id in range(1, self.users + 1):
+            # Long tail: very few users want every new post, more want comments
+            yield (user_id, self.rng.random() < 0.03, self.rng.random() < 0.35)
+
+    def blog_rows(self):
+        for blog_id in range(1, self.blogs + 1):
+            yield (blog_id, f"{self._snippet(40).title()} #{blog_id}", self._content(),
+                   self._date(0.5 + 0.5 * blog_id / self.blogs), self._pick_author())
+
+    def comment_rows(self):
+        """Comments grouped by blog, parents always generated before their replies"""
+        # Heavy-tailed comment counts that add up to roughly self.comments
+        mean = self.comments / max(self.blogs, 1)
+        comment_id = 0
+        for blog_id in range(1, self.blogs + 1):
+            if comment_id >= self.comments:
+                break
+            count = min(int(self.rng.paretovariate(1.5) * mean / 3), self.comments - comment_id)
+            thread = []
+            blog_fraction = 0.5 + 0.5 * blog_id / self.blogs
+            for _ in range(count):
+                comment_id += 1
+                roll = self.rng.random()
+                if not thread or roll < 0.4:
+                    parent = None
+                elif roll < 0.75:
+                    # Replying to the latest comment builds deep chains
+                    parent = thread[-1]
+                else:
+                    parent = self.rng.choice(thread)
+                thread.append(comment_id)
+                yield (comment_id, self._snippet(self.rng.randint(20, 400)),
+                       self._date(min(blog_fraction + 0.0005 * len(thread), 1)),
+                       blog_id, self.rng.randint(1, self.users), parent)
+
+TABLES = [
+    ('users', ('userId', 'user_type', 'username', 'email', 'password_hash', 'password_salt', 'phone_number', 'joinDate'),
+     lambda gen: gen.users_rows()),
+    ('verified_users', ('userId',), lambda gen: gen.verified_rows()),
+    ('mobile_verified_users', ('userId',), lambda gen: gen.verified_rows(mobile=True)),
+    ('notification_preferences', ('userId', 'notifyOnBlog', 'notifyOnComment'), lambda gen: gen.preference_rows()),
+    ('blogs', ('blogId', 'title', 'content', 'dateCreated', 'userId'), lambda gen: gen.blog_rows()),
+    ('comments', ('commentId', 'content', 'dateCreated', 'blogId', 'userId', 'parentCommentId'), lambda gen: gen.comment_rows()),
+]
+
+def _chunks(rows, size):
+    iterator = iter(rows)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+def load_with_inserts(cursor, table, columns, rows):
+    # PyMySQL rewrites executemany on INSERT ... VALUES into multi-row statements
+    statement = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})"
+    count = 0
+    for chunk in _chunks(rows, CHUNK_SIZE):
+        cursor.executemany(statement, chunk)
+        count += len(chunk)
+    return count
+
+def _tsv_value(value):
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    return str(value).replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n')
+
+def load_with_infile(cursor, table, columns, rows):
+    count = 0
+    with tempfile.NamedTemporaryFile('w', suffix='.tsv', delete=False, encoding='utf-8', newline='') as f:
+        path = f.name
+        for row in rows:
+            f.write('\t'.join(_tsv_value(value) for value in row) + '\n')
+            count += 1
+    try:
+        cursor.execute(
+            f"LOAD DATA LOCAL INFILE %s INTO TABLE {table} CHARACTER SET utf8mb4 "
+            f"FIELDS TERMINATED BY '\\t' LINES TERMINATED BY '\\n' ({', '.join(columns)})",
+            (path,)
+        )
+    finally:
+        os.remove(path)
+    return count
+
+def generate(db_config, users, blogs, comments, seed=3103, mode='insert', content_bytes=3000, verbose=True):
+    """Bulk-load a full synthetic data set into an empty schema and return row counts per table"""
+    generator = Generator(users, blogs, comments, seed, content_bytes)
+    loader = load_with_infile if mode == 'infile' else load_with_inserts
+    counts = {}
+
+    connection = connect(db_config)
+    try:
+        with connection.cursor() as cursor:
+            # Rows are generated in dependency order, so the per-row checks are redundant
+            if mode == 'infile':
+                cursor.execute("SET foreign_key_checks = 0")
+                cursor.execute("SET unique_checks = 0")
+
+            for table, columns, rows in TABLES:
+                started = time.perf_counter()
+                connection.begin()
+                counts[table] = loader(cursor, table, columns, rows(generator))
+                connection.commit()
+                if verbose:
+                    elapsed = time.perf_counter() - started
+                    print(f"  {table:<26}{counts[table]:>10} rows  {elapsed:8.1f}s  "
+                          f"{counts[table] / elapsed if elapsed else 0:>10.0f} rows/s")
+
+            if mode == 'infile':
+                cursor.execute("SET unique_checks = 1")
+                cursor.execute("SET foreign_key_checks = 1")
+    finally:
+        connection.close()
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate deterministic synthetic data for scale testing')
+    parser.add_argument('--db-host', default='127.0.0.1')
+    parser.add_argument('--db-port', type=int, default=3306)
+    parser.add_argument('--db-user', required=True)
+    parser.add_argument('--db-password', default='')
+    parser.add_argument('--db-name', default='blog_bench')
+    parser.add_argument('--reset', action='store_true', help='Drop and recreate the database from schema.sql first')
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+    parser.add_argument('--users', type=int)
+    parser.add_argument('--blogs', type=int)
+    parser.add_argument('--comments', type=int)
+    parser.add_argument('--content-bytes', type=int, default=3000, help='Median blog content size')
+    parser.add_argument('--mode', choices=('insert', 'infile'), default='insert')
+    parser.add_argument('--seed', type=int, default=3103)
+    args = parser.parse_args()
+
+    scale = dict(SCALES[args.scale])
+    for key in ('users', 'blogs', 'comments'):
+        if getattr(args, key):
+            scale[key] = getattr(args, key)
+
+    db_config = {
+        'DB_HOST': args.db_host,
+        'DB_PORT': args.db_port,
+        'DB_USER': args.db_user,
+        'DB_PASSWD': args.db_password,
+        'DB_DATABASE': args.db_name,
+    }
+
+    if args.reset:
+        print(f"Loading schema into {args.db_name}...")
+        reset_database(db_config)
+
+    print(f"Generating {scale['users']} users, {scale['blogs']} blogs, ~{scale['comments']} comments (seed {args.seed}, {args.mode})")
+    started = time.perf_counter()
+    counts = generate(db_config, scale['users'], scale['blogs'], scale['comments'], args.seed, args.mode, args.content_bytes)
+    print(f"Loaded {sum(counts.values())} rows in {time.perf_counter() - started:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Local benchmark harness: a scratch MySQL/MariaDB database loaded from
+database/schema.sql, stubbed external services, and the Flask app served
+from a background thread.
+"""
+
+import logging
+import os
+import re
+import threading
+import time
+
+import pymysql
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SCHEMA_PATH = os.path.join(REPO_ROOT, 'database', 'schema.sql')
+
+DELIMITER_RE = re.compile(r'^\s*DELIMITER\s+(\S+)\s*$', re.IGNORECASE)
+
+def split_sql(script):
+    """Split a mysql client script into statements, honouring DELIMITER lines"""
+    delimiter = ';'
+    statements = []
+    buffer = []
+
+    for line in script.splitlines():
+        match = DELIMITER_RE.match(line)
+        if match:
+            delimiter = match.group(1)
+            continue
+
+        if not buffer and (not line.strip() or line.strip().startswith('--')):
+            continue
+
+        buffer.append(line)
+        if line.rstrip().endswith(delimiter):
+            statement = '\n'.join(buffer).rstrip()[:-len(delimiter)].strip()
+            if statement:
+                statements.append(statement)
+            buffer = []
+
+    if ''.join(buffer).strip():
+        statements.append('\n'.join(buffer).strip())
+    return statements
+
+def connect(db_config, database=True):
+    return pymysql.connect(
+        host=db_config['DB_HOST'],
+        port=db_config.get('DB_PORT', 3306),
+        user=db_config['DB_USER'],
+        password=db_config['DB_PASSWD'],
+        database=db_config['DB_DATABASE'] if database else None,
+        charset='utf8mb4',
+        autocommit=True,
+        local_infile=True
+    )
+
+def reset_database(db_config, schema_path=SCHEMA_PATH):
+    """Drop and recreate the scratch database, then load the schema into it"""
+    name = db_config['DB_DATABASE']
+    connection = connect(db_config, database=False)
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP DATABASE IF EXISTS `{name}`")
+            cursor.execute(f"CREATE DATABASE `{name}` CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci")
+            cursor.execute(f"USE `{name}`")
+            with open(schema_path) as f:
+                for statement in split_sql(f.read()):
+                    cursor.execute(statement)
+    finally:
+        connection.close()
+
+class _StubTwilioMessages:
+    def __init__(self, latency):
+        self.latency = latency
+
+    def create(self, **kwargs):
+        time.sleep(self.latency)
+        return type('Message', (), {'sid': 'SM-benchmark'})()
+
+class _StubTwilioClient:
+    def __init__(self, latency):
+        self.messages = _StubTwilioMessages(latency)
+
+class _StubLdapConnection:
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def open(self):
+        pass
+
+    def start_tls(self):
+        pass
+
+    def bind(self):
+        return True
+
+    def unbind(self):
+        pass
+
+class _StubGeminiResponse:
+    def json(self):
+        return {'candidates': [{'content': {'parts': [{'text': 'Benchmark generated content.'}]}}]}
+
+def stub_external_services(latency=0.0):
+    """Replace SMTP, Twilio, LDAP and Gemini with in-process stubs that sleep for `latency` seconds"""
+    from app.services import email_service, sms_service, ai_service
+    from app.routes import auth
+
+    def send_email(to_email, subject, body):
+        time.sleep(latency)
+        return True
+
+    def post(url, headers=None, json=None):
+        time.sleep(latency)
+        return _StubGeminiResponse()
+
+    email_service.send_email = send_email
+    sms_service.TWILIO_AVAILABLE = True
+    sms_service.get_twilio_client = lambda: _StubTwilioClient(latency)
+    auth.Server = lambda *args, **kwargs: None
+    auth.Connection = _StubLdapConnection
+    ai_service.requests.post = post
+
+def create_benchmark_app(db_config, **overrides):
+    """
+    create_app() pointed at the scratch database, with cookies usable over plain
+    HTTP and rate limits off (every benchmark client comes from 127.0.0.1)
+    """
+    from app import create_app
+
+    app = create_app()
+    app.config.update(db_config)
+    app.config.update(
+        APP_DEBUG=False,
+        SESSION_COOKIE_DOMAIN=False,
+        SESSION_COOKIE_SECURE=False,
+        SESSION_COOKIE_SAMESITE='Lax',
+        AI_DAILY_QUOTA=0,
+        RATE_LIMIT_ENABLED=False
+    )
+    app.config.update(overrides)
+    return app
+
+class BackgroundServer:
+    """Serve a WSGI app on a local port from a daemon thread"""
+
+    def __init__(self, app, host='127.0.0.1', port=0):
+        from werkzeug.serving import make_server
+        # Per-request access logging would dominate the numbers
+        logging.getLogger('werkzeug').setLevel(logging.ERROR)
+        self.server = make_server(host, port, app, threaded=True)
+        self.url = f"http://{host}:{self.server.server_port}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Shared load generator for the benchmark scripts.
+Drives HTTP requests concurrently with asyncio and reports
+latency percentiles and throughput.
+
+Each request spec is either a path (a GET) or a (method, path, json_body) tuple.
+"""
+
+import asyncio
+import json
+import os
+import ssl
+import subprocess
+import time
+from urllib.parse import urlsplit
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, int(round(pct / 100.0 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+def summarize(latencies, errors, elapsed):
+    """Turn raw latencies (seconds) into a report dict with millisecond figures"""
+    latencies = sorted(latencies)
+    completed = len(latencies)
+    return {
+        'requests': completed + errors,
+        'errors': errors,
+        'elapsedSeconds': round(elapsed, 3),
+        'requestsPerSecond': round(completed / elapsed, 1) if elapsed > 0 else 0,
+        'p50Ms': round(percentile(latencies, 50) * 1000, 2) if latencies else None,
+        'p95Ms': round(percentile(latencies, 95) * 1000, 2) if latencies else None,
+        'p99Ms': round(percentile(latencies, 99) * 1000, 2) if latencies else None,
+    }
+
+def _spec(spec):
+    if isinstance(spec, str):
+        return 'GET', spec, None
+    method, path, body = spec
+    return method, path, (json.dumps(body).encode('utf-8') if body is not None else None)
+
+async def _request(reader, writer, host, spec, headers):
+    method, path, body = spec
+    lines = [f"{method} {path} HTTP/1.1", f"Host: {host}", "Connection: keep-alive"]
+    lines += [f"{k}: {v}" for k, v in headers.items()]
+    if body is not None:
+        lines += ["Content-Type: application/json", f"Content-Length: {len(body)}"]
+    writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + (body or b''))
+    await writer.drain()
+
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError('Connection closed by server')
+    status = int(status_line.split()[1])
+
+    length = None
+    chunked = False
+    close = False
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        name = name.strip().lower()
+        value = value.strip()
+        if name == 'content-length':
+            length = int(value)
+        elif name == 'transfer-encoding' and 'chunked' in value.lower():
+            chunked = True
+        elif name == 'connection' and value.lower() == 'close':
+            close = True
+
+    if chunked:
+        while True:
+            size = int((await reader.readline()).strip() or b'0', 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    elif length is not None:
+        await reader.readexactly(length)
+    else:
+        await reader.read()
+        close = True
+
+    return status, close
+
+async def _worker(base, paths, deadline, budget, latencies, counters, headers, ssl_context):
+    host = base.hostname
+    port = base.port or (443 if base.scheme == 'https' else 80)
+    prefix = base.path.rstrip('/')
+    reader = writer = None
+    index = 0
+
+    while time.perf_counter() < deadline and counters['remaining'] > 0:
+        counters['remaining'] -= 1
+        method, path, body = paths[index % len(paths)]
+        index += 1
+        started = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(host, port, ssl=ssl_context)
+            status, close = await _request(reader, writer, base.netloc, (method, prefix + path, body), headers)
+            if status >= 400 and status not in budget.get('allowedStatuses', ()):
+                counters['errors'] += 1
+            else:
+                latencies.append(time.perf_counter() - started)
+            if close:
+                writer.close()
+                reader = writer = None
+        except Exception:
+            counters['errors'] += 1
+            if writer is not None:
+                writer.close()
+            reader = writer = None
+
+    if writer is not None:
+        writer.close()
+
+async def run_load_async(base_url, paths, concurrency=50, requests=1000, duration=None, headers=None, allowed_statuses=()):
+    base = urlsplit(base_url)
+    ssl_context = None
+    if base.scheme == 'https':
+        # The dev certificates are self-signed
+        ssl_context = ssl.create_default_context()
+        ssl_context.check_hostname = False
+        ssl_context.verify_mode = ssl.CERT_NONE
+
+    latencies = []
+    counters = {'remaining': requests, 'errors': 0}
+    deadline = time.perf_counter() + duration if duration else float('inf')
+    budget = {'allowedStatuses': tuple(allowed_statuses)}
+    paths = [_spec(spec) for spec in paths]
+
+    started = time.perf_counter()
+    await asyncio.gather(*[
+        _worker(base, paths, deadline, budget, latencies, counters, headers or {}, ssl_context)
+        for _ in range(concurrency)
+    ])
+    return summarize(latencies, counters['errors'], time.perf_counter() - started)
+
+def run_load(base_url, paths, concurrency=50, requests=1000, duration=None, headers=None, allowed_statuses=()):
+    """Send the request specs round-robin to base_url and return a summary dict"""
+    return asyncio.run(run_load_async(base_url, paths, concurrency, requests, duration, headers, allowed_statuses))
+
+def current_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True).stdout.strip() or 'unknown'
+    except Exception:
+        return 'unknown'
+
+def save_results(name, results, directory='bench_results'):
+    """Write results as JSON tagged with the current commit and return the path"""
+    os.makedirs(directory, exist_ok=True)
+    commit = current_commit()
+    path = os.path.join(directory, f"{name}-{commit}.json")
+    with open(path, 'w') as f:
+        json.dump({'benchmark': name, 'commit': commit, 'timestamp': int(time.time()), 'results': results}, f, indent=2)
+    return path
+
+def print_table(results):
+    """Print a {label: summary} mapping as an aligned table"""
+    print(f"{'target':<28}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for label, summary in results.items():
+        print(f"{label:<28}{summary['requestsPerSecond']:>10}{str(summary['p50Ms']):>10}"
+              f"{str(summary['p95Ms']):>10}{str(summary['p99Ms']):>10}{summary['errors']:>8}")
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Tests for the event bus in app/services/event_service.py: SQLite log replays and
+latest_id across workers sharing one file, and the in-process ring buffer.
+
+    python -m pytest tests/test_event_bus.py
+"""
+
+import sqlite3
+import threading
+
+import pytest
+
+from app.services.event_service import SQLiteBus, InProcessBus
+
+@pytest.fixture
+def open_bus(tmp_path):
+    buses = []
+
+    def open_bus(**kwargs):
+        bus = SQLiteBus(str(tmp_path / 'event-bus.db'), poll_interval=0.01, **kwargs)
+        buses.append(bus)
+        return bus
+
+    yield open_bus
+    for bus in buses:
+        bus.close()
+
+def collect(bus, pattern, count):
+    """Subscribe and return (events, done), done being set once count events arrived"""
+    events = []
+    done = threading.Event()
+
+    def handler(event_id, topic, data):
+        events.append((event_id, topic, data))
+        if len(events) >= count:
+            done.set()
+
+    bus.subscribe(pattern, handler)
+    return events, done
+
+def test_new_bus_starts_at_the_end_of_the_log(open_bus):
+    first = open_bus()
+    first.publish('blog.created', {'blogId': 1})
+    last = first.publish('blog.updated', {'blogId': 1})
+
+    second = open_bus()
+    assert second.latest_id == last
+    assert second.replay('blog.*', second.latest_id) == ([], True)
+
+def test_every_worker_hears_every_event_in_order(open_bus):
+    publisher, other = open_bus(), open_bus()
+    mine, mine_done = collect(publisher, 'comment.*', 2)
+    theirs, theirs_done = collect(other, 'comment.*', 2)
+    blogs, _ = collect(other, 'blog.*', 1)
+
+    first = publisher.publish('comment.created', {'commentId': 5, 'blogId': 1})
+    second = publisher.publish('comment.deleted', {'commentId': 5, 'blogId': 1})
+
+    assert mine_done.wait(2) and theirs_done.wait(2)
+    expected = [(first, 'comment.created', {'commentId': 5, 'blogId': 1}),
+                (second, 'comment.deleted', {'commentId': 5, 'blogId': 1})]
+    assert mine == expected
+    assert theirs == expected
+    assert blogs == []
+
+def test_replay_filters_by_pattern_and_last_id(open_bus):
+    bus = open_bus()
+    ids = [bus.publish(topic, {'n': n}) for n, topic in
+           enumerate(['comment.created', 'blog.created', 'comment.updated', 'comment.deleted'])]
+
+    events, complete = bus.replay('comment.*', ids[0])
+    assert complete
+    assert [(event_id, topic) for event_id, topic, _ in events] == [(ids[2], 'comment.updated'),
+                                                                     (ids[3], 'comment.deleted')]
+    assert events[0][2] == {'n': 2}
+
+    events, complete = bus.replay('blog.created', 0)
+    assert complete and [event_id for event_id, _, _ in events] == [ids[1]]
+
+def test_replay_reports_pruned_events(open_bus, tmp_path):
+    bus = open_bus()
+    ids = [bus.publish('comment.created', {'n': n}) for n in range(3)]
+    db = sqlite3.connect(str(tmp_path / 'event-bus.db'))
+    with db:
+        db.execute('DELETE FROM events WHERE id <= ?', (ids[1],))
+    db.close()
+
+    events, complete = bus.replay('comment.*', 0)
+    assert not complete and [event_id for event_id, _, _ in events] == [ids[2]]
+    assert bus.replay('comment.*', ids[1]) == ([(ids[2], 'comment.created', {'n': 2})], True)
+
+def test_replay_after_everything_was_pruned(open_bus, tmp_path):
+    bus = open_bus()
+    last = [bus.publish('comment.created', {}) for _ in range(2)][-1]
+    db = sqlite3.connect(str(tmp_path / 'event-bus.db'))
+    with db:
+        db.execute('DELETE FROM events')
+    db.close()
+
+    assert bus.replay('comment.*', 0) == ([], False)
+    assert bus.replay('comment.*', last) == ([], True)
+
+def test_in_process_bus_replays_from_its_ring_buffer():
+    bus = InProcessBus(buffer_size=2)
+    events, _ = collect(bus, '*', 3)
+    ids = [bus.publish('blog.created', {'blogId': n}) for n in range(3)]
+
+    assert [event_id for event_id, _, _ in events] == ids
+    assert bus.latest_id == ids[-1]
+    # The first event fell out of the buffer
+    assert bus.replay('blog.*', 0) == ([(ids[1], 'blog.created', {'blogId': 1}),
+                                         (ids[2], 'blog.created', {'blogId': 2})], False)
+    assert bus.replay('blog.*', ids[0])[1]
+
+def test_failing_subscriber_does_not_stop_the_others(capsys):
+    bus = InProcessBus()
+
+    def broken(event_id, topic, data):
+        raise RuntimeError('boom')
+
+    bus.subscribe('blog.*', broken)
+    events, _ = collect(bus, 'blog.*', 1)
+    bus.publish('blog.deleted', {'blogId': 1})
+    assert len(events) == 1
+    assert 'broken failed on blog.deleted' in capsys.readouterr().err
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Tests for the multi-row insert helper in app/services/db_service.py, against a
+cursor that hands out auto-increment ids the way MySQL does.
+
+    python -m pytest tests/test_insert_rows.py
+"""
+
+import re
+
+import pymysql
+import pytest
+
+from app.services.db_service import insert_rows
+
+class FakeCursor:
+    """
+    Enough of a PyMySQL DictCursor for insert_rows: each INSERT takes ids spaced by
+    auto_increment_increment and lastrowid is the first of them. Another writer
+    can take `interleave` ids after each of our rows, the way the interleaved
+    lock mode allows.
+    """
+
+    def __init__(self, next_id=1, step=1, lock_mode=1, interleave=0):
+        self.next_id = next_id
+        self.step = step
+        self.lock_mode = lock_mode
+        self.interleave = interleave
+        self.statements = []
+        self.executed = []
+        self.table = {}
+        self.lastrowid = None
+        self._mogrified = []
+        self._savepoint = None
+        self._rows = None
+
+    def mogrify(self, query, args):
+        self._mogrified.append(tuple(args))
+        return query % tuple(repr(arg) for arg in args)
+
+    def execute(self, query, args=None):
+        self.executed.append(query)
+        if query.startswith('SELECT @@auto_increment_increment'):
+            self._rows = [{'step': self.step, 'lock_mode': self.lock_mode}]
+            return 1
+        if query == 'SAVEPOINT insert_rows':
+            self._savepoint = dict(self.table)
+        elif query == 'ROLLBACK TO SAVEPOINT insert_rows':
+            self.table = self._savepoint
+        elif query.startswith('SELECT'):
+            names = [name.strip() for name in query[len('SELECT '):query.index(' FROM')].split(',')]
+            wanted = [int(n) for n in re.search(r'IN \((.*)\)', query).group(1).split(',')]
+            self._rows = [dict(zip(names, (row_id, *self.table[row_id]))) for row_id in wanted
+                          if row_id in self.table]
+            return len(self._rows)
+        elif query.startswith('INSERT'):
+            self.statements.append(query)
+            count = len(re.findall(r'\),?\(|\)$', query))
+            self.lastrowid = self.next_id
+            for row in self._mogrified[:count]:
+                self.table[self.next_id] = row
+                self.next_id += self.step
+                for _ in range(self.interleave):
+                    self.table[self.next_id] = ('someone else', 0)
+                    self.next_id += self.step
+            del self._mogrified[:count]
+            return count
+        return 0
+
+    def fetchone(self):
+        return self._rows[0]
+
+    def fetchall(self):
+        return self._rows
+
+def rows(count, width=10):
+    return [(f"{n:0{width}d}", n) for n in range(count)]
+
+def test_one_statement_gets_consecutive_ids():
+    cursor = FakeCursor(next_id=41)
+    assert insert_rows(cursor, 'comments', ('content', 'userId'), rows(3), key='commentId') == [41, 42, 43]
+    assert cursor.statements == [
+        "INSERT INTO comments (content, userId) VALUES ('0000000000', 0),('0000000001', 1),('0000000002', 2)"]
+
+def test_ids_follow_auto_increment_increment():
+    # e.g. a Galera or multi-source setup handing out every third id
+    cursor = FakeCursor(next_id=7, step=3)
+    assert insert_rows(cursor, 'blogs', ('title', 'userId'), rows(4), key='blogId') == [7, 10, 13, 16]
+
+@pytest.mark.parametrize('max_bytes', [120, 200, 400])
+def test_large_batches_are_split_and_keep_their_order(max_bytes):
+    cursor = FakeCursor(next_id=100)
+    ids = insert_rows(cursor, 'comments', ('content', 'userId'), rows(20), max_statement_bytes=max_bytes,
+                      key='commentId')
+
+    assert ids == list(range(100, 120))
+    assert len(cursor.statements) > 1
+    assert all(len(statement) <= max_bytes for statement in cursor.statements)
+    # Every row went in exactly once, in order
+    inserted = re.findall(r"'(\d+)'", ''.join(cursor.statements))
+    assert inserted == [f"{n:010d}" for n in range(20)]
+
+def test_ids_stay_right_when_other_writers_interleave():
+    cursor = FakeCursor(next_id=1)
+    original = cursor.execute
+
+    def execute(query, args=None):
+        result = original(query, args)
+        if query.startswith('INSERT'):
+            # Another connection inserts between our statements
+            cursor.next_id += 5
+        return result
+
+    cursor.execute = execute
+    ids = insert_rows(cursor, 'comments', ('content', 'userId'), rows(4), max_statement_bytes=90, key='commentId')
+    assert len(cursor.statements) == 2
+    assert ids == [1, 2, 8, 9]
+
+def test_a_row_bigger_than_the_limit_goes_in_on_its_own():
+    cursor = FakeCursor()
+    ids = insert_rows(cursor, 'blogs', ('title', 'userId'), [('x' * 500, 1), ('y', 2)], max_statement_bytes=100, key='blogId')
+    assert ids == [1, 2]
+    assert len(cursor.statements) == 2
+
+def test_no_rows_no_insert():
+    cursor = FakeCursor()
+    assert insert_rows(cursor, 'blogs', ('title', 'userId'), [], key='blogId') == []
+    assert cursor.statements == []
+
+def test_without_a_key_no_ids_are_worked_out():
+    cursor = FakeCursor(lock_mode=2)
+    assert insert_rows(cursor, 'notification_preferences', ('userId',), [(1,), (2,)]) is None
+    assert not any(query.startswith(('SAVEPOINT', 'SELECT blogId')) for query in cursor.executed)
+
+def test_interleaved_lock_mode_checks_the_ids():
+    cursor = FakeCursor(next_id=41, lock_mode=2)
+    assert insert_rows(cursor, 'comments', ('content', 'userId'), rows(3), key='commentId') == [41, 42, 43]
+    assert len(cursor.statements) == 1
+    assert cursor.executed[-2] == "SELECT commentId, content, userId FROM comments WHERE commentId IN (41, 42, 43)"
+    assert cursor.executed[-1] == 'RELEASE SAVEPOINT insert_rows'
+
+def test_non_consecutive_ids_fall_back_to_one_row_at_a_time():
+    # Another writer's rows land between ours inside one statement
+    cursor = FakeCursor(next_id=1, lock_mode=2, interleave=1)
+    ids = insert_rows(cursor, 'comments', ('content', 'userId'), rows(3), key='commentId')
+
+    assert [cursor.table[row_id] for row_id in ids] == rows(3)
+    assert len(cursor.statements) == 4
+    # Only the row-by-row copies are left, the multi-row insert was rolled back
+    assert sum(1 for row in cursor.table.values() if row != ('someone else', 0)) == 3
+
+def test_a_short_write_is_an_error():
+    cursor = FakeCursor()
+    cursor.execute = lambda query, args=None: 1 if query.startswith('INSERT') else FakeCursor.execute(cursor, query)
+    with pytest.raises(pymysql.err.DataError):
+        insert_rows(cursor, 'comments', ('content', 'userId'), rows(2), key='commentId')
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Tests for the ?ids= parsing and per-request lookups in app/utils/loader.py.
+Stored procedure calls are replaced with a recorder, no database is needed.
+
+    python -m pytest tests/test_loader.py
+"""
+
+import pytest
+from flask import Flask
+
+from app.utils import loader
+from app.utils.loader import parse_ids, get_loader, load_user_by_username
+
+@pytest.mark.parametrize('values, expected', [
+    (['3,1,2'], [3, 1, 2]),
+    (['3', '1', '2'], [3, 1, 2]),
+    (['3,1', '2,1'], [3, 1, 2]),
+    ([' 7 , 5 ,'], [7, 5]),
+    (['5,5,5'], [5]),
+])
+def test_parse_ids_keeps_request_order_without_duplicates(values, expected):
+    assert parse_ids(values, 100) == expected
+
+@pytest.mark.parametrize('values', [[], [''], [',,'], ['1,x'], ['0'], ['-1'], ['1.5']])
+def test_parse_ids_rejects_missing_or_invalid_ids(values):
+    with pytest.raises(ValueError):
+        parse_ids(values, 100)
+
+def test_parse_ids_limit_counts_distinct_ids():
+    assert parse_ids(['1,2,3,3,3'], 3) == [1, 2, 3]
+    with pytest.raises(ValueError, match='At most 3'):
+        parse_ids(['1,2,3,4'], 3)
+
+@pytest.fixture
+def calls(monkeypatch):
+    recorded = []
+
+    def fetch_one(proc_name, args, model=None):
+        recorded.append((proc_name, args))
+        return {'userId': 7, 'username': args[0]}
+
+    def fetch_all(proc_name, args, model=None):
+        recorded.append((proc_name, args))
+        return []
+
+    monkeypatch.setattr(loader, 'sql_call_fetch_one', fetch_one)
+    monkeypatch.setattr(loader, 'sql_call_fetch_all', fetch_all)
+    with Flask(__name__).app_context():
+        yield recorded
+
+def test_session_user_is_fetched_once_per_request(calls):
+    first = load_user_by_username('alice')
+    assert load_user_by_username('alice') is first
+    assert calls == [('getUserByUsername', ('alice',))]
+
+def test_session_user_primes_the_user_loader(calls):
+    user = load_user_by_username('alice')
+    assert get_loader('user').load(7) is user
+    assert len(calls) == 1
+
+def test_loader_remembers_misses(calls):
+    user_loader = get_loader('user')
+    assert user_loader.load_many([1, 2]) == [None, None]
+    assert user_loader.load(2) is None
+    assert calls == [('getUsersByIds', ('[1, 2]',))]
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Tests for the one-time passcodes in app/services/otp_service.py, against the
+memory and SQLite stores on a fake clock: expiry, attempt burn-out and
+single use.
+
+    python -m pytest tests/test_otp.py
+"""
+
+import pytest
+from flask import Flask
+
+from app.services import otp_service
+from app.services.otp_service import issue_otp, verify_otp, consume_otp, purge_expired
+
+class Clock:
+    """Stands in for the time module; both clocks move together"""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(otp_service, 'time', clock)
+    return clock
+
+@pytest.fixture(params=['memory', 'sqlite'], autouse=True)
+def app(request, tmp_path, clock, monkeypatch):
+    monkeypatch.setattr(otp_service, '_store', None)
+    app = Flask(__name__)
+    app.config.update(SECRET_KEY='test secret', OTP_STORE=request.param, OTP_SQLITE_PATH=str(tmp_path / 'otp.db'),
+                      OTP_EMAIL_TTL=900, OTP_RESET_TTL=3600, OTP_MAX_ATTEMPTS=3)
+    with app.app_context():
+        yield app
+
+def wrong(otp):
+    return f"{(int(otp) + 1) % 1000000:06d}"
+
+def test_code_is_single_use():
+    otp = issue_otp('email', 42, {'email': 'a@example.com'})
+    assert verify_otp('email', 42, otp) == {'email': 'a@example.com'}
+    assert verify_otp('email', 42, otp) is None
+
+def test_wrong_guesses_below_the_limit_leave_the_code_usable():
+    otp = issue_otp('email', 42)
+    assert verify_otp('email', 42, wrong(otp)) is None
+    assert verify_otp('email', 42, wrong(otp)) is None
+    assert verify_otp('email', 42, otp) == {}
+
+def test_code_is_burnt_after_max_attempts():
+    otp = issue_otp('email', 42)
+    for _ in range(3):
+        assert verify_otp('email', 42, wrong(otp)) is None
+    assert verify_otp('email', 42, otp) is None
+
+def test_code_expires(clock):
+    otp = issue_otp('email', 42)
+    clock.now += 900
+    assert verify_otp('email', 42, otp) is None
+
+def test_ttl_follows_the_purpose(clock):
+    otp = issue_otp('reset', 'a@example.com')
+    clock.now += 1800
+    assert verify_otp('reset', 'a@example.com', otp) == {}
+
+def test_purge_drops_only_expired_codes(clock):
+    issue_otp('email', 1)
+    clock.now += 600
+    live = issue_otp('email', 2)
+    clock.now += 600
+    assert purge_expired() == 1
+    assert verify_otp('email', 2, live) == {}
+
+def test_new_code_replaces_the_old_one():
+    first = issue_otp('email', 42)
+    second = issue_otp('email', 42)
+    if first != second:
+        assert verify_otp('email', 42, first) is None
+    assert verify_otp('email', 42, second) == {}
+
+def test_codes_are_bound_to_purpose_and_subject():
+    otp = issue_otp('email', 42)
+    assert verify_otp('reset', 42, otp) is None
+    assert verify_otp('email', 43, otp) is None
+    assert verify_otp('email', 42, otp) == {}
+
+def test_subjects_ignore_case_and_whitespace():
+    otp = issue_otp('reset', 'A@Example.com ')
+    assert verify_otp('reset', 'a@example.com', f" {otp} ") == {}
+
+def test_check_then_consume_once():
+    otp = issue_otp('reset', 'a@example.com', {'userId': 7})
+    assert verify_otp('reset', 'a@example.com', otp, consume=False) == {'userId': 7}
+    assert consume_otp('reset', 'a@example.com') == {'userId': 7}
+    assert consume_otp('reset', 'a@example.com') is None
+    assert verify_otp('reset', 'a@example.com', otp) is None
+
+def test_consume_after_expiry_finds_nothing(clock):
+    otp = issue_otp('reset', 'a@example.com')
+    assert verify_otp('reset', 'a@example.com', otp, consume=False) == {}
+    clock.now += 3600
+    assert consume_otp('reset', 'a@example.com') is None
+
+@pytest.mark.parametrize('otp', [None, '', 123456])
+def test_missing_or_non_string_codes_are_rejected(otp):
+    issue_otp('email', 42)
+    assert verify_otp('email', 42, otp) is None
+
+def test_unknown_purpose_is_an_error():
+    with pytest.raises(ValueError):
+        issue_otp('login', 42)
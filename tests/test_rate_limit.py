@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Tests for the GCRA rate limiter (app/utils/rate_limit.py): limit parsing, the
+memory and SQLite stores on a fake clock, and the 429 responses with their
+Retry-After header.
+
+    python -m pytest tests/test_rate_limit.py
+"""
+
+import pytest
+from flask import Flask
+
+from app.utils import rate_limit
+from app.utils.rate_limit import parse_limit, MemoryStore, SQLiteStore, rate_limit as limit_handler
+
+class Clock:
+    """Stands in for the time module; both clocks move together"""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_limit, 'time', clock)
+    return clock
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def store(request, tmp_path):
+    if request.param == 'memory':
+        return MemoryStore()
+    return SQLiteStore(str(tmp_path / 'rate-limit.db'))
+
+@pytest.mark.parametrize('spec, expected', [
+    ('5/hour', (5, 3600)),
+    ('100/minute', (100, 60)),
+    ('20/15 minutes', (20, 900)),
+    (' 3 / day ', (3, 86400)),
+    ('1/second', (1, 1)),
+])
+def test_parse_limit(spec, expected):
+    assert parse_limit(spec) == expected
+
+@pytest.mark.parametrize('spec', ['', '0/minute', '5', '5/fortnight', 'five/minute', '-1/hour'])
+def test_parse_limit_rejects_nonsense(spec):
+    with pytest.raises(ValueError):
+        parse_limit(spec)
+
+def hits(store, key, spec, count):
+    n, period = parse_limit(spec)
+    interval = period / n
+    return [store.hit(key, interval, period - interval) for _ in range(count)]
+
+def test_burst_then_one_request_per_interval(clock, store):
+    # 3/minute: a burst of three, then one every 20 seconds
+    results = hits(store, 'k', '3/minute', 4)
+    assert [allowed for allowed, _ in results] == [True, True, True, False]
+    assert results[-1][1] == pytest.approx(20)
+
+    clock.now += 19.5
+    assert hits(store, 'k', '3/minute', 1)[0][0] is False
+    clock.now += 0.5
+    assert [allowed for allowed, _ in hits(store, 'k', '3/minute', 2)] == [True, False]
+
+def test_bucket_refills_after_a_full_period(clock, store):
+    hits(store, 'k', '3/minute', 3)
+    clock.now += 60
+    assert [allowed for allowed, _ in hits(store, 'k', '3/minute', 4)] == [True, True, True, False]
+
+def test_keys_are_independent(clock, store):
+    hits(store, 'a', '1/minute', 1)
+    assert hits(store, 'a', '1/minute', 1)[0][0] is False
+    assert hits(store, 'b', '1/minute', 1)[0][0] is True
+
+def test_denied_hits_do_not_push_the_key_further_back(clock, store):
+    hits(store, 'k', '1/minute', 1)
+    for _ in range(10):
+        assert hits(store, 'k', '1/minute', 1)[0][0] is False
+    clock.now += 60
+    assert hits(store, 'k', '1/minute', 1)[0][0] is True
+
+def test_sqlite_store_is_shared_through_the_file(clock, tmp_path):
+    path = str(tmp_path / 'rate-limit.db')
+    hits(SQLiteStore(path), 'k', '2/minute', 2)
+    assert hits(SQLiteStore(path), 'k', '2/minute', 1)[0][0] is False
+
+def test_memory_store_forgets_refilled_keys_first(clock):
+    store = MemoryStore(max_keys=2)
+    hits(store, 'old', '1/minute', 1)
+    clock.now += 60
+    hits(store, 'a', '1/minute', 1)
+    hits(store, 'b', '1/minute', 1)
+    assert set(store._tats) == {'a', 'b'}
+
+@pytest.fixture
+def app(clock, monkeypatch):
+    monkeypatch.setattr(rate_limit, '_stores', {})
+    app = Flask(__name__)
+    app.config.update(RATE_LIMIT_STORE='memory', RATE_LIMIT_TRUSTED_PROXIES=0)
+
+    @app.route('/limited')
+    @limit_handler('2/minute', scope='limited')
+    def limited():
+        return 'ok'
+
+    return app
+
+def test_429_carries_retry_after(app, clock):
+    client = app.test_client()
+    assert [client.get('/limited').status_code for _ in range(2)] == [200, 200]
+
+    response = client.get('/limited')
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '30'
+    assert response.headers['X-RateLimit-Limit'] == '2/minute'
+
+    # Retry-After rounds up, so a client that waits it out gets through
+    clock.now += 29.5
+    response = client.get('/limited')
+    assert response.headers['Retry-After'] == '1'
+    clock.now += 0.5
+    assert client.get('/limited').status_code == 200
+
+def test_limits_are_per_client(app):
+    client = app.test_client()
+    for _ in range(2):
+        client.get('/limited', environ_base={'REMOTE_ADDR': '10.0.0.1'})
+    assert client.get('/limited', environ_base={'REMOTE_ADDR': '10.0.0.1'}).status_code == 429
+    assert client.get('/limited', environ_base={'REMOTE_ADDR': '10.0.0.2'}).status_code == 200
+
+def test_config_can_override_or_disable_a_limit(app):
+    client = app.test_client()
+    app.config['RATE_LIMITS'] = {'limited': '1/minute'}
+    assert [client.get('/limited').status_code for _ in range(2)] == [200, 429]
+
+    app.config['RATE_LIMIT_ENABLED'] = False
+    assert client.get('/limited').status_code == 200
+
+def test_trusted_proxy_address_is_used(app):
+    app.config['RATE_LIMIT_TRUSTED_PROXIES'] = 1
+    client = app.test_client()
+    headers = {'X-Forwarded-For': '6.6.6.6, 1.2.3.4'}
+    for _ in range(2):
+        client.get('/limited', headers=headers)
+    assert client.get('/limited', headers=headers).status_code == 429
+    # Same proxy, different client
+    assert client.get('/limited', headers={'X-Forwarded-For': '6.6.6.6, 5.6.7.8'}).status_code == 200
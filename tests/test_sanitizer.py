@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Correctness tests for the fallback sanitizer (app/utils/sanitizer.py) that
+runs when bleach is not installed.
+
+Every XSS vector is sanitized and the output is re-parsed with the standard
+library HTML parser: only allowed tags and attributes may survive, and no URL
+may carry a script scheme.
+
+    python -m pytest tests/test_sanitizer.py
+"""
+
+import re
+from html.parser import HTMLParser
+
+import pytest
+
+from app.utils.helpers import ALLOWED_TAGS, ALLOWED_ATTRIBUTES
+from app.utils.sanitizer import clean_html, clean_string, DEFAULT_PROTOCOLS
+
+XSS_VECTORS = [
+    '<script>alert(1)</script>',
+    '<SCRIPT SRC=//evil.example/x.js></SCRIPT>',
+    '<script>document.write("<img src=x onerror=alert(1)>")</script>',
+    '<scr<script>ipt>alert(1)</script>',
+    '<<script>script>alert(1)<</script>/script>',
+    '<script/xss src="//evil.example/x.js"></script>',
+    '<script\n>alert(1)</script\n>',
+    '<img src=x onerror=alert(1)>',
+    '<img src="x" onerror="alert(1)">',
+    '<img src=x onerror\n=alert(1)>',
+    '<IMG SRC="javascript:alert(1);">',
+    '<img src=JaVaScRiPt:alert(1)>',
+    '<img src="jav\tascript:alert(1);">',
+    '<img src="jav&#x09;ascript:alert(1);">',
+    '<img src="&#106;&#97;&#118;&#97;&#115;&#99;&#114;&#105;&#112;&#116;&#58;alert(1)">',
+    '<img src="&#x6A&#x61&#x76&#x61&#x73&#x63&#x72&#x69&#x70&#x74&#x3A;alert(1)">',
+    '<img src=" &#14;  javascript:alert(1);">',
+    '<img """><script>alert(1)</script>">',
+    '<img src=`javascript:alert(1)`>',
+    '<img/src="x"/onerror=alert(1)>',
+    '<a href="javascript:alert(1)">click</a>',
+    '<a href="JAVASCRIPT:alert(1)">click</a>',
+    '<a href="  javascript:alert(1)">click</a>',
+    '<a href="java\nscript:alert(1)">click</a>',
+    '<a href="javascript&colon;alert(1)">click</a>',
+    '<a href="vbscript:msgbox(1)">click</a>',
+    '<a href="data:text/html;base64,PHNjcmlwdD5hbGVydCgxKTwvc2NyaXB0Pg==">click</a>',
+    '<a href=javascript:alert(1)>click</a>',
+    '<a href="#" onclick="alert(1)">click</a>',
+    '<a onmouseover=alert(1)>hover</a>',
+    '<a title="x" style="background:url(javascript:alert(1))">x</a>',
+    '<a href="x" title="&quot; onmouseover=&quot;alert(1)">x</a>',
+    '<a title=\'"><script>alert(1)</script>\'>x</a>',
+    '<p onclick="alert(1)">text</p>',
+    '<p style="expression(alert(1))">text</p>',
+    '<svg onload=alert(1)>',
+    '<svg><script>alert(1)</script></svg>',
+    '<svg/onload=alert(1)>',
+    '<math><mtext><table><mglyph><style><img src=x onerror=alert(1)>',
+    '<body onload=alert(1)>',
+    '<iframe src="javascript:alert(1)"></iframe>',
+    '<iframe srcdoc="<script>alert(1)</script>"></iframe>',
+    '<object data="javascript:alert(1)"></object>',
+    '<embed src="javascript:alert(1)">',
+    '<form action="javascript:alert(1)"><input type=submit></form>',
+    '<button formaction="javascript:alert(1)">x</button>',
+    '<details open ontoggle=alert(1)>',
+    '<video><source onerror="alert(1)"></video>',
+    '<style>@import "javascript:alert(1)";</style>',
+    '<link rel=stylesheet href="javascript:alert(1)">',
+    '<meta http-equiv="refresh" content="0;url=javascript:alert(1)">',
+    '<base href="javascript:alert(1)//">',
+    '<!--<img src="--><img src=x onerror=alert(1)//">',
+    '<!-- --!><img src=x onerror=alert(1)>-->',
+    '<![CDATA[<script>alert(1)</script>]]>',
+    '<?xml version="1.0"?><script>alert(1)</script>',
+    '<textarea><script>alert(1)</script></textarea>',
+    '<title><img src=x onerror=alert(1)></title>',
+    '<noscript><p title="</noscript><img src=x onerror=alert(1)>">',
+    '<template><img src=x onerror=alert(1)></template>',
+    '<div><p>unclosed <strong>bold',
+    '<a href="http://example.com" target=_blank rel=opener>ok</a>',
+    '<img src="http://example.com/a.png" alt="a" width=1 onload=alert(1)>',
+    '<p>1 < 2 && 3 > 2</p>',
+    '<p>&lt;script&gt;alert(1)&lt;/script&gt;</p>',
+    '<img src=x onerror=alert(1)',
+    '<a href="http://example.com',
+    '"><script>alert(1)</script>',
+]
+
+SCRIPT_SCHEME_RE = re.compile(r'^\s*(javascript|vbscript|data):', re.IGNORECASE)
+
+class Inspector(HTMLParser):
+    """Collects every tag and attribute a browser-like parser sees in the output"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.tags = []
+
+    def handle_starttag(self, tag, attrs):
+        self.tags.append((tag, attrs))
+
+    def handle_startendtag(self, tag, attrs):
+        self.tags.append((tag, attrs))
+
+def inspect(output):
+    inspector = Inspector()
+    inspector.feed(output)
+    inspector.close()
+    return inspector.tags
+
+def sanitize(text):
+    return clean_html(text, ALLOWED_TAGS, ALLOWED_ATTRIBUTES)
+
+@pytest.mark.parametrize('vector', XSS_VECTORS)
+def test_only_allowed_markup_survives(vector):
+    output = sanitize(vector)
+    for tag, attrs in inspect(output):
+        assert tag in ALLOWED_TAGS, (vector, output)
+        for name, value in attrs:
+            assert name in ALLOWED_ATTRIBUTES.get(tag, ()), (vector, output)
+            if name in ('href', 'src'):
+                scheme = re.sub(r'[\x00-\x20]+', '', value or '')
+                assert not SCRIPT_SCHEME_RE.match(scheme), (vector, output)
+
+@pytest.mark.parametrize('vector', XSS_VECTORS)
+def test_no_script_content_or_handlers(vector):
+    output = sanitize(vector)
+    assert '<script' not in output.lower()
+    for tag, attrs in inspect(output):
+        assert not any(name.startswith('on') for name, _ in attrs), (vector, output)
+
+@pytest.mark.parametrize('vector', XSS_VECTORS)
+def test_sanitizing_is_idempotent(vector):
+    once = sanitize(vector)
+    assert sanitize(once) == once
+
+def test_allowed_markup_is_kept():
+    text = ('<h2>Title</h2><p>Some <strong>bold</strong>, <em>italic</em> and <u>underlined</u> text.<br>'
+            '<a href="https://example.com/a?b=1&amp;c=2" title="Example">link</a></p>'
+            '<ul><li>one</li><li>two</li></ul><blockquote>quote</blockquote>'
+            '<pre><code>x = 1</code></pre><img src="/static/a.png" alt="A">')
+    assert sanitize(text) == text
+
+def test_disallowed_tags_are_stripped_but_text_kept():
+    assert sanitize('<div class="x"><span>hello</span></div>') == 'hello'
+    assert sanitize('<p style="color:red" onclick="x()">hi</p>') == '<p>hi</p>'
+
+def test_script_bodies_are_dropped():
+    assert sanitize('a<script>var s = "</p>";</script>b') == 'ab'
+    assert sanitize('a<style>p { color: red }</style>b') == 'ab'
+    assert sanitize('a<script>never closed') == 'a'
+
+def test_text_is_escaped():
+    assert sanitize('1 < 2 & 3 > 2') == '1 &lt; 2 &amp; 3 &gt; 2'
+    assert sanitize('&amp; &lt; &#169; &#xA9;') == '&amp; &lt; &#169; &#xA9;'
+
+def test_unclosed_tags_are_closed_and_stray_end_tags_dropped():
+    assert sanitize('<p><strong>bold') == '<p><strong>bold</strong></p>'
+    assert sanitize('text</p></strong>') == 'text'
+    assert sanitize('<p><em>a</p>b') == '<p><em>a</em></p>b'
+
+def test_attribute_values_are_requoted_and_escaped():
+    assert sanitize('<a href=/x title=\'say "hi"\'>x</a>') == '<a href="/x" title="say &quot;hi&quot;">x</a>'
+    assert sanitize('<a title="a" title="b">x</a>') == '<a title="a">x</a>'
+
+@pytest.mark.parametrize('url', ['http://example.com', 'https://example.com', 'mailto:a@example.com',
+                                 '/relative/path', 'page.html', '#anchor', '?q=1', '//example.com/x'])
+def test_safe_urls_are_kept(url):
+    assert sanitize(f'<a href="{url}">x</a>') == f'<a href="{url}">x</a>'
+
+def test_protocols_cover_bleach_defaults():
+    assert {'http', 'https', 'mailto'} <= DEFAULT_PROTOCOLS
+
+def test_emoji_and_non_ascii_are_preserved():
+    assert sanitize('<p>héllo 👋 世界</p>') == '<p>héllo 👋 世界</p>'
+
+def test_empty_input():
+    assert sanitize('') == ''
+    assert sanitize(None) is None
+
+@pytest.mark.parametrize('text, expected', [
+    ('Hello <b>world</b>', 'Hello &lt;b&gt;world&lt;/b&gt;'),
+    ('x<script>alert(1)</script>y', 'xy'),
+    ('<SCRIPT>alert(1)</SCRIPT>', ''),
+    ('javascript:alert(1)', 'alert(1)'),
+    ('<img src=x onerror=alert(1)>', '&lt;img src=x alert(1)&gt;'),
+    ("Robert'); DROP TABLE users;--", 'Robert&#x27;)  TABLE users'),
+    ('1 UNION SELECT password', '1   password'),
+    ('union select is only stripped in upper case', 'union select is only stripped in upper case'),
+    ('/* comment */', ' comment '),
+])
+def test_clean_string(text, expected):
+    assert clean_string(text) == expected
+
+def test_clean_string_leaves_non_strings_alone():
+    assert clean_string(None) is None
+    assert clean_string(5) == 5
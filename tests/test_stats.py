@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Tests for the in-memory blog view counts in app/services/stats_service.py: the
+sharded counter and flush_views, with addBlogViews replaced by a recorder.
+
+    python -m pytest tests/test_stats.py
+"""
+
+import json
+import threading
+from collections import Counter
+
+import pytest
+
+from app.services import stats_service
+from app.services.stats_service import ShardedCounter, flush_views, record_view
+
+def test_drain_adds_up_the_shards_and_empties_them():
+    counter = ShardedCounter(shards=4)
+
+    def count(blog_ids):
+        for blog_id in blog_ids:
+            counter.add(blog_id)
+
+    threads = [threading.Thread(target=count, args=([1, 2, 2, 3] * 50,)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert counter.drain() == Counter({1: 400, 2: 800, 3: 400})
+    assert counter.drain() == Counter()
+
+def test_no_view_is_lost_while_draining():
+    counter = ShardedCounter(shards=4)
+    drained = Counter()
+    stop = threading.Event()
+
+    def count():
+        for _ in range(20000):
+            counter.add(7)
+
+    def drain():
+        while not stop.is_set():
+            drained.update(counter.drain())
+
+    drainer = threading.Thread(target=drain)
+    drainer.start()
+    threads = [threading.Thread(target=count) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stop.set()
+    drainer.join()
+
+    drained.update(counter.drain())
+    assert drained[7] == 80000
+
+def test_update_merges_counts():
+    counter = ShardedCounter(shards=2)
+    counter.add(1, 3)
+    counter.update({1: 2, 5: 1})
+    assert counter.drain() == Counter({1: 5, 5: 1})
+
+@pytest.fixture
+def views(monkeypatch):
+    views = ShardedCounter()
+    monkeypatch.setattr(stats_service, '_views', views)
+    return views
+
+class Calls(list):
+    """addBlogViews calls; fail_on makes the call with that index raise"""
+    fail_on = None
+
+@pytest.fixture
+def batches(monkeypatch):
+    calls = Calls()
+
+    def fetch_one(proc_name, args):
+        assert proc_name == 'addBlogViews'
+        if len(calls) == calls.fail_on:
+            calls.append(None)
+            raise ConnectionError('database went away')
+        calls.append((json.loads(args[0]), args[1]))
+
+    monkeypatch.setattr(stats_service, 'sql_call_fetch_one', fetch_one)
+    return calls
+
+def test_flush_writes_sorted_batches(views, batches):
+    views.update({5: 1, 1: 2, 4: 1, 2: 3, 3: 1})
+    assert flush_views(batch_size=2, half_life=600) == 8
+    assert batches == [
+        ([[1, 2], [2, 3]], 600),
+        ([[3, 1], [4, 1]], 600),
+        ([[5, 1]], 600),
+    ]
+    assert views.drain() == Counter()
+
+def test_flush_with_nothing_counted(views, batches):
+    assert flush_views() == 0
+    assert batches == []
+
+def test_failed_batch_and_the_rest_are_kept_for_the_next_flush(views, batches):
+    views.update({1: 1, 2: 2, 3: 3, 4: 4})
+    batches.fail_on = 1
+    with pytest.raises(ConnectionError):
+        flush_views(batch_size=2)
+    assert batches[0] == ([[1, 1], [2, 2]], 86400)
+
+    # Views counted meanwhile are merged with what was put back
+    views.add(3)
+    batches.fail_on = None
+    assert flush_views(batch_size=2) == 8
+    assert batches[2:] == [([[3, 4], [4, 4]], 86400)]
+
+def test_record_view_follows_stats_enabled(views):
+    record_view(1, {'STATS_ENABLED': True})
+    record_view(1, {'STATS_ENABLED': False})
+    record_view(2, {})
+    assert views.drain() == Counter({1: 1, 2: 1})